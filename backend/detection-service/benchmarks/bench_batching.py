@@ -0,0 +1,77 @@
+"""
+Throughput benchmark: YOLO inference at batch 1 vs. dynamic micro-batching
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_batching.py --images 64 --batch-sizes 1,4,8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.model_loader import model_loader  # noqa: E402
+from models.batch_scheduler import BatchScheduler  # noqa: E402
+
+detector = model_loader.get()
+
+
+def make_images(count: int, width: int, height: int) -> list:
+    rng = np.random.default_rng(0)
+    return [
+        rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        for _ in range(count)
+    ]
+
+
+def bench_direct(images: list, batch_size: int) -> float:
+    """Images/sec calling predict on fixed-size slices"""
+    conf = detector.confidence_threshold
+    detector._predict(images[:batch_size], conf)  # warm-up
+
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        detector._predict(images[i:i + batch_size], conf)
+    return len(images) / (time.perf_counter() - start)
+
+
+def bench_scheduled(images: list, batch_size: int, max_wait_ms: float) -> tuple:
+    """Images/sec with concurrent callers going through BatchScheduler"""
+    conf = detector.confidence_threshold
+    scheduler = BatchScheduler(detector._predict, batch_size, max_wait_ms)
+    try:
+        with ThreadPoolExecutor(max_workers=batch_size) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda image: scheduler.submit(image, conf), images))
+            elapsed = time.perf_counter() - start
+        return len(images) / elapsed, scheduler.stats()['mean_batch_size']
+    finally:
+        scheduler.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--batch-sizes', default='1,4,8')
+    parser.add_argument('--max-wait-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    images = make_images(args.images, args.width, args.height)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    print(f"{args.images} images at {args.width}x{args.height} on {detector.device}")
+    print(f"{'batch':>6} {'direct img/s':>14} {'scheduled img/s':>17} {'mean batch':>11}")
+    for batch_size in batch_sizes:
+        direct = bench_direct(images, batch_size)
+        scheduled, mean_batch = bench_scheduled(images, batch_size, args.max_wait_ms)
+        print(f"{batch_size:>6} {direct:>14.2f} {scheduled:>17.2f} {mean_batch:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Near-duplicate index benchmark: Hamming-radius lookup latency vs. index size
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_duplicate_index.py --sizes 10000,100000,1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.duplicate_index import NearDuplicateIndex  # noqa: E402
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--radius', type=int, default=6)
+    parser.add_argument('--chunks', type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"radius={args.radius}, chunks={args.chunks}, {args.queries} queries per size (half are near-duplicates)")
+    print(f"{'size':>10} {'build s':>9} {'p50 us':>8} {'p99 us':>8} {'hit rate':>9}")
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        index = NearDuplicateIndex(
+            radius=args.radius,
+            ttl_seconds=10 ** 9,
+            num_chunks=args.chunks
+        )
+        hashes = [rng.getrandbits(64) for _ in range(size)]
+
+        start = time.perf_counter()
+        for image_hash in hashes:
+            index.add(image_hash, {})
+        build = time.perf_counter() - start
+
+        queries = []
+        for i in range(args.queries):
+            if i % 2:
+                queries.append(flip_bits(rng.choice(hashes), rng.randint(0, args.radius), rng))
+            else:
+                queries.append(rng.getrandbits(64))
+
+        latencies = []
+        hits = 0
+        for query in queries:
+            start = time.perf_counter()
+            matches = index.query(query)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            hits += bool(matches)
+
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{size:>10} {build:>9.2f} {p50:>8.1f} {p99:>8.1f} {hits / len(queries):>9.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Polygon geofence benchmark: GeofenceIndex throughput and correctness
+
+Checks GeofenceIndex.contains_batch against a brute-force even-odd test of
+every point against every fence, then reports points/sec for batch and
+single-point lookups.
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_geofence.py
+    python benchmarks/bench_geofence.py --geojson wards.geojson --points 200000
+
+Without a GeoJSON file, a state-sized polygon with a few thousand vertices
+and a city grid of irregular ward polygons are generated.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geofence_index import GeofenceIndex, _ray_cast  # noqa: E402
+
+
+def irregular_polygon(rng, center_lon, center_lat, radius, vertices):
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    radii = radius * rng.uniform(0.6, 1.0, vertices)
+    return np.column_stack([
+        center_lon + radii * np.cos(angles),
+        center_lat + radii * np.sin(angles)
+    ])
+
+
+def synthetic_index(wards_per_side: int, raster_size: int) -> GeofenceIndex:
+    rng = np.random.default_rng(0)
+    index = GeofenceIndex(raster_size=raster_size)
+    index.add('state', [irregular_polygon(rng, 74.0, 27.0, 3.5, 4000)])
+
+    # Jaipur-sized grid of wards, ~1km each
+    size = 0.01
+    for row in range(wards_per_side):
+        for col in range(wards_per_side):
+            index.add(
+                f'ward-{row}-{col}',
+                [irregular_polygon(
+                    rng, 75.7 + col * size, 26.8 + row * size, size * 0.7, 40
+                )]
+            )
+    return index
+
+
+def random_points(index: GeofenceIndex, count: int, rng) -> tuple:
+    """Half the points spread over the state, half inside the ward grid"""
+    half = count // 2
+    lats = np.concatenate([rng.uniform(23, 31, half), rng.uniform(26.79, 27.2, count - half)])
+    lons = np.concatenate([rng.uniform(70, 78, half), rng.uniform(75.69, 76.1, count - half)])
+    return lats, lons
+
+
+def brute_force(index: GeofenceIndex, lats, lons) -> np.ndarray:
+    return np.column_stack([
+        _ray_cast(lons, lats, fence.edges) for fence in index._fences
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--geojson', help='GeoJSON file of fences to load instead')
+    parser.add_argument('--id-property', default='id')
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--wards-per-side', type=int, default=20)
+    parser.add_argument('--raster-size', type=int, default=128)
+    parser.add_argument('--check-points', type=int, default=20000,
+                        help='Points verified against the brute-force test')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.geojson:
+        index = GeofenceIndex.load_geojson(
+            args.geojson, id_property=args.id_property, raster_size=args.raster_size
+        )
+    else:
+        index = synthetic_index(args.wards_per_side, args.raster_size)
+    build_s = time.perf_counter() - start
+    edges = sum(len(fence.edges) for fence in index._fences)
+    print(f"fences: {len(index)}  edges: {edges}  build: {build_s:.2f}s")
+
+    rng = np.random.default_rng(1)
+    lats, lons = random_points(index, args.points, rng)
+
+    check = slice(0, min(args.check_points, args.points))
+    expected = brute_force(index, lats[check], lons[check])
+    actual = index.contains_batch(lats[check], lons[check])
+    mismatches = int(np.count_nonzero(expected != actual))
+    print(f"correctness: {mismatches} mismatches over {expected.size} point/fence pairs")
+
+    start = time.perf_counter()
+    mask = index.contains_batch(lats, lons)
+    batch_s = time.perf_counter() - start
+    print(
+        f"contains_batch: {args.points} points in {batch_s * 1000:.0f}ms "
+        f"({args.points / batch_s:,.0f} points/sec, {mask.any(axis=1).mean():.0%} inside a fence)"
+    )
+
+    singles = min(args.points, 5000)
+    start = time.perf_counter()
+    for lat, lon in zip(lats[:singles], lons[:singles]):
+        index.contains(lat, lon)
+    single_s = time.perf_counter() - start
+    print(f"contains: {singles / single_s:,.0f} points/sec ({single_s / singles * 1e6:.0f}us each)")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
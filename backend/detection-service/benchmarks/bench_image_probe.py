@@ -0,0 +1,133 @@
+"""
+Metadata benchmark: header-only probe vs exifread + PIL
+
+Compares the legacy metadata path (exifread.process_file for the EXIF tags
+plus PIL Image.open(...).size / .verify() for the dimensions) against
+utils.image_probe.probe_image, and checks both return the same values.
+exifread is no longer a service dependency; install it to run this
+comparison (pip install exifread==3.0.0).
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_image_probe.py --images path/to/phone/jpegs
+    python benchmarks/bench_image_probe.py --width 4000 --height 3000
+
+Without an image directory, synthetic JPEG/PNG/WebP files carrying camera
+and GPS EXIF tags are generated with PIL.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import exifread
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_probe import probe_image  # noqa: E402
+
+
+def legacy_metadata(data: bytes) -> dict:
+    """Metadata exactly as validate_image and the routes read it before"""
+    header = Image.open(io.BytesIO(data))
+    width, height = header.size
+    Image.open(io.BytesIO(data)).verify()
+    tags = exifread.process_file(io.BytesIO(data))
+    return {
+        'format': header.format,
+        'width': width,
+        'height': height,
+        'exif': {
+            'datetime': str(tags.get('EXIF DateTimeOriginal', '')),
+            'make': str(tags.get('Image Make', '')),
+            'model': str(tags.get('Image Model', '')),
+            'gps_latitude': str(tags.get('GPS GPSLatitude', '')),
+            'gps_longitude': str(tags.get('GPS GPSLongitude', ''))
+        }
+    }
+
+
+def probe_metadata(data: bytes) -> dict:
+    probe = probe_image(data)
+    return {key: probe[key] for key in ('format', 'width', 'height', 'exif')}
+
+
+def synthetic_images(width: int, height: int) -> dict:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize((width, height), Image.BICUBIC)
+
+    exif = Image.Exif()
+    exif[0x010F] = 'Google'
+    exif[0x0110] = 'Pixel 7'
+    exif.get_ifd(0x8769)[0x9003] = '2024:03:15 10:42:07'
+    gps = exif.get_ifd(0x8825)
+    gps[1], gps[2] = 'N', (26.0, 54.0, 24.68)
+    gps[3], gps[4] = 'E', (75.0, 47.0, 15.2)
+
+    images = {}
+    for image_format, options in (('JPEG', {'quality': 90}), ('PNG', {}), ('WEBP', {'quality': 80})):
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, exif=exif, **options)
+        images[f'synthetic.{image_format.lower()}'] = buffer.getvalue()
+    return images
+
+
+def load_images(directory: str) -> dict:
+    return {
+        path.name: path.read_bytes()
+        for path in sorted(Path(directory).iterdir())
+        if path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp')
+    }
+
+
+def median_ms(func, data: bytes, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', help='Directory of real phone JPEGs')
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    images = load_images(args.images) if args.images else synthetic_images(args.width, args.height)
+
+    print(f"{'image':<28} {'KB':>7} {'legacy ms':>10} {'probe ms':>9} {'speedup':>8}  match")
+    mismatches = 0
+    for name, data in images.items():
+        legacy = legacy_metadata(data)
+        probe = probe_metadata(data)
+        match = legacy == probe
+        if not match:
+            mismatches += 1
+            diff = {
+                key: (legacy[key], probe[key])
+                for key in legacy if legacy[key] != probe[key]
+            }
+        legacy_ms = median_ms(legacy_metadata, data, args.repeats)
+        probe_ms = median_ms(probe_image, data, args.repeats)
+        print(
+            f"{name[:28]:<28} {len(data) / 1024:>7.0f} {legacy_ms:>10.3f} {probe_ms:>9.3f} "
+            f"{legacy_ms / probe_ms:>7.1f}x  {'yes' if match else 'NO'}"
+        )
+        if not match:
+            print(f"    differences (legacy, probe): {diff}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Memory of prefork serving vs. independent worker processes
+
+Starts the service with 1..N workers, twice per count: ``serve.py``
+(model loaded once, workers forked and sharing it copy-on-write) and
+``uvicorn main:app --workers N`` (every worker imports torch and loads the
+model itself). Once /ready answers and memory has settled, reads
+/proc/<pid>/smaps_rollup for every process in the tree and reports per
+worker RSS and private memory, and the total PSS (each shared page split
+among the processes mapping it, so the sum is the real footprint) with the
+increase per added worker.
+
+Linux only. Runs offline on CPU: the model file must already be on disk
+(YOLO_MODEL_PATH). Redis is not needed.
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_prefork.py
+    python benchmarks/bench_prefork.py --workers 1,2,4 --modes prefork
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+
+def descendants(pid: int) -> list:
+    """pid and all its descendants, found through /proc/<pid>/stat"""
+    parents = {}
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        parents.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(parents.get(current, []))
+    return tree
+
+
+def memory_mb(pid: int) -> dict:
+    """Rss, Pss and private memory of one process in MB"""
+    values = {}
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines()[1:]:
+        name, value = line.split(':', 1)
+        values[name] = int(value.split()[0]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'private': values['Private_Clean'] + values['Private_Dirty']
+    }
+
+
+def wait_until_settled(proc: subprocess.Popen, port: int, timeout: float) -> list:
+    """Wait for /ready, then for the tree's total PSS to stop growing"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f"Service on port {port} did not become ready")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=2) as response:
+                if response.status == 200:
+                    break
+        except OSError:
+            pass
+        time.sleep(0.5)
+
+    previous, stable = 0.0, 0
+    while stable < 3 and time.monotonic() < deadline:
+        time.sleep(1)
+        try:
+            samples = [memory_mb(pid) for pid in descendants(proc.pid)]
+        except OSError:
+            continue
+        total = sum(s['pss'] for s in samples)
+        stable = stable + 1 if abs(total - previous) < 0.01 * total else 0
+        previous = total
+    return samples
+
+
+def measure(mode: str, workers: int, port: int, timeout: float) -> dict:
+    if mode == 'prefork':
+        command = [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(port)]
+    else:
+        command = [
+            sys.executable, '-m', 'uvicorn', 'main:app',
+            '--workers', str(workers), '--port', str(port)
+        ]
+    proc = subprocess.Popen(
+        command, cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        samples = wait_until_settled(proc, port, timeout)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+    # The largest processes are the workers; the rest are the supervisor
+    # (and, for uvicorn, multiprocessing's resource tracker)
+    worker_samples = sorted(samples, key=lambda s: s['rss'], reverse=True)[:workers]
+    return {
+        'processes': len(samples),
+        'worker_rss': sum(s['rss'] for s in worker_samples) / workers,
+        'worker_private': sum(s['private'] for s in worker_samples) / workers,
+        'total_pss': sum(s['pss'] for s in samples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--modes', default='prefork,independent')
+    parser.add_argument('--port', type=int, default=3102)
+    parser.add_argument('--timeout', type=float, default=180)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<12} {'workers':>7} {'worker RSS':>11} {'private':>9} "
+        f"{'total PSS':>10} {'+/worker':>9}"
+    )
+    for mode in args.modes.split(','):
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(',')):
+            result = measure(mode, workers, args.port, args.timeout)
+            if baseline is None:
+                baseline = (workers, result['total_pss'])
+                per_worker = ''
+            else:
+                added = (result['total_pss'] - baseline[1]) / (workers - baseline[0])
+                per_worker = f"{added:.0f}MB"
+            print(
+                f"{mode:<12} {workers:>7} {result['worker_rss']:>9.0f}MB "
+                f"{result['worker_private']:>7.0f}MB {result['total_pss']:>8.0f}MB {per_worker:>9}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Service benchmark: detector, forensics and both routes at several resolutions
+
+Times YOLODetector.detect, compare_images, check_image_manipulation,
+validate_image and the /detect and /verify-completion routes end-to-end
+through the ASGI app (with an in-memory fake Redis), for synthetic street
+scenes at VGA, 1080p and 12MP plus any fixture photos given. Reports
+latency percentiles, throughput and peak RSS, and writes everything to a
+JSON file so runs can be compared across commits.
+
+Runs offline on CPU: the model file must already be on disk
+(YOLO_MODEL_PATH) and fakeredis must be installed.
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_service.py --output bench.json
+    python benchmarks/bench_service.py --resolutions vga,1080p --iterations 10
+    python benchmarks/bench_service.py --fixtures ~/photos --targets detect,route_detect
+    python benchmarks/bench_service.py --output new.json --compare bench.json
+
+Each target is run once per image without timing first (warm-up). Process
+peak RSS only ever grows, so it is reported after each target in the order
+they run, smallest resolution first.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every benchmark request comes from one client
+os.environ.setdefault('IP_RATE_LIMIT', '0')
+
+import fakeredis  # noqa: E402
+import config.redis  # noqa: E402
+
+# Swap in the fake before anything captures the real client
+config.redis.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from config.settings import settings  # noqa: E402
+from models.model_loader import model_loader  # noqa: E402
+from utils.image_context import DecodedImage  # noqa: E402
+from utils.image_validator import validate_image, check_image_manipulation  # noqa: E402
+from utils.upload_limits import peak_rss_mb  # noqa: E402
+from main import app  # noqa: E402
+
+RESOLUTIONS = {
+    'vga': (640, 480),
+    '1080p': (1920, 1080),
+    '12mp': (4000, 3000),
+}
+
+TARGETS = (
+    'validate_image', 'check_image_manipulation', 'detect', 'compare_images',
+    'route_detect', 'route_verify'
+)
+
+FIXTURE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# Inside the default (Rajasthan) service area
+LATITUDE, LONGITUDE = 26.9124, 75.7873
+
+# Scenes repeat across iterations, so each request reports from its own
+# spot ~1km apart to stay clear of the near-duplicate check
+_locations = itertools.count()
+
+
+def street_scene(width: int, height: int, seed: int, potholes: bool = True) -> np.ndarray:
+    """
+    Deterministic road-like BGR image: sky gradient, asphalt with texture
+    and sensor noise, and optionally a few dark pothole blobs
+    """
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    horizon = height // 3
+
+    sky = np.linspace(235, 170, horizon, dtype=np.float32)[:, None]
+    image[:horizon] = np.stack([sky + 10, sky, sky - 40], axis=-1).astype(np.uint8)
+
+    # Coarse asphalt texture upscaled, so detail is resolution independent
+    texture = rng.normal(105, 12, size=(max(2, (height - horizon) // 16), max(2, width // 16)))
+    texture = cv2.resize(texture.astype(np.float32), (width, height - horizon),
+                         interpolation=cv2.INTER_CUBIC)
+    image[horizon:] = np.clip(texture, 0, 255).astype(np.uint8)[..., None]
+
+    if potholes:
+        scale = width / 640
+        for _ in range(3):
+            center = (int(rng.uniform(0.15, 0.85) * width), int(rng.uniform(0.5, 0.9) * height))
+            axes = (int(rng.uniform(25, 60) * scale), int(rng.uniform(12, 30) * scale))
+            cv2.ellipse(image, center, axes, rng.uniform(0, 180), 0, 360, (40, 42, 45), -1)
+
+    noise = rng.normal(0, 4, size=image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def vary(image: np.ndarray, seed: int) -> np.ndarray:
+    """Copy with a few pixels changed, so each upload has distinct bytes"""
+    varied = image.copy()
+    rng = np.random.default_rng(seed)
+    ys = rng.integers(0, image.shape[0], 16)
+    xs = rng.integers(0, image.shape[1], 16)
+    varied[ys, xs] = rng.integers(0, 256, size=(16, 3), dtype=np.uint8)
+    return varied
+
+
+def image_cases(resolutions: list, fixtures: str) -> list:
+    """(case name, before image, after image) per resolution and fixture"""
+    cases = []
+    for name in resolutions:
+        width, height = RESOLUTIONS[name]
+        cases.append((
+            f'synthetic-{name}',
+            street_scene(width, height, seed=1),
+            street_scene(width, height, seed=1, potholes=False)
+        ))
+
+    if fixtures:
+        paths = sorted(
+            p for p in Path(fixtures).expanduser().iterdir()
+            if p.suffix.lower() in FIXTURE_EXTENSIONS
+        )
+        for path in paths:
+            photo = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if photo is None:
+                print(f"skipping unreadable fixture {path.name}")
+                continue
+            for name in resolutions:
+                width, height = RESOLUTIONS[name]
+                resized = cv2.resize(photo, (width, height), interpolation=cv2.INTER_AREA)
+                # Blurred copy stands in for the "after" photo
+                cases.append((
+                    f'{path.stem}-{name}', resized, cv2.GaussianBlur(resized, (31, 31), 0)
+                ))
+    return cases
+
+
+def measure(run, iterations: int) -> dict:
+    """Latency stats over iterations calls of run(i), after one untimed call"""
+    run(-1)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        run(i)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+    return {
+        'iterations': iterations,
+        'mean_ms': round(float(latencies.mean()), 2),
+        'min_ms': round(float(latencies.min()), 2),
+        'p50_ms': round(float(p50), 2),
+        'p90_ms': round(float(p90), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(latencies.max()), 2),
+        'throughput_per_sec': round(iterations / elapsed, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def check_response(response, expected_status: int = 200):
+    if response.status_code != expected_status:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+
+def target_runners(client: TestClient, detector, before: np.ndarray, after: np.ndarray,
+                   iterations: int) -> dict:
+    """Callables taking the iteration index (-1 for the warm-up call)"""
+    before_bytes = encode_jpeg(before)
+    after_bytes = encode_jpeg(after)
+
+    # Routes reject duplicates and cache by content, so every request
+    # uploads distinct bytes; encoded up front to keep it out of the timing
+    uploads = {i: encode_jpeg(vary(before, i + 2)) for i in range(-1, iterations)}
+    after_uploads = {i: encode_jpeg(vary(after, i + 2)) for i in range(-1, iterations)}
+
+    def route_detect(i):
+        check_response(client.post(
+            '/api/v1/issues/detect',
+            data={
+                'latitude': LATITUDE + 0.01 * next(_locations),
+                'longitude': LONGITUDE,
+                'device_id': f'bench-{i}',
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            },
+            files={'image': ('bench.jpg', uploads[i], 'image/jpeg')}
+        ))
+
+    def route_verify(i):
+        check_response(client.post(
+            '/api/v1/issues/verify-completion',
+            data={'task_id': f'bench-{i}', 'latitude': LATITUDE, 'longitude': LONGITUDE},
+            files={
+                'before_image': ('before.jpg', uploads[i], 'image/jpeg'),
+                'after_image': ('after.jpg', after_uploads[i], 'image/jpeg')
+            }
+        ))
+
+    # Direct calls get a fresh DecodedImage each time, so decode is included
+    return {
+        'validate_image': lambda i: validate_image(DecodedImage(before_bytes), 'bench.jpg'),
+        'check_image_manipulation': lambda i: check_image_manipulation(DecodedImage(before_bytes)),
+        'detect': lambda i: detector.detect(DecodedImage(before_bytes)),
+        'compare_images': lambda i: detector.compare_images(
+            DecodedImage(before_bytes), DecodedImage(after_bytes)
+        ),
+        'route_detect': route_detect,
+        'route_verify': route_verify,
+    }
+
+
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import torch
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'torch_threads': torch.get_num_threads(),
+        'opencv_threads': cv2.getNumThreads(),
+        'backend': settings.yolo_backend,
+        'model_version': model_loader.model_version,
+        'inference_batch_size': settings.inference_batch_size,
+        'inference_workers': settings.inference_workers,
+        'tiled_inference': settings.tiled_inference,
+        'adaptive_inference': settings.adaptive_inference,
+    }
+
+
+def print_comparison(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['target'], r['case']): r for r in baseline['results']}
+    print(f"\nvs. {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for result in results:
+        old = previous.get((result['target'], result['case']))
+        if old is None:
+            continue
+        change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms']
+        print(
+            f"{result['target']:<26} {result['case']:<22} "
+            f"p50 {old['p50_ms']:>9.1f} -> {result['p50_ms']:>9.1f}ms ({change:+.0%})"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--resolutions', default=','.join(RESOLUTIONS),
+                        help=f"Comma-separated subset of {', '.join(RESOLUTIONS)}")
+    parser.add_argument('--targets', default=','.join(TARGETS),
+                        help=f"Comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument('--fixtures', help='Directory of photos to run at each resolution too')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Previous JSON output to print p50 changes against')
+    args = parser.parse_args()
+
+    if not Path(settings.yolo_model_path).exists():
+        sys.exit(f"Model file {settings.yolo_model_path} not found (set YOLO_MODEL_PATH)")
+
+    resolutions = [r.strip().lower() for r in args.resolutions.split(',')]
+    targets = [t.strip() for t in args.targets.split(',')]
+    unknown = [r for r in resolutions if r not in RESOLUTIONS] + [t for t in targets if t not in TARGETS]
+    if unknown:
+        sys.exit(f"Unknown resolution/target: {', '.join(unknown)}")
+
+    cases = image_cases(resolutions, args.fixtures)
+    results = []
+    with TestClient(app) as client:
+        detector = model_loader.get()
+        print(f"{len(cases)} image case(s), {args.iterations} iterations, "
+              f"backend={settings.yolo_backend} device={detector.device}")
+        print(f"{'target':<26} {'case':<22} {'p50':>9} {'p95':>9} {'p99':>9} "
+              f"{'per sec':>8} {'peak RSS':>9}")
+
+        for case, before, after in cases:
+            height, width = before.shape[:2]
+            runners = target_runners(client, detector, before, after, args.iterations)
+            for target in targets:
+                stats = measure(runners[target], args.iterations)
+                results.append({
+                    'target': target, 'case': case, 'width': width, 'height': height, **stats
+                })
+                print(
+                    f"{target:<26} {case:<22} {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms "
+                    f"{stats['p99_ms']:>7.1f}ms {stats['throughput_per_sec']:>8.2f} "
+                    f"{stats['peak_rss_mb']:>7.0f}MB"
+                )
+
+        meta = run_metadata()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
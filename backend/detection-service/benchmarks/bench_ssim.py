@@ -0,0 +1,116 @@
+"""
+Before/after SSIM benchmark: speed and score delta of the fast modes
+
+Compares the legacy path (skimage SSIM at the before image's native
+resolution) against compute_similarity at several analysis sizes.
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_ssim.py --fixtures path/to/pairs
+    python benchmarks/bench_ssim.py --width 4000 --height 3000
+
+A fixture directory holds pairs named <name>_before.jpg / <name>_after.jpg.
+Without one, synthetic pairs (noise, shift, cleaned patch, identical) are used.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from skimage.metrics import structural_similarity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_context import DecodedImage  # noqa: E402
+from utils.similarity import compute_similarity  # noqa: E402
+
+
+def legacy_similarity(before: DecodedImage, after: DecodedImage) -> float:
+    """SSIM exactly as compare_images computed it before the fast mode"""
+    height, width = before.bgr.shape[:2]
+    after_resized = cv2.resize(after.bgr, (width, height))
+    after_gray = cv2.cvtColor(after_resized, cv2.COLOR_BGR2GRAY)
+    score, _ = structural_similarity(before.gray, after_gray, full=True)
+    return float(score)
+
+
+def encode(image: np.ndarray) -> DecodedImage:
+    return DecodedImage(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+
+
+def synthetic_pairs(width: int, height: int) -> dict:
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    base = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+
+    noisy = np.clip(base.astype(np.int16) + rng.integers(-25, 25, base.shape), 0, 255).astype(np.uint8)
+    shifted = np.roll(base, (height // 50, width // 50), axis=(0, 1))
+    cleaned = base.copy()
+    cleaned[height // 3:2 * height // 3, width // 3:2 * width // 3] = 128
+
+    return {
+        'identical': (base, base),
+        'noise': (base, noisy),
+        'shift': (base, shifted),
+        'cleaned_patch': (base, cleaned),
+    }
+
+
+def load_fixture_pairs(directory: str) -> dict:
+    pairs = {}
+    for before_path in sorted(Path(directory).glob('*_before.*')):
+        name = before_path.name.rsplit('_before', 1)[0]
+        after_paths = list(before_path.parent.glob(f'{name}_after.*'))
+        if after_paths:
+            pairs[name] = (before_path.read_bytes(), after_paths[0].read_bytes())
+    return pairs
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    return value, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fixtures', help='Directory of *_before/*_after image pairs')
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--sizes', default='0,2048,1024,512')
+    args = parser.parse_args()
+
+    if args.fixtures:
+        pairs = {
+            name: (DecodedImage(before), DecodedImage(after))
+            for name, (before, after) in load_fixture_pairs(args.fixtures).items()
+        }
+    else:
+        pairs = {
+            name: (encode(before), encode(after))
+            for name, (before, after) in synthetic_pairs(args.width, args.height).items()
+        }
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    print(f"{'pair':<16} {'mode':<18} {'ssim':>7} {'delta':>8} {'ms':>9}")
+    for name, (before, after) in pairs.items():
+        # Decode outside the timed region; every mode shares it
+        before.gray, after.gray
+
+        reference, ms = timed(legacy_similarity, before, after)
+        print(f"{name:<16} {'legacy skimage':<18} {reference:>7.4f} {0:>8.4f} {ms:>9.1f}")
+
+        for method in ('skimage', 'opencv'):
+            for size in sizes:
+                score, ms = timed(
+                    compute_similarity, before, after,
+                    analysis_size=size, method=method
+                )
+                mode = f"{method}@{size or 'native'}"
+                print(f"{name:<16} {mode:<18} {score:>7.4f} {score - reference:>+8.4f} {ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
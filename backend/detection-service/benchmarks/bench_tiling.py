@@ -0,0 +1,141 @@
+"""
+Tiled inference benchmark: latency vs. recall of small objects in large photos
+
+Builds large canvases with several downscaled copies of reference photos
+pasted in, so each object is only a few dozen pixels tall. Ground truth is
+the model's own detections on each reference photo at full size, mapped to
+the pasted copies. Compares whole-frame inference with tiled inference at
+several tile sizes.
+
+Usage (from the detection-service directory):
+    python benchmarks/bench_tiling.py
+    python benchmarks/bench_tiling.py --photos a.jpg b.jpg --tile-sizes 640,1280 --overlap 0.2
+
+Without --photos, the sample images shipped with ultralytics are used.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.model_loader import model_loader  # noqa: E402
+from models.tiling import tile_grid  # noqa: E402
+
+detector = model_loader.get()
+
+
+def default_photos() -> list:
+    import ultralytics
+    assets = Path(ultralytics.__file__).parent / 'assets'
+    return sorted(str(p) for p in assets.glob('*.jpg'))
+
+
+def boxes_of(result) -> np.ndarray:
+    """(N, 6) rows of x1, y1, x2, y2, conf, cls"""
+    return result.boxes.data.cpu().numpy()[:, :6]
+
+
+def make_canvas(photos: list, width: int, height: int, copy_width: int, conf: float) -> tuple:
+    """Canvas with pasted photo copies, and the ground-truth boxes"""
+    rng = np.random.default_rng(0)
+    canvas = np.full((height, width, 3), 110, dtype=np.uint8)
+    canvas = np.clip(canvas + rng.normal(0, 6, canvas.shape), 0, 255).astype(np.uint8)
+
+    references = []
+    for path in photos:
+        photo = cv2.imread(path, cv2.IMREAD_COLOR)
+        references.append((photo, boxes_of(detector._predict([photo], conf)[0])))
+
+    truth = []
+    index = 0
+    for y in range(0, height, height // 3):
+        for x in range(0, width, width // 4):
+            photo, boxes = references[index % len(references)]
+            index += 1
+            scale = copy_width / photo.shape[1]
+            copy = cv2.resize(photo, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            h = min(copy.shape[0], height - y)
+            w = min(copy.shape[1], width - x)
+            canvas[y:y + h, x:x + w] = copy[:h, :w]
+
+            mapped = boxes.copy()
+            mapped[:, :4] = mapped[:, :4] * scale + np.array([x, y, x, y])
+            inside = (mapped[:, 2] <= x + w) & (mapped[:, 3] <= y + h)
+            truth.append(mapped[inside])
+    return canvas, np.concatenate(truth)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    width = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    height = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection)
+
+
+def recall(truth: np.ndarray, predicted: np.ndarray, iou: float = 0.5) -> float:
+    if len(truth) == 0:
+        return 1.0
+    if len(predicted) == 0:
+        return 0.0
+    same_class = truth[:, None, 5] == predicted[None, :, 5]
+    matched = ((iou_matrix(truth, predicted) >= iou) & same_class).any(axis=1)
+    return float(matched.mean())
+
+
+def timed(run, repeats: int) -> tuple:
+    result = run()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = run()
+    return result, (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--photos', nargs='*', help='Reference photos to paste')
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--copy-width', type=int, default=360,
+                        help='Width each pasted photo copy is scaled to')
+    parser.add_argument('--tile-sizes', default='640,960,1280')
+    parser.add_argument('--overlap', type=float, default=0.2)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    conf = detector.confidence_threshold
+    canvas, truth = make_canvas(
+        args.photos or default_photos(), args.width, args.height, args.copy_width, conf
+    )
+    if len(truth) == 0:
+        sys.exit("The model detected nothing in the reference photos; pass --photos with visible objects")
+    print(
+        f"{args.width}x{args.height} canvas, {len(truth)} ground-truth objects "
+        f"(median height {np.median(truth[:, 3] - truth[:, 1]):.0f}px), device={detector.device}"
+    )
+    print(f"{'mode':<22} {'tiles':>6} {'latency':>10} {'boxes':>6} {'recall':>7}")
+
+    result, latency = timed(lambda: detector._predict([canvas], conf)[0], args.repeats)
+    predicted = boxes_of(result)
+    print(f"{'full frame':<22} {1:>6} {latency:>8.0f}ms {len(predicted):>6} {recall(truth, predicted):>7.1%}")
+
+    for tile_size in (int(t) for t in args.tile_sizes.split(',')):
+        detector.enable_tiling(tile_size, args.overlap, min_megapixels=0)
+        tiles = len(tile_grid(args.width, args.height, tile_size, args.overlap))
+        result, latency = timed(lambda: detector._predict_tiled(canvas, conf), args.repeats)
+        predicted = boxes_of(result)
+        print(
+            f"{f'tiled {tile_size}px':<22} {tiles + 1:>6} {latency:>8.0f}ms "
+            f"{len(predicted):>6} {recall(truth, predicted):>7.1%}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Parity check between the torch backend and exported inference backends
+
+Runs YOLODetector.detect with each backend on the same images, matches
+detections by class and IoU, and fails (exit code 1) when detection counts
+differ or matched confidences drift by more than --conf-tolerance.
+
+Usage (from the detection-service directory, after python -m models.export):
+    python benchmarks/check_backend_parity.py --fixtures path/to/images \
+        --backends onnxruntime,torchscript
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.yolo_detector import YOLODetector  # noqa: E402
+from utils.image_context import DecodedImage  # noqa: E402
+
+
+def load_images(fixtures: str) -> dict:
+    if fixtures:
+        return {
+            path.name: DecodedImage(path.read_bytes())
+            for path in sorted(Path(fixtures).iterdir())
+            if path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp')
+        }
+
+    rng = np.random.default_rng(0)
+    images = {}
+    for width, height in ((640, 480), (1920, 1080)):
+        image = rng.integers(0, 256, size=(height // 16, width // 16, 3), dtype=np.uint8)
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_CUBIC)
+        images[f'synthetic_{width}x{height}'] = DecodedImage(cv2.imencode('.jpg', image)[1].tobytes())
+    return images
+
+
+def iou(a: dict, b: dict) -> float:
+    x1, y1 = max(a['x1'], b['x1']), max(a['y1'], b['y1'])
+    x2, y2 = min(a['x2'], b['x2']), min(a['y2'], b['y2'])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    area_a = (a['x2'] - a['x1']) * (a['y2'] - a['y1'])
+    area_b = (b['x2'] - b['x1']) * (b['y2'] - b['y1'])
+    union = area_a + area_b - inter
+    return inter / union if union else 0.0
+
+
+def compare(reference: list, candidate: list, iou_threshold: float) -> list:
+    """Confidence deltas of matched detections; None for unmatched ones"""
+    deltas = []
+    unmatched = list(candidate)
+    for ref in reference:
+        best = max(
+            (c for c in unmatched if c['issue_type'] == ref['issue_type']),
+            key=lambda c: iou(ref['bbox'], c['bbox']),
+            default=None
+        )
+        if best is None or iou(ref['bbox'], best['bbox']) < iou_threshold:
+            deltas.append(None)
+            continue
+        unmatched.remove(best)
+        deltas.append(abs(ref['confidence'] - best['confidence']))
+    deltas.extend(None for _ in unmatched)
+    return deltas
+
+
+def timed_detect(detector: YOLODetector, image: DecodedImage) -> tuple:
+    start = time.perf_counter()
+    result = detector.detect(image)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--weights', default='yolov8n.pt')
+    parser.add_argument('--fixtures', help='Directory of test images')
+    parser.add_argument('--backends', default='onnxruntime')
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou', type=float, default=0.9)
+    parser.add_argument('--conf-tolerance', type=float, default=0.02)
+    args = parser.parse_args()
+
+    images = load_images(args.fixtures)
+    reference = YOLODetector(args.weights, args.conf, backend='torch')
+
+    failed = False
+    for backend in args.backends.split(','):
+        candidate = YOLODetector(args.weights, args.conf, backend=backend.strip())
+        print(f"\n{backend}")
+        print(f"{'image':<28} {'torch':>6} {backend[:10]:>10} {'max dconf':>10} {'torch ms':>9} {'ms':>8}")
+
+        for name, image in images.items():
+            # Warm both backends before timing
+            reference.detect(image)
+            candidate.detect(image)
+
+            expected, ref_ms = timed_detect(reference, image)
+            actual, cand_ms = timed_detect(candidate, image)
+            deltas = compare(expected['detections'], actual['detections'], args.iou)
+
+            mismatch = any(d is None for d in deltas)
+            max_delta = max((d for d in deltas if d is not None), default=0.0)
+            if mismatch or max_delta > args.conf_tolerance:
+                failed = True
+
+            print(
+                f"{name:<28} {expected['num_detections']:>6} {actual['num_detections']:>10} "
+                f"{max_delta:>10.4f} {ref_ms:>9.1f} {cand_ms:>8.1f}"
+                f"{'  MISMATCH' if mismatch else ''}"
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import redis.asyncio as redis
+from config.settings import settings
+
+# Shared connection pool; timeouts keep a slow or unreachable Redis from
+# stalling requests (callers treat RedisError as "Redis unavailable")
+redis_pool = redis.ConnectionPool(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    password=settings.redis_password or None,
+    db=settings.redis_db,
+    max_connections=settings.redis_max_connections,
+    socket_timeout=settings.redis_socket_timeout,
+    socket_connect_timeout=settings.redis_connect_timeout,
+    decode_responses=True
+)
+
+redis_client = redis.Redis(connection_pool=redis_pool)
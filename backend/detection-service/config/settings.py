@@ -0,0 +1,127 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Detection service configuration, read from environment variables / .env
+    """
+
+    model_config = SettingsConfigDict(
+        env_file='.env',
+        extra='ignore',
+        # model_preload / model_warmup_* are ours, not pydantic's
+        protected_namespaces=('settings_',)
+    )
+
+    # Redis
+    redis_host: str = 'localhost'
+    redis_port: int = 6379
+    redis_password: str = ''
+    redis_db: int = 0
+    redis_max_connections: int = 20
+    redis_socket_timeout: float = 0.5
+    redis_connect_timeout: float = 0.5
+
+    # Uploads
+    max_upload_mb: int = 10
+    max_image_megapixels: float = 50.0
+
+    # Service area: GeoJSON Polygon/MultiPolygon features (state or ward
+    # boundaries); empty falls back to the Rajasthan bounding box
+    service_area_geojson: str = ''
+    service_area_id_property: str = 'id'
+
+    # YOLO model
+    yolo_model_path: str = 'yolov8n.pt'
+    yolo_backend: str = 'torch'
+    yolo_confidence_threshold: float = 0.5
+
+    # Model lifecycle
+    model_preload: bool = True
+    model_warmup_iterations: int = 2
+    model_warmup_width: int = 1280
+    model_warmup_height: int = 720
+
+    # Model version used in result cache keys; empty = fingerprint of the
+    # model file, so an upgraded model never serves stale results
+    model_version: str = ''
+
+    # Detection result cache (0 entries disables it; 0 TTL keeps it in-process)
+    result_cache_size: int = 1024
+    result_cache_ttl_seconds: int = 3600
+
+    # Inference executor
+    inference_workers: int = 2
+    inference_queue_size: int = 8
+    inference_retry_after_seconds: int = 5
+
+    # Prefork serving (python serve.py): workers forked after the model is
+    # loaded share its weights; 0 threads = CPU cores split across workers.
+    # X-Forwarded-For is trusted only from serve_forwarded_allow_ips
+    serve_host: str = '0.0.0.0'
+    serve_port: int = 3002
+    serve_workers: int = 1
+    serve_threads_per_worker: int = 0
+    serve_forwarded_allow_ips: str = '127.0.0.1'
+
+    # Dynamic micro-batching (batch size 1 disables it)
+    inference_batch_size: int = 1
+    inference_batch_max_wait_ms: float = 10.0
+
+    # Sliced inference for large photos (tiles plus the full frame, one batch)
+    tiled_inference: bool = False
+    tile_size: int = 1280
+    tile_overlap: float = 0.2
+    tile_min_megapixels: float = 4.0
+
+    # Adaptive inference: low-resolution preview, escalated when inconclusive
+    adaptive_inference: bool = False
+    adaptive_preview_size: int = 320
+    adaptive_confidence_band: float = 0.1
+    adaptive_full_size: int = 640
+
+    # Bulk detection (/detect/batch and python -m models.bulk_detection)
+    bulk_batch_size: int = 8
+    bulk_decode_workers: int = 2
+    bulk_max_jobs: int = 1
+    bulk_max_mb: int = 200
+
+    # Before/after similarity
+    ssim_analysis_size: int = 1024
+    ssim_method: str = 'opencv'
+    ssim_gaussian_weights: bool = False
+
+    # Video detection (/detect/video and python -m models.video_detection)
+    max_video_mb: int = 500
+    video_sample_interval_seconds: float = 0.5
+    video_scene_threshold: float = 0.0
+    video_max_interval_seconds: float = 2.0
+    video_track_max_gap_seconds: float = 1.5
+    video_track_min_frames: int = 2
+
+    # /detect submission limits (sliding window per device / client IP; 0 disables)
+    device_rate_limit: int = 30
+    device_rate_window_seconds: int = 3600
+    ip_rate_limit: int = 0
+    ip_rate_window_seconds: int = 3600
+    rate_limit_local_cache_size: int = 10000
+
+    # Image forensics (manipulation check and fraud indicators): longest
+    # side of the analysis thumbnail, whether to run error level analysis
+    # and the JPEG quality of its re-encode
+    forensics_analysis_size: int = 640
+    forensics_ela: bool = True
+    forensics_ela_quality: int = 90
+
+    # Near-duplicate detection (Hamming radius on 64-bit perceptual hashes)
+    duplicate_hash_radius: int = 6
+
+    # Nearby-report lookup (different photos of the same spot)
+    nearby_radius_meters: float = 50.0
+    nearby_window_minutes: int = 60
+
+    # Observability: per-stage Server-Timing header on responses
+    timing_header: bool = False
+
+
+settings = Settings()
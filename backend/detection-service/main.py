@@ -1,7 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes.detection import router as detection_router
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from routes.detection import (
+    router as detection_router, result_cache, rate_limiter, backfill_submission_indexes
+)
+from models.inference_executor import inference_executor
+from models.model_loader import model_loader
+from config.settings import settings
+from config.redis import redis_pool
+from utils.upload_limits import BodySizeLimitMiddleware, peak_rss_mb
+from utils.gps_validator import get_service_area
+from utils.metrics import StatsCollector, scrape_registry
+import asyncio
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(
@@ -28,9 +41,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap request bodies before multipart parsing (form fields need a little
+# room on top of the images)
+_max_upload_bytes = settings.max_upload_mb * 1024 * 1024
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/api/v1/issues/detect": _max_upload_bytes + 64 * 1024,
+        "/api/v1/issues/verify-completion": 2 * _max_upload_bytes + 64 * 1024,
+        "/api/v1/issues/detect/batch": settings.bulk_max_mb * 1024 * 1024,
+        # Room for a GPS sidecar next to the video
+        "/api/v1/issues/detect/video": (settings.max_video_mb + 1) * 1024 * 1024,
+    }
+)
+
 # Include routers
 app.include_router(detection_router)
 
+# Queue, cache and batcher state, read when /metrics is scraped
+stats_collectors = [
+    StatsCollector(
+        'inference_executor', inference_executor.stats, counters=['rejected_total']
+    ),
+    StatsCollector(
+        'result_cache', result_cache.stats, counters=['local_hits', 'redis_hits', 'misses']
+    ),
+    StatsCollector(
+        'yolo_batcher', model_loader.batching_stats, counters=['batches_total', 'images_total']
+    ),
+    StatsCollector(
+        'rate_limiter', rate_limiter.stats,
+        counters=['local_rejections_total', 'redis_rejections_total']
+    ),
+    StatsCollector(
+        'yolo_adaptive', model_loader.adaptive_stats, counters=[
+            'previews_total', 'escalations_total',
+            'escalated_no_detections_total', 'escalated_low_confidence_total'
+        ]
+    ),
+]
+for collector in stats_collectors:
+    REGISTRY.register(collector)
+
 
 @app.get("/health")
 async def health_check():
@@ -39,21 +91,67 @@ async def health_check():
         "success": True,
         "message": "Detection Service is healthy",
         "service": "detection-service",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "inference_queue": inference_executor.stats(),
+        "result_cache": result_cache.stats(),
+        "adaptive_inference": model_loader.adaptive_stats(),
+        "worker_pid": os.getpid(),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once the model is loaded and warmed up"""
+    model_status = model_loader.stats()
+    return JSONResponse(
+        status_code=200 if model_status['ready'] else 503,
+        content={
+            "success": model_status['ready'],
+            "service": "detection-service",
+            "model": model_status
+        }
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latency histograms, inference and queue state"""
+    registry = scrape_registry(stats_collectors)
+    return Response(
+        content=generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST}
+    )
+
+
 @app.on_event("startup")
 async def startup_event():
     """Startup event handler"""
     logger.info("Detection Service starting up...")
-    logger.info("YOLOv8 model loaded and ready")
+    
+    # Build the service area polygon index before the first submission
+    get_service_area()
+    
+    # Load submissions stored by other pods in the background; /detect only
+    # pulls what is new since startup
+    app.state.backfill_task = asyncio.create_task(backfill_submission_indexes())
+    
+    if settings.model_preload:
+        # Load and warm up off the event loop; /health answers meanwhile
+        # and /ready flips to 200 when the model can serve traffic
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(None, model_loader.load_and_warm_up)
+    else:
+        model_loader.ready = True
+        logger.info("YOLOv8 model will be loaded on first request")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event handler"""
     logger.info("Detection Service shutting down...")
+    app.state.backfill_task.cancel()
+    inference_executor.shutdown()
+    await redis_pool.disconnect()
 
 
 if __name__ == "__main__":
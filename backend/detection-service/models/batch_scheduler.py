@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchRequest:
+    __slots__ = ('image', 'conf_threshold', 'future')
+
+    def __init__(self, image: np.ndarray, conf_threshold: float):
+        self.image = image
+        self.conf_threshold = conf_threshold
+        self.future = Future()
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batcher for YOLO inference
+
+    Callers on any thread submit a single image and block until its result
+    is ready. A dispatcher thread gathers pending images for up to
+    ``max_wait_ms`` or ``max_batch_size`` images, runs one batched predict
+    per confidence threshold and scatters the results back to the callers.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[np.ndarray], float], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0
+    ):
+        """
+        Args:
+            predict_fn: Batched predict taking (images, conf_threshold)
+            max_batch_size: Maximum images per batch
+            max_wait_ms: Maximum time the first image waits for company
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._batches = 0
+        self._images = 0
+        self._last_batch_size = 0
+
+        self._thread = threading.Thread(
+            target=self._dispatch_loop,
+            name='inference-batcher',
+            daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, image: np.ndarray, conf_threshold: float) -> Any:
+        """
+        Queue one image for batched inference and wait for its result
+
+        Args:
+            image: Decoded BGR image
+            conf_threshold: Minimum confidence for detections
+
+        Returns:
+            Prediction result for this image
+        """
+        request = _BatchRequest(image, conf_threshold)
+        self._queue.put(request)
+        return request.future.result()
+
+    def submit_many(self, images: List[np.ndarray], conf_threshold: float) -> List[Any]:
+        """
+        Queue several images together and wait for all of their results
+
+        The images are queued back to back, so they usually share a batch
+        with each other and with whatever else is pending.
+
+        Args:
+            images: Decoded BGR images
+            conf_threshold: Minimum confidence for detections
+
+        Returns:
+            Prediction results, in input order
+        """
+        requests = [_BatchRequest(image, conf_threshold) for image in images]
+        for request in requests:
+            self._queue.put(request)
+        return [request.future.result() for request in requests]
+
+    def _dispatch_loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch: List[_BatchRequest]):
+        # Requests with different thresholds cannot share a predict call
+        groups: Dict[float, List[_BatchRequest]] = {}
+        for request in batch:
+            groups.setdefault(request.conf_threshold, []).append(request)
+
+        for conf_threshold, requests in groups.items():
+            try:
+                results = self.predict_fn(
+                    [request.image for request in requests],
+                    conf_threshold
+                )
+            except Exception as e:
+                logger.error(f"Batched inference error: {e}")
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+
+            for request, result in zip(requests, results):
+                request.future.set_result(result)
+
+            self._batches += 1
+            self._images += len(requests)
+            self._last_batch_size = len(requests)
+
+    def stats(self) -> Dict:
+        """Batching counters since startup"""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches_total': self._batches,
+            'images_total': self._images,
+            'last_batch_size': self._last_batch_size,
+            'mean_batch_size': round(self._images / self._batches, 2) if self._batches else 0.0
+        }
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join()
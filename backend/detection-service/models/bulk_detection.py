@@ -0,0 +1,253 @@
+"""
+Bulk detection over many images: directory, tarball or uploaded batch
+
+Usage (from the detection-service directory):
+    python -m models.bulk_detection /data/backlog --batch-size 8 --output results.ndjson
+    python -m models.bulk_detection backlog.tar.gz
+
+Images are streamed through decode -> validate -> batched YOLO inference ->
+fraud scoring, and one JSON line is emitted per image as soon as its batch
+finishes, followed by a summary line with throughput.
+"""
+import argparse
+import json
+import os
+import sys
+import tarfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+from utils.image_context import DecodedImage
+from utils.image_validator import validate_image, check_image_manipulation
+from utils.fraud_scoring import get_risk_level
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# (filename, raw bytes); bytes is None for a file over the size limit,
+# which is reported as a per-image error without being read
+BulkItem = Tuple[str, Optional[bytes]]
+
+
+def iter_directory(path: str, max_bytes: Optional[int] = None) -> Iterator[BulkItem]:
+    """Yield image files below a directory, in sorted order, one at a time"""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                file_path = os.path.join(root, name)
+                relative = os.path.relpath(file_path, path)
+                if max_bytes is not None and os.path.getsize(file_path) > max_bytes:
+                    yield relative, None
+                    continue
+                with open(file_path, 'rb') as f:
+                    yield relative, f.read()
+
+
+def iter_tarball(fileobj: BinaryIO, max_bytes: Optional[int] = None) -> Iterator[BulkItem]:
+    """
+    Yield image members of a (optionally compressed) tar stream
+
+    The archive is read sequentially ('r|*'), so it never has to fit in
+    memory or be seekable; only the current member is held, and members
+    larger than max_bytes (per their header) are skipped unread.
+    """
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if max_bytes is not None and member.size > max_bytes:
+                yield member.name, None
+                continue
+            f = archive.extractfile(member)
+            if f is not None:
+                yield member.name, f.read()
+
+
+def iter_path(path: str, max_bytes: Optional[int] = None) -> Iterator[BulkItem]:
+    """Yield images from a directory or a tarball path"""
+    if os.path.isdir(path):
+        yield from iter_directory(path, max_bytes)
+    else:
+        with open(path, 'rb') as f:
+            yield from iter_tarball(f, max_bytes)
+
+
+class BulkDetector:
+    """
+    Streaming batch pipeline on top of a YOLODetector
+
+    Pre-processing (decode, validation, manipulation checks) of the next
+    batch runs on a small thread pool while the current batch is in the
+    model, so at most two batches of decoded images are alive at a time
+    whatever the size of the input.
+    """
+
+    def __init__(self, detector, batch_size: int = 8, decode_workers: int = 2):
+        """
+        Args:
+            detector: YOLODetector used for batched inference
+            batch_size: Images per YOLO forward pass
+            decode_workers: Threads decoding and validating images
+        """
+        self.detector = detector
+        self.batch_size = batch_size
+        self.decode_workers = decode_workers
+
+    def run(self, items: Iterable[BulkItem]) -> Iterator[Dict]:
+        """
+        Process images and yield one result dict per image, in input order,
+        then a final summary dict ('type': 'summary')
+
+        Args:
+            items: (filename, bytes) pairs, consumed lazily
+        """
+        start = time.perf_counter()
+        processed = 0
+        failed = 0
+
+        with ThreadPoolExecutor(
+            max_workers=self.decode_workers,
+            thread_name_prefix='bulk-decode'
+        ) as pool:
+            pending: Optional[List[Future]] = None
+            index = 0
+            for batch in _chunked(items, self.batch_size):
+                prepared = []
+                for filename, image_bytes in batch:
+                    prepared.append(pool.submit(_prepare, index, filename, image_bytes))
+                    index += 1
+                # Queue the next batch's decoding before blocking on inference
+                if pending is not None:
+                    for result in self._finish(pending):
+                        processed += 1
+                        failed += not result['success']
+                        yield result
+                pending = prepared
+
+            if pending is not None:
+                for result in self._finish(pending):
+                    processed += 1
+                    failed += not result['success']
+                    yield result
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            'type': 'summary',
+            'images': processed,
+            'failed': failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'images_per_sec': round(processed / elapsed, 2) if elapsed > 0 else 0.0
+        }
+        logger.info(
+            f"Bulk detection completed - Images: {processed}, Failed: {failed}, "
+            f"{summary['images_per_sec']} images/sec"
+        )
+        yield summary
+
+    def _finish(self, prepared: List[Future]) -> List[Dict]:
+        """Run one batched inference over the valid images of a batch"""
+        entries = [future.result() for future in prepared]
+        valid = [entry for entry in entries if entry['success']]
+
+        if valid:
+            try:
+                detections = self.detector.detect_batch([entry.pop('image') for entry in valid])
+            except Exception as e:
+                logger.error(f"Bulk batch inference failed: {e}")
+                for entry in valid:
+                    entry.update(success=False, error=f"Detection failed: {e}")
+            else:
+                for entry, detection in zip(valid, detections):
+                    entry['detection'] = detection
+                    entry['fraud_assessment'] = _fraud_assessment(
+                        detection, entry['manipulation']
+                    )
+
+        for entry in entries:
+            entry.pop('image', None)
+        return entries
+
+
+def _prepare(index: int, filename: str, image_bytes: Optional[bytes]) -> Dict:
+    """Decode and check one image; the DecodedImage travels in 'image'"""
+    entry = {'type': 'result', 'index': index, 'filename': filename, 'success': False}
+    if image_bytes is None:
+        entry['error'] = f"Image validation failed: Image size exceeds {settings.max_upload_mb}MB limit"
+        return entry
+    try:
+        image = DecodedImage(image_bytes)
+        validation = validate_image(image, filename)
+        if not validation['valid']:
+            entry['error'] = f"Image validation failed: {validation['error']}"
+            return entry
+
+        entry['manipulation'] = check_image_manipulation(image)
+        entry['image'] = image
+        entry['success'] = True
+    except Exception as e:
+        entry['error'] = str(e)
+    return entry
+
+
+def _fraud_assessment(detection: Dict, manipulation: Dict) -> Dict:
+    """Image-only fraud score (no GPS, device or EXIF context in bulk mode)"""
+    risk_factors = list(detection['fraud_indicators'])
+    risk_score = detection['fraud_risk_score']
+    if manipulation['manipulated']:
+        risk_factors.insert(0, 'Image manipulation detected')
+        risk_score += 0.3
+    risk_score = min(1.0, risk_score)
+    return {
+        'risk_score': round(risk_score, 2),
+        'risk_level': get_risk_level(risk_score),
+        'risk_factors': risk_factors
+    }
+
+
+def _chunked(items: Iterable[BulkItem], size: int) -> Iterator[List[BulkItem]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    from models.model_loader import model_loader
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='Directory of images or tar(.gz) archive')
+    parser.add_argument('--batch-size', type=int, default=settings.bulk_batch_size)
+    parser.add_argument('--workers', type=int, default=settings.bulk_decode_workers,
+                        help='Decode/validation threads')
+    parser.add_argument('--output', help='NDJSON output file (default: stdout)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    bulk = BulkDetector(model_loader.get(), args.batch_size, args.workers)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in bulk.run(iter_path(args.input, settings.max_upload_mb * 1024 * 1024)):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            if result['type'] == 'summary':
+                print(
+                    f"{result['images']} images ({result['failed']} failed) in "
+                    f"{result['elapsed_seconds']}s: {result['images_per_sec']} images/sec",
+                    file=sys.stderr
+                )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
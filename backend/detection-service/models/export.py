@@ -0,0 +1,67 @@
+"""
+Export YOLOv8 weights for the non-torch inference backends
+
+Usage (from the detection-service directory):
+    python -m models.export --weights yolov8n.pt --backends onnxruntime,torchscript
+
+The exports are written next to the weights with the file names
+YOLODetector.resolve_model_path expects (yolov8n.onnx, yolov8n.torchscript,
+yolov8n_openvino_model/).
+"""
+import argparse
+import logging
+from ultralytics import YOLO
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kept in sync with YOLODetector.BACKENDS
+EXPORT_FORMATS = {
+    'onnxruntime': {'format': 'onnx', 'dynamic': True},
+    'torchscript': {'format': 'torchscript', 'dynamic': False},
+    'openvino': {'format': 'openvino', 'dynamic': False}
+}
+
+
+def export_model(weights: str, backend: str, imgsz: int = 640) -> str:
+    """
+    Export .pt weights into the format used by a backend
+
+    Args:
+        weights: Path to YOLOv8 .pt weights
+        backend: Target backend, one of EXPORT_FORMATS
+        imgsz: Input size baked into static exports
+
+    Returns:
+        Path of the exported model
+    """
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export backend '{backend}'. Allowed: {list(EXPORT_FORMATS)}"
+        )
+
+    options = EXPORT_FORMATS[backend]
+    model = YOLO(weights)
+    exported = model.export(
+        format=options['format'],
+        dynamic=options['dynamic'],
+        imgsz=imgsz,
+        device='cpu'
+    )
+    logger.info(f"Exported {weights} for {backend}: {exported}")
+    return str(exported)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--weights', default='yolov8n.pt')
+    parser.add_argument('--backends', default='onnxruntime')
+    parser.add_argument('--imgsz', type=int, default=640)
+    args = parser.parse_args()
+
+    for backend in args.backends.split(','):
+        export_model(args.weights, backend.strip(), args.imgsz)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+import logging
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """
+    Raised when the inference executor cannot accept more work
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for CPU-bound detection work
+
+    Keeps OpenCV, SSIM and YOLO inference off the asyncio event loop.
+    At most ``max_workers`` jobs run at once and at most ``max_queue_size``
+    more may wait; beyond that, submissions are rejected immediately with
+    InferenceQueueFull so callers can shed load instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue_size: int = 8,
+        retry_after: int = 5
+    ):
+        """
+        Args:
+            max_workers: Number of worker threads
+            max_queue_size: Jobs allowed to wait for a free worker
+            retry_after: Seconds clients should wait after a rejection
+        """
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='inference'
+        )
+        self._pending = 0
+        self._rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs currently running or waiting"""
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker"""
+        return max(0, self._pending - self.max_workers)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool and await its result
+
+        Raises:
+            InferenceQueueFull: If the pool and its queue are saturated
+        """
+        if self._pending >= self.max_workers + self.max_queue_size:
+            self._rejected += 1
+            logger.warning(
+                f"Inference queue full ({self.queue_depth} waiting), rejecting request"
+            )
+            raise InferenceQueueFull(self.retry_after)
+
+        # Counter is only touched from the event loop thread
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool,
+                partial(func, *args, **kwargs)
+            )
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> Dict:
+        """Snapshot of executor load"""
+        return {
+            'workers': self.max_workers,
+            'max_queue_size': self.max_queue_size,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'rejected_total': self._rejected
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def executor_workers() -> int:
+    """
+    Executor threads: INFERENCE_WORKERS, raised to the micro-batch size when
+    batching is on, since the batcher can only group requests that are
+    already running on executor threads
+    """
+    if settings.inference_batch_size > settings.inference_workers:
+        logger.info(
+            f"Raising inference workers from {settings.inference_workers} to "
+            f"{settings.inference_batch_size} to match the micro-batch size"
+        )
+        return settings.inference_batch_size
+    return settings.inference_workers
+
+
+# Create singleton instance
+inference_executor = InferenceExecutor(
+    max_workers=executor_workers(),
+    max_queue_size=settings.inference_queue_size,
+    retry_after=settings.inference_retry_after_seconds
+)
@@ -0,0 +1,213 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import logging
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    """
+    Managed lifecycle for the YOLO detector
+
+    Nothing heavy happens at import time: torch, ultralytics and the weights
+    are loaded on the first get() call, or ahead of traffic by
+    load_and_warm_up() from the startup hook. The loader is ready once the
+    model is loaded and the warm-up inferences have run. Workers forked by
+    serve.py from a parent that already did both only mark themselves ready.
+    """
+
+    def __init__(self):
+        self._detector = None
+        self._lock = threading.Lock()
+        self._created_at = time.monotonic()
+
+        self.ready = False
+        self.preloaded = False
+        self.error: Optional[str] = None
+        self.model_version: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.cold_start_seconds: Optional[float] = None
+
+    def get(self):
+        """
+        Return the detector, loading it on first use
+
+        Returns:
+            YOLODetector instance
+        """
+        if self._detector is None:
+            self.load()
+        return self._detector
+
+    def load(self):
+        """
+        Load the detector once; concurrent callers wait for the same load
+        """
+        with self._lock:
+            if self._detector is not None:
+                return self._detector
+
+            start = time.monotonic()
+            try:
+                # Deferred so importing routes does not pull in torch/ultralytics
+                from models.yolo_detector import YOLODetector
+
+                detector = YOLODetector(
+                    model_path=settings.yolo_model_path,
+                    confidence_threshold=settings.yolo_confidence_threshold,
+                    backend=settings.yolo_backend
+                )
+                if settings.inference_batch_size > 1:
+                    detector.enable_batching(
+                        settings.inference_batch_size,
+                        settings.inference_batch_max_wait_ms
+                    )
+                if settings.tiled_inference:
+                    detector.enable_tiling(
+                        settings.tile_size,
+                        settings.tile_overlap,
+                        settings.tile_min_megapixels
+                    )
+                if settings.adaptive_inference:
+                    detector.enable_adaptive(
+                        settings.adaptive_preview_size,
+                        settings.adaptive_confidence_band,
+                        settings.adaptive_full_size
+                    )
+            except Exception as e:
+                self.error = str(e)
+                raise
+
+            self.load_seconds = time.monotonic() - start
+            self.error = None
+            self.model_version = (settings.model_version or _fingerprint(
+                detector.model_path, detector.backend
+            )) + detector.inference_signature
+            self._detector = detector
+            logger.info(f"YOLOv8 model loaded in {self.load_seconds:.2f}s")
+            return detector
+
+    def warm_up(self, iterations: int, width: int, height: int):
+        """
+        Run throwaway inferences so the first real request does not pay
+        for lazy initialisation, JIT and allocator growth
+
+        Args:
+            iterations: Number of warm-up inferences
+            width: Warm-up image width
+            height: Warm-up image height
+        """
+        detector = self.get()
+        image = np.full((height, width, 3), 114, dtype=np.uint8)
+
+        start = time.monotonic()
+        for _ in range(iterations):
+            detector._predict([image], detector.confidence_threshold)
+        self.warmup_seconds = time.monotonic() - start
+
+        logger.info(
+            f"YOLOv8 warm-up done: {iterations} inference(s) at "
+            f"{width}x{height} in {self.warmup_seconds:.2f}s"
+        )
+
+    def load_and_warm_up(self):
+        """
+        Load and warm up the model, then mark the loader ready
+
+        A forked worker whose parent preloaded the model skips both: the
+        weights, fused layers and warmed allocator are already in its memory.
+        """
+        try:
+            if not self.preloaded:
+                self.load()
+                self.warm_up(
+                    settings.model_warmup_iterations,
+                    settings.model_warmup_width,
+                    settings.model_warmup_height
+                )
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Model startup failed: {e}")
+            return
+
+        self.ready = True
+        self.cold_start_seconds = time.monotonic() - self._created_at
+        logger.info(f"YOLOv8 model ready ({self.cold_start_seconds:.2f}s after start)")
+
+    def after_fork(self, num_threads: int):
+        """
+        Prepare a forked worker: fresh lock, per-worker thread counts, and a
+        detector (if the parent loaded one) with its threads restarted
+
+        Args:
+            num_threads: torch and OpenCV threads for this worker
+        """
+        import cv2
+
+        self._lock = threading.Lock()
+        cv2.setNumThreads(num_threads)
+        if self._detector is not None:
+            self._detector.after_fork(num_threads)
+        self.preloaded = self._detector is not None and self.warmup_seconds is not None
+
+    def detect(self, *args, **kwargs) -> Dict:
+        """YOLODetector.detect on the managed detector"""
+        return self.get().detect(*args, **kwargs)
+
+    def compare_images(self, *args, **kwargs) -> Dict:
+        """YOLODetector.compare_images on the managed detector"""
+        return self.get().compare_images(*args, **kwargs)
+
+    def batching_stats(self) -> Dict:
+        """Micro-batch scheduler counters, empty while unloaded or unbatched"""
+        if self._detector is None or self._detector.scheduler is None:
+            return {}
+        return self._detector.scheduler.stats()
+
+    def adaptive_stats(self) -> Dict:
+        """Preview escalation counters, empty while unloaded or not adaptive"""
+        if self._detector is None:
+            return {}
+        return self._detector.adaptive_stats()
+
+    def stats(self) -> Dict:
+        """Lifecycle state and timings for the readiness endpoint"""
+        return {
+            'ready': self.ready,
+            'loaded': self._detector is not None,
+            'backend': settings.yolo_backend,
+            'model_version': self.model_version,
+            'load_seconds': _rounded(self.load_seconds),
+            'warmup_seconds': _rounded(self.warmup_seconds),
+            'cold_start_seconds': _rounded(self.cold_start_seconds),
+            'error': self.error
+        }
+
+
+def _fingerprint(model_path: str, backend: str) -> str:
+    """
+    Version string derived from the model file contents (all files of an
+    export directory), e.g. 'torch:yolov8n:3f2a9c01d4e5'
+    """
+    path = Path(model_path)
+    digest = hashlib.sha256()
+    files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+    for file in files:
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return f"{backend}:{path.stem}:{digest.hexdigest()[:12]}"
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+# Create singleton instance (the model itself is loaded on demand)
+model_loader = ModelLoader()
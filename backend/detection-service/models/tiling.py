@@ -0,0 +1,102 @@
+"""
+Sliced inference helpers: overlapping tile grids and cross-tile box merging
+
+Small issues in large photos (a pothole or crack in a 12MP frame) shrink to
+a few pixels when the whole image is letterboxed to the model input size.
+Running the model on overlapping tiles at native resolution keeps them
+visible; the per-tile boxes are then shifted back to image coordinates and
+duplicates from the overlaps are merged.
+"""
+from typing import List, Tuple
+import numpy as np
+
+
+def tile_starts(length: int, tile_size: int, overlap: float) -> List[int]:
+    """
+    Start offsets along one axis so tiles cover [0, length) with overlap
+
+    The last tile is aligned to the far edge instead of running past it.
+
+    Args:
+        length: Image extent along the axis
+        tile_size: Tile extent along the axis
+        overlap: Fraction of tile_size shared by neighbouring tiles
+
+    Returns:
+        Sorted start offsets
+    """
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_grid(
+    width: int,
+    height: int,
+    tile_size: int,
+    overlap: float
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Overlapping tiles covering an image
+
+    Args:
+        width: Image width
+        height: Image height
+        tile_size: Tile width and height (clipped to the image)
+        overlap: Fraction of tile_size shared by neighbouring tiles
+
+    Returns:
+        List of (x1, y1, x2, y2) tile windows
+    """
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in tile_starts(height, tile_size, overlap)
+        for x in tile_starts(width, tile_size, overlap)
+    ]
+
+
+def merge_boxes(
+    xyxy: np.ndarray,
+    confidences: np.ndarray,
+    class_ids: np.ndarray,
+    match_threshold: float = 0.5
+) -> np.ndarray:
+    """
+    Class-aware greedy suppression of duplicate boxes from overlapping tiles
+
+    Matches on intersection over the smaller box rather than IoU: an object
+    cut by a tile edge yields a partial box that lies almost entirely inside
+    the full box from the neighbouring tile, yet has a low IoU with it.
+
+    Args:
+        xyxy: (N, 4) boxes in image coordinates
+        confidences: (N,) confidences
+        class_ids: (N,) class ids
+        match_threshold: Intersection / smaller area above which the lower
+            confidence box of the same class is dropped
+
+    Returns:
+        Indices of the kept boxes, highest confidence first
+    """
+    if len(xyxy) == 0:
+        return np.zeros(0, dtype=int)
+
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    order = np.argsort(-confidences, kind='stable')
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+
+        width = np.minimum(xyxy[best, 2], xyxy[rest, 2]) - np.maximum(xyxy[best, 0], xyxy[rest, 0])
+        height = np.minimum(xyxy[best, 3], xyxy[rest, 3]) - np.maximum(xyxy[best, 1], xyxy[rest, 1])
+        intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+        smaller = np.maximum(np.minimum(areas[best], areas[rest]), 1e-9)
+
+        duplicate = (class_ids[rest] == class_ids[best]) & (intersection / smaller > match_threshold)
+        order = rest[~duplicate]
+    return np.array(keep, dtype=int)
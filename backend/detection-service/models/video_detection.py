@@ -0,0 +1,505 @@
+"""
+Video detection: dashcam / survey videos to one issue per physical object
+
+Usage (from the detection-service directory):
+    python -m models.video_detection survey.mp4 --output issues.ndjson
+    python -m models.video_detection survey.mp4 --gps survey.gpx --interval 0.25 --scene-threshold 8
+
+Frames are decoded as a stream and sampled by time (and optionally only
+when the scene changed), run through YOLO in batches, and detections of the
+same object in consecutive samples are merged into a track. One JSON line is
+emitted per object as soon as its track ends, with the best frame and, given
+a GPS sidecar, the interpolated location; a summary line with frames/sec
+follows. Memory stays bounded by the batch size and the open tracks,
+whatever the length of the video.
+"""
+import argparse
+import base64
+import csv
+import json
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import cv2
+import numpy as np
+import logging
+from utils.image_context import DecodedImage
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+# (frame index, timestamp in seconds, BGR frame)
+Frame = Tuple[int, float, np.ndarray]
+
+# Scene-change thumbnails are compared at this size
+_THUMBNAIL_SIZE = (64, 36)
+
+# Best frames kept for the response are scaled down to this width
+_BEST_FRAME_WIDTH = 1280
+
+
+class FrameSampler:
+    """
+    Streaming frame sampler over a video file
+
+    Frames are grabbed one by one and only those picked are decoded, so a
+    long video costs one frame of memory. A frame is picked every
+    ``interval_s``; with a scene threshold, a picked frame is dropped again
+    when it barely differs from the last kept one (e.g. waiting at a
+    signal), unless ``max_interval_s`` has passed since.
+    """
+
+    def __init__(
+        self,
+        interval_s: float = 0.5,
+        scene_threshold: float = 0.0,
+        max_interval_s: float = 2.0
+    ):
+        """
+        Args:
+            interval_s: Seconds between sampled frames
+            scene_threshold: Mean absolute grayscale difference (0-255) to
+                the last kept frame below which a sample is skipped
+                (0 keeps every sample)
+            max_interval_s: Longest gap between kept frames
+        """
+        self.interval_s = interval_s
+        self.scene_threshold = scene_threshold
+        self.max_interval_s = max_interval_s
+        self.frames_read = 0
+        self.frames_sampled = 0
+        self.duration_s = 0.0
+
+    def frames(self, path: str) -> Iterator[Frame]:
+        """
+        Yield sampled frames of a video file in order
+
+        Raises:
+            ValueError: If the file cannot be opened as a video
+        """
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise ValueError("Failed to open video")
+        fps = capture.get(cv2.CAP_PROP_FPS)
+
+        try:
+            next_sample = 0.0
+            last_kept_time = None
+            last_thumbnail = None
+            index = -1
+            while capture.grab():
+                index += 1
+                self.frames_read += 1
+                timestamp = index / fps if fps > 0 else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                self.duration_s = timestamp
+                if timestamp < next_sample:
+                    continue
+                next_sample = timestamp + self.interval_s
+
+                ok, frame = capture.retrieve()
+                if not ok:
+                    continue
+
+                if self.scene_threshold > 0:
+                    thumbnail = cv2.resize(
+                        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), _THUMBNAIL_SIZE,
+                        interpolation=cv2.INTER_AREA
+                    ).astype(np.float32)
+                    if (
+                        last_thumbnail is not None and
+                        timestamp - last_kept_time < self.max_interval_s and
+                        np.mean(np.abs(thumbnail - last_thumbnail)) < self.scene_threshold
+                    ):
+                        continue
+                    last_thumbnail = thumbnail
+
+                last_kept_time = timestamp
+                self.frames_sampled += 1
+                yield index, timestamp, frame
+        finally:
+            capture.release()
+
+
+class GpsTrack:
+    """
+    GPS sidecar track, interpolated at video timestamps
+
+    Points are (seconds from video start, latitude, longitude). Loaded from
+    GPX (times relative to the first track point, shifted by offset_s) or
+    CSV with 'seconds,latitude,longitude' columns.
+    """
+
+    def __init__(self, seconds: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray):
+        order = np.argsort(seconds)
+        self.seconds = np.asarray(seconds, dtype=np.float64)[order]
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)[order]
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)[order]
+        if len(self.seconds) == 0:
+            raise ValueError("GPS track has no points")
+
+    @classmethod
+    def load(cls, f: BinaryIO, filename: str, offset_s: float = 0.0) -> 'GpsTrack':
+        """
+        Load a GPX or CSV track, told apart by file name
+
+        Args:
+            f: Binary file object
+            filename: Name of the track file
+            offset_s: Video time of the first GPX point (GPX only)
+
+        Raises:
+            ValueError: If the track cannot be parsed
+        """
+        try:
+            if filename.lower().endswith('.gpx'):
+                return cls.from_gpx(ElementTree.parse(f).getroot(), offset_s)
+            rows = list(csv.DictReader(f.read().decode('utf-8-sig').splitlines()))
+            return cls(
+                np.array([float(row['seconds']) for row in rows]),
+                np.array([float(row['latitude']) for row in rows]),
+                np.array([float(row['longitude']) for row in rows])
+            )
+        except (ElementTree.ParseError, KeyError, TypeError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid GPS track: {e}") from e
+
+    @classmethod
+    def from_gpx(cls, root: ElementTree.Element, offset_s: float = 0.0) -> 'GpsTrack':
+        points = []
+        for point in root.iter():
+            if not point.tag.endswith('trkpt'):
+                continue
+            when = next((child.text for child in point if child.tag.endswith('time')), None)
+            if when is None:
+                continue
+            timestamp = datetime.fromisoformat(when.strip().replace('Z', '+00:00')).timestamp()
+            points.append((timestamp, float(point.get('lat')), float(point.get('lon'))))
+        if not points:
+            raise ValueError("GPX file has no timed track points")
+
+        points = np.array(points)
+        return cls(points[:, 0] - points[:, 0].min() + offset_s, points[:, 1], points[:, 2])
+
+    def at(self, timestamp: float) -> Optional[Dict]:
+        """Interpolated position, or None outside the track's time range"""
+        if timestamp < self.seconds[0] or timestamp > self.seconds[-1]:
+            return None
+        return {
+            'latitude': round(float(np.interp(timestamp, self.seconds, self.latitudes)), 7),
+            'longitude': round(float(np.interp(timestamp, self.seconds, self.longitudes)), 7)
+        }
+
+
+class _Track:
+    __slots__ = (
+        'track_id', 'issue_type', 'box', 'first_seen', 'last_seen', 'hits',
+        'best_detection', 'best_time', 'best_index', 'best_frame'
+    )
+
+
+class IssueTracker:
+    """
+    Merges per-frame detections of the same object into tracks
+
+    A detection continues an open track of the same issue type when their
+    boxes overlap (IoU) or their centers are close relative to the box
+    size, which tolerates the apparent motion of roadside objects between
+    samples. Tracks not seen for ``max_gap_s`` are finished; those seen in
+    fewer than ``min_frames`` samples are dropped as flicker.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_gap_s: float = 1.5,
+        min_frames: int = 2,
+        max_tracks: int = 256,
+        keep_frames: bool = False
+    ):
+        """
+        Args:
+            iou_threshold: Minimum IoU to continue a track
+            max_gap_s: Seconds without a match after which a track ends
+            min_frames: Samples a track needs to be reported
+            max_tracks: Open tracks kept; the stalest are finished early
+            keep_frames: Keep a JPEG of each track's best frame
+        """
+        self.iou_threshold = iou_threshold
+        self.max_gap_s = max_gap_s
+        self.min_frames = min_frames
+        self.max_tracks = max_tracks
+        self.keep_frames = keep_frames
+        self._tracks: List[_Track] = []
+        self._next_id = 1
+
+    def update(
+        self,
+        frame_index: int,
+        timestamp: float,
+        detections: List[Dict],
+        frame: np.ndarray
+    ) -> List[_Track]:
+        """
+        Add one sampled frame's detections
+
+        Returns:
+            Tracks finished by this frame (already filtered by min_frames)
+        """
+        finished = [t for t in self._tracks if timestamp - t.last_seen > self.max_gap_s]
+        self._tracks = [t for t in self._tracks if timestamp - t.last_seen <= self.max_gap_s]
+
+        boxes = np.array(
+            [[d['bbox']['x1'], d['bbox']['y1'], d['bbox']['x2'], d['bbox']['y2']] for d in detections],
+            dtype=np.float64
+        ).reshape(-1, 4)
+        matched = self._match(boxes, detections)
+
+        for det_index, detection in enumerate(detections):
+            track = matched.get(det_index)
+            if track is None:
+                track = _Track()
+                track.track_id = self._next_id
+                track.issue_type = detection['issue_type']
+                track.first_seen = timestamp
+                track.hits = 0
+                track.best_detection = None
+                track.best_frame = None
+                self._next_id += 1
+                self._tracks.append(track)
+            track.box = boxes[det_index]
+            track.last_seen = timestamp
+            track.hits += 1
+            if track.best_detection is None or detection['confidence'] > track.best_detection['confidence']:
+                track.best_detection = detection
+                track.best_time = timestamp
+                track.best_index = frame_index
+                if self.keep_frames:
+                    track.best_frame = _encode_frame(frame)
+
+        if len(self._tracks) > self.max_tracks:
+            self._tracks.sort(key=lambda t: t.last_seen)
+            overflow = len(self._tracks) - self.max_tracks
+            finished.extend(self._tracks[:overflow])
+            self._tracks = self._tracks[overflow:]
+
+        return [t for t in finished if t.hits >= self.min_frames]
+
+    def flush(self) -> List[_Track]:
+        """Finish all open tracks (end of video)"""
+        finished, self._tracks = self._tracks, []
+        return [t for t in finished if t.hits >= self.min_frames]
+
+    def _match(self, boxes: np.ndarray, detections: List[Dict]) -> Dict[int, _Track]:
+        """Greedy one-to-one matching of detections to open tracks"""
+        if not self._tracks or len(boxes) == 0:
+            return {}
+        track_boxes = np.array([t.box for t in self._tracks])
+
+        width = (np.minimum(track_boxes[:, None, 2], boxes[None, :, 2]) -
+                 np.maximum(track_boxes[:, None, 0], boxes[None, :, 0]))
+        height = (np.minimum(track_boxes[:, None, 3], boxes[None, :, 3]) -
+                  np.maximum(track_boxes[:, None, 1], boxes[None, :, 1]))
+        intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+        track_areas = (track_boxes[:, 2] - track_boxes[:, 0]) * (track_boxes[:, 3] - track_boxes[:, 1])
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        iou = intersection / np.maximum(track_areas[:, None] + areas[None, :] - intersection, 1e-9)
+
+        # Center distance in units of the larger box's side
+        track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        distance = np.linalg.norm(track_centers[:, None] - centers[None, :], axis=2)
+        scale = np.sqrt(np.maximum(track_areas[:, None], areas[None, :]))
+        near = distance / np.maximum(scale, 1e-9) < 0.5
+
+        same_type = (
+            np.array([t.issue_type for t in self._tracks])[:, None] ==
+            np.array([d['issue_type'] for d in detections])[None, :]
+        )
+        score = np.where(same_type & ((iou >= self.iou_threshold) | near), iou + near, -1.0)
+
+        matched = {}
+        while True:
+            track_index, det_index = np.unravel_index(np.argmax(score), score.shape)
+            if score[track_index, det_index] < 0:
+                break
+            matched[int(det_index)] = self._tracks[track_index]
+            score[track_index, :] = -1.0
+            score[:, det_index] = -1.0
+        return matched
+
+
+class VideoDetector:
+    """
+    Streaming video pipeline on top of a YOLODetector
+
+    Sampled frames are run through detect_batch in batches of batch_size,
+    in time order, and fed to an IssueTracker.
+    """
+
+    def __init__(
+        self,
+        detector,
+        batch_size: int = 8,
+        sampler: Optional[FrameSampler] = None,
+        tracker: Optional[IssueTracker] = None
+    ):
+        """
+        Args:
+            detector: YOLODetector used for batched inference
+            batch_size: Frames per YOLO forward pass
+            sampler: Frame sampling settings (default: every 0.5s)
+            tracker: Track merging settings
+        """
+        self.detector = detector
+        self.batch_size = batch_size
+        self.sampler = sampler or FrameSampler()
+        self.tracker = tracker or IssueTracker()
+        if self.sampler.scene_threshold > 0:
+            # Unchanged scenes are skipped, so an object can legitimately go
+            # unseen for up to max_interval_s
+            self.tracker.max_gap_s = max(
+                self.tracker.max_gap_s, self.sampler.max_interval_s + self.sampler.interval_s
+            )
+
+    def run(self, path: str, gps_track: Optional[GpsTrack] = None) -> Iterator[Dict]:
+        """
+        Process a video file and yield one dict per detected object
+        ('type': 'issue') as its track ends, then a summary dict
+
+        Args:
+            path: Video file path
+            gps_track: Optional GPS sidecar for issue locations
+        """
+        start = time.perf_counter()
+        issues = 0
+        batch: List[Frame] = []
+
+        for frame in self.sampler.frames(path):
+            batch.append(frame)
+            if len(batch) == self.batch_size:
+                for track in self._process(batch):
+                    issues += 1
+                    yield self._issue(track, gps_track)
+                batch = []
+        for track in self._process(batch) + self.tracker.flush():
+            issues += 1
+            yield self._issue(track, gps_track)
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            'type': 'summary',
+            'issues': issues,
+            'frames_read': self.sampler.frames_read,
+            'frames_sampled': self.sampler.frames_sampled,
+            'video_seconds': round(self.sampler.duration_s, 2),
+            'elapsed_seconds': round(elapsed, 3),
+            'frames_per_sec': round(self.sampler.frames_read / elapsed, 2) if elapsed > 0 else 0.0,
+            'sampled_frames_per_sec': (
+                round(self.sampler.frames_sampled / elapsed, 2) if elapsed > 0 else 0.0
+            )
+        }
+        logger.info(
+            f"Video detection completed - Issues: {issues}, Frames: {summary['frames_read']} "
+            f"({summary['frames_sampled']} sampled), {summary['frames_per_sec']} frames/sec"
+        )
+        yield summary
+
+    def _process(self, batch: List[Frame]) -> List[_Track]:
+        if not batch:
+            return []
+        results = self.detector.detect_batch(
+            [DecodedImage.from_array(frame) for _, _, frame in batch],
+            include_fraud_indicators=False
+        )
+        finished = []
+        for (index, timestamp, frame), result in zip(batch, results):
+            finished.extend(self.tracker.update(index, timestamp, result['detections'], frame))
+        return finished
+
+    def _issue(self, track: _Track, gps_track: Optional[GpsTrack]) -> Dict:
+        best = track.best_detection
+        issue = {
+            'type': 'issue',
+            'issue_id': track.track_id,
+            'issue_type': track.issue_type,
+            'confidence': best['confidence'],
+            'frames': track.hits,
+            'first_seen_s': round(track.first_seen, 3),
+            'last_seen_s': round(track.last_seen, 3),
+            'best_frame': {
+                'frame_index': track.best_index,
+                'timestamp_s': round(track.best_time, 3),
+                'bbox': best['bbox'],
+                'area_percentage': best['area_percentage']
+            },
+            'location': gps_track.at(track.best_time) if gps_track is not None else None
+        }
+        if track.best_frame is not None:
+            issue['best_frame']['jpeg_base64'] = base64.b64encode(track.best_frame).decode('ascii')
+        return issue
+
+
+def _encode_frame(frame: np.ndarray) -> bytes:
+    height, width = frame.shape[:2]
+    if width > _BEST_FRAME_WIDTH:
+        scale = _BEST_FRAME_WIDTH / width
+        frame = cv2.resize(frame, (_BEST_FRAME_WIDTH, round(height * scale)), interpolation=cv2.INTER_AREA)
+    return cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+
+
+def main():
+    from config.settings import settings
+    from models.model_loader import model_loader
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='Video file')
+    parser.add_argument('--gps', help='GPS sidecar track (.gpx or .csv)')
+    parser.add_argument('--gps-offset', type=float, default=0.0,
+                        help='Video time (s) of the first GPX point')
+    parser.add_argument('--interval', type=float, default=settings.video_sample_interval_seconds)
+    parser.add_argument('--scene-threshold', type=float, default=settings.video_scene_threshold)
+    parser.add_argument('--batch-size', type=int, default=settings.bulk_batch_size)
+    parser.add_argument('--include-frames', action='store_true',
+                        help='Embed each issue\'s best frame as base64 JPEG')
+    parser.add_argument('--output', help='NDJSON output file (default: stdout)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    video = VideoDetector(
+        model_loader.get(),
+        batch_size=args.batch_size,
+        sampler=FrameSampler(
+            args.interval, args.scene_threshold, settings.video_max_interval_seconds
+        ),
+        tracker=IssueTracker(
+            max_gap_s=settings.video_track_max_gap_seconds,
+            min_frames=settings.video_track_min_frames,
+            keep_frames=args.include_frames
+        )
+    )
+    gps_track = None
+    if args.gps:
+        with open(args.gps, 'rb') as f:
+            gps_track = GpsTrack.load(f, args.gps, args.gps_offset)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in video.run(args.input, gps_track):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            if result['type'] == 'summary':
+                print(
+                    f"{result['issues']} issues from {result['frames_read']} frames "
+                    f"({result['frames_sampled']} sampled) in {result['elapsed_seconds']}s: "
+                    f"{result['frames_per_sec']} frames/sec",
+                    file=sys.stderr
+                )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,19 @@ import torch
 import cv2
 import numpy as np
 from ultralytics import YOLO
+from ultralytics.engine.results import Results
 from PIL import Image
-from skimage.metrics import structural_similarity as ssim
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import logging
+import threading
+import time
 from pathlib import Path
+from utils.image_context import DecodedImage
+from utils.metrics import BATCH_SIZE, INFERENCE_SECONDS, POSTPROCESS_SECONDS
+from utils.similarity import compute_similarity
+from models.batch_scheduler import BatchScheduler
+from models.tiling import tile_grid, merge_boxes
+from config.settings import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,37 +43,238 @@ class YOLODetector:
         'MEDIUM': {'confidence': 0.65, 'area_percentage': 10},
         'LOW': {'confidence': 0.50, 'area_percentage': 5}
     }
+    
+    # Inference backends: ultralytics export format, exported file suffix
+    # and whether the graph accepts a dynamic batch dimension
+    BACKENDS = {
+        'torch': {'format': None, 'suffix': '.pt', 'batching': True},
+        'onnxruntime': {'format': 'onnx', 'suffix': '.onnx', 'batching': True},
+        'torchscript': {'format': 'torchscript', 'suffix': '.torchscript', 'batching': False},
+        'openvino': {'format': 'openvino', 'suffix': '_openvino_model', 'batching': False}
+    }
 
-    def __init__(self, model_path: str = 'yolov8n.pt', confidence_threshold: float = 0.5):
+    def __init__(
+        self,
+        model_path: str = 'yolov8n.pt',
+        confidence_threshold: float = 0.5,
+        backend: str = 'torch'
+    ):
         """
         Initialize YOLOv8 detector
         
         Args:
-            model_path: Path to YOLOv8 model file
+            model_path: Path to YOLOv8 model file (.pt weights or an export)
             confidence_threshold: Minimum confidence for detections
+            backend: Inference backend, one of BACKENDS
         """
         self.confidence_threshold = confidence_threshold
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.backend = backend
+        
+        # Ultralytics predictors are not thread-safe; the inference executor
+        # runs the surrounding OpenCV work in parallel but serializes predict
+        self._predict_lock = threading.Lock()
+        self.scheduler = None
+        self.tiling = None
+        self.adaptive = None
+        self._escalations = {'previews_total': 0, 'no_detections': 0, 'low_confidence': 0}
+        self._escalations_lock = threading.Lock()
         
         try:
-            # Load YOLOv8 model
-            self.model = YOLO(model_path)
-            self.model.to(self.device)
-            logger.info(f"YOLOv8 model loaded successfully on {self.device}")
+            self.model_path = self.resolve_model_path(model_path, backend)
+            
+            if backend == 'torch':
+                # Load YOLOv8 model
+                self.model = YOLO(self.model_path)
+                self.model.to(self.device)
+            else:
+                # Pre-exported graph, run through ultralytics' AutoBackend
+                self.model = YOLO(self.model_path, task='detect')
+            logger.info(
+                f"YOLOv8 model loaded successfully on {self.device} "
+                f"({backend}: {self.model_path})"
+            )
         except Exception as e:
             logger.error(f"Failed to load YOLOv8 model: {e}")
             raise
 
+    @classmethod
+    def resolve_model_path(cls, model_path: str, backend: str) -> str:
+        """
+        Map a weights path to the exported model file for a backend
+        
+        'yolov8n.pt' with backend 'onnxruntime' resolves to 'yolov8n.onnx';
+        paths that already point at an export are returned unchanged.
+        
+        Args:
+            model_path: Path to .pt weights or to an exported model
+            backend: Inference backend, one of BACKENDS
+            
+        Returns:
+            Path of the model file to load
+        """
+        if backend not in cls.BACKENDS:
+            raise ValueError(
+                f"Unknown inference backend '{backend}'. "
+                f"Allowed: {list(cls.BACKENDS)}"
+            )
+        
+        path = Path(model_path)
+        if backend == 'torch' or path.suffix != '.pt':
+            return model_path
+        
+        exported = path.with_name(path.stem + cls.BACKENDS[backend]['suffix'])
+        if not exported.exists():
+            raise FileNotFoundError(
+                f"No {backend} export found at {exported}. "
+                f"Run: python -m models.export --weights {model_path} --backends {backend}"
+            )
+        return str(exported)
+
+    def enable_batching(self, max_batch_size: int, max_wait_ms: float):
+        """
+        Route single-image inference through a dynamic micro-batcher
+        
+        Concurrent detect() calls (e.g. from several inference executor
+        threads) are gathered for up to max_wait_ms or max_batch_size images
+        and run as one batched predict.
+        
+        Args:
+            max_batch_size: Maximum images per batched predict
+            max_wait_ms: Maximum time to wait for a batch to fill
+        """
+        self.scheduler = BatchScheduler(
+            self._predict,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+        logger.info(
+            f"Micro-batching enabled (batch={max_batch_size}, wait={max_wait_ms}ms)"
+        )
+
+    def enable_tiling(
+        self,
+        tile_size: int,
+        overlap: float,
+        min_megapixels: float,
+        match_threshold: float = 0.5
+    ):
+        """
+        Run large images as overlapping tiles instead of one downscaled frame
+        
+        Images of at least min_megapixels are cut into tile_size tiles which,
+        together with the full frame (for objects larger than a tile), go
+        through one batched predict. Tile boxes are shifted back to image
+        coordinates and duplicates across tiles are merged.
+        
+        Args:
+            tile_size: Tile width and height in pixels
+            overlap: Fraction of a tile shared with its neighbours (0-0.9)
+            min_megapixels: Smallest image that is tiled
+            match_threshold: Intersection over the smaller box above which
+                same-class boxes from different tiles are merged
+        """
+        if not 0 <= overlap <= 0.9:
+            raise ValueError(f"Tile overlap must be between 0 and 0.9, got {overlap}")
+        self.tiling = {
+            'tile_size': tile_size,
+            'overlap': overlap,
+            'min_megapixels': min_megapixels,
+            'match_threshold': match_threshold
+        }
+        logger.info(
+            f"Tiled inference enabled (tile={tile_size}px, overlap={overlap:.0%}, "
+            f"images >= {min_megapixels}MP)"
+        )
+
+    def enable_adaptive(self, preview_size: int, band: float, full_size: int = 640):
+        """
+        Run a cheap low-resolution preview pass before the full pass
+        
+        The preview result is returned as-is when it is conclusive; the
+        image is escalated to the normal (or tiled) pass when the preview
+        finds nothing, or when its best confidence is within band of the
+        confidence threshold.
+        
+        Args:
+            preview_size: Model input size of the preview pass
+            band: Half-width of the inconclusive band around the threshold
+            full_size: Model input size of the escalated pass
+        """
+        if not self.BACKENDS[self.backend]['batching']:
+            raise ValueError(
+                f"Adaptive inference needs a dynamic-shape model; "
+                f"the {self.backend} export is fixed at one input size"
+            )
+        self.adaptive = {'preview_size': preview_size, 'band': band, 'full_size': full_size}
+        logger.info(
+            f"Adaptive inference enabled (preview={preview_size}px, full={full_size}px, "
+            f"band=±{band:g})"
+        )
+
+    def after_fork(self, num_threads: int):
+        """
+        Reset per-process state in a worker forked from the process that
+        loaded the model
+
+        The weights stay shared copy-on-write; locks and the micro-batcher's
+        dispatcher thread do not survive fork and are recreated.
+
+        Args:
+            num_threads: torch intra-op threads for this worker
+        """
+        torch.set_num_threads(num_threads)
+        self._predict_lock = threading.Lock()
+        self._escalations_lock = threading.Lock()
+        if self.scheduler is not None:
+            self.enable_batching(
+                self.scheduler.max_batch_size,
+                self.scheduler.max_wait * 1000
+            )
+
+    @property
+    def inference_signature(self) -> str:
+        """Inference options that change results, appended to the model version"""
+        signature = ''
+        if self.tiling is not None:
+            signature += (
+                f"+tiles{self.tiling['tile_size']}"
+                f"o{self.tiling['overlap']:g}m{self.tiling['min_megapixels']:g}"
+            )
+        if self.adaptive is not None:
+            signature += (
+                f"+preview{self.adaptive['preview_size']}"
+                f"b{self.adaptive['band']:g}f{self.adaptive['full_size']}"
+            )
+        return signature
+
+    def adaptive_stats(self) -> Dict:
+        """Preview passes and how many were escalated, by reason"""
+        if self.adaptive is None:
+            return {}
+        with self._escalations_lock:
+            counts = dict(self._escalations)
+        escalated = counts['no_detections'] + counts['low_confidence']
+        return {
+            'previews_total': counts['previews_total'],
+            'escalations_total': escalated,
+            'escalated_no_detections_total': counts['no_detections'],
+            'escalated_low_confidence_total': counts['low_confidence'],
+            'escalation_rate': (
+                round(escalated / counts['previews_total'], 4) if counts['previews_total'] else 0.0
+            )
+        }
+
     def detect(
         self, 
-        image_bytes: bytes, 
+        image: Union[bytes, DecodedImage], 
         confidence_threshold: float = None
     ) -> Dict:
         """
         Detect civic issues in an image
         
         Args:
-            image_bytes: Image data as bytes
+            image: Image data as bytes or a shared DecodedImage
             confidence_threshold: Override default confidence threshold
             
         Returns:
@@ -75,134 +284,333 @@ class YOLODetector:
             # Use instance threshold if not provided
             conf_threshold = confidence_threshold or self.confidence_threshold
             
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Reuse the shared decode when available
+            image = DecodedImage.ensure(image)
             
-            if image is None:
-                raise ValueError("Failed to decode image")
+            # Confident low-resolution previews skip the full pass
+            result = None
+            if self.adaptive is not None:
+                result = self._preview([image], conf_threshold)[0]
             
-            # Get image dimensions
-            height, width = image.shape[:2]
-            total_pixels = height * width
+            # Run YOLO detection (batched with concurrent requests if enabled)
+            if result is None:
+                if self._use_tiling(image):
+                    result = self._predict_tiled(image.bgr, conf_threshold)
+                elif self.scheduler is not None:
+                    result = self.scheduler.submit(image.bgr, conf_threshold)
+                else:
+                    result = self._predict([image.bgr], conf_threshold)[0]
             
-            # Run YOLO detection
-            results = self.model.predict(
-                image, 
-                conf=conf_threshold,
-                device=self.device,
-                verbose=False
-            )
+            result_dict = self._build_result(image, result)
             
-            # Process detections
-            detections = []
-            total_issue_area = 0
-            
-            for result in results:
-                boxes = result.boxes
-                
-                for box in boxes:
-                    # Extract detection information
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    bbox = box.xyxy[0].cpu().numpy()
-                    
-                    # Calculate bounding box area
-                    box_width = bbox[2] - bbox[0]
-                    box_height = bbox[3] - bbox[1]
-                    box_area = box_width * box_height
-                    area_percentage = (box_area / total_pixels) * 100
-                    
-                    total_issue_area += box_area
-                    
-                    detection = {
-                        'issue_type': self.ISSUE_TYPES.get(class_id, 'UNKNOWN'),
-                        'confidence': round(confidence, 3),
-                        'bbox': {
-                            'x1': int(bbox[0]),
-                            'y1': int(bbox[1]),
-                            'x2': int(bbox[2]),
-                            'y2': int(bbox[3])
-                        },
-                        'area_percentage': round(area_percentage, 2)
-                    }
-                    
-                    detections.append(detection)
-            
-            # Calculate total area percentage
-            total_area_percentage = (total_issue_area / total_pixels) * 100
-            
-            # Determine severity
-            severity = self._determine_severity(detections, total_area_percentage)
-            
-            # Calculate fraud risk indicators
-            fraud_indicators = self._calculate_fraud_indicators(image, detections)
-            
-            result_dict = {
-                'detected': len(detections) > 0,
-                'num_detections': len(detections),
-                'detections': detections,
-                'severity': severity,
-                'total_area_percentage': round(total_area_percentage, 2),
-                'image_dimensions': {
-                    'width': width,
-                    'height': height
-                },
-                'fraud_risk_score': fraud_indicators['risk_score'],
-                'fraud_indicators': fraud_indicators['indicators']
-            }
-            
-            logger.info(f"Detection completed: {len(detections)} issues found")
+            logger.info(f"Detection completed: {result_dict['num_detections']} issues found")
             return result_dict
             
         except Exception as e:
             logger.error(f"Detection error: {e}")
             raise
 
+    def detect_batch(
+        self,
+        images: List[Union[bytes, DecodedImage]],
+        confidence_threshold: float = None,
+        include_fraud_indicators: bool = True,
+        share_batches: bool = False
+    ) -> List[Dict]:
+        """
+        Detect civic issues in several images with a single batched predict
+        
+        Args:
+            images: Image data as bytes or shared DecodedImages
+            confidence_threshold: Override default confidence threshold
+            include_fraud_indicators: Skip fraud analysis when False
+            share_batches: With micro-batching enabled, queue the images on
+                the scheduler so they share batches with concurrent
+                requests instead of running a predict of their own
+            
+        Returns:
+            List of detection result dictionaries, in input order
+        """
+        try:
+            conf_threshold = confidence_threshold or self.confidence_threshold
+            images = [DecodedImage.ensure(image) for image in images]
+            
+            if self.adaptive is not None:
+                results = self._preview(images, conf_threshold)
+            else:
+                results = [None] * len(images)
+            
+            # Large images are tiled on their own; the rest share one predict
+            pending = [i for i, result in enumerate(results) if result is None]
+            tiled = [i for i in pending if self._use_tiling(images[i])]
+            plain = [i for i in pending if i not in tiled]
+            for i in tiled:
+                results[i] = self._predict_tiled(images[i].bgr, conf_threshold)
+            if plain:
+                plain_images = [images[i].bgr for i in plain]
+                if share_batches and self.scheduler is not None:
+                    plain_results = self.scheduler.submit_many(plain_images, conf_threshold)
+                else:
+                    plain_results = self._predict(plain_images, conf_threshold)
+                for i, result in zip(plain, plain_results):
+                    results[i] = result
+            
+            result_dicts = [
+                self._build_result(image, result, include_fraud_indicators)
+                for image, result in zip(images, results)
+            ]
+            
+            logger.info(f"Batch detection completed: {len(images)} images")
+            return result_dicts
+            
+        except Exception as e:
+            logger.error(f"Batch detection error: {e}")
+            raise
+
+    def _predict(
+        self,
+        images: List[np.ndarray],
+        conf_threshold: float,
+        imgsz: Optional[int] = None
+    ) -> List:
+        """
+        Run one YOLO forward pass over a list of BGR images
+        
+        Args:
+            images: Decoded BGR images
+            conf_threshold: Minimum confidence for detections
+            imgsz: Model input size (default: the model's own, or the full
+                size in adaptive mode)
+            
+        Returns:
+            List of ultralytics Results, one per image
+        """
+        # Ultralytics keeps predict arguments between calls, so once preview
+        # passes change the input size every call has to set it
+        options = {}
+        if imgsz is None and self.adaptive is not None:
+            imgsz = self.adaptive['full_size']
+        if imgsz is not None:
+            options['imgsz'] = imgsz
+        
+        with self._predict_lock:
+            start = time.perf_counter()
+            if not self.BACKENDS[self.backend]['batching']:
+                # Static-shape exports are traced at batch 1
+                results = [
+                    result
+                    for image in images
+                    for result in self.model.predict(
+                        image,
+                        conf=conf_threshold,
+                        device=self.device,
+                        verbose=False,
+                        **options
+                    )
+                ]
+            else:
+                results = self.model.predict(
+                    images, 
+                    conf=conf_threshold,
+                    device=self.device,
+                    verbose=False,
+                    **options
+                )
+            INFERENCE_SECONDS.labels(self.backend).observe(time.perf_counter() - start)
+            BATCH_SIZE.observe(len(images))
+            return results
+
+    def _preview(self, images: List[DecodedImage], conf_threshold: float) -> List[Optional[Results]]:
+        """
+        Low-resolution pass deciding which images need the full pass
+        
+        Runs at the bottom of the inconclusive band so near misses are seen.
+        
+        Args:
+            images: Decoded images
+            conf_threshold: Minimum confidence for reported detections
+            
+        Returns:
+            Per image, the preview Results filtered to conf_threshold when
+            conclusive, or None when the image must be escalated
+        """
+        band = self.adaptive['band']
+        previews = self._predict(
+            [image.bgr for image in images],
+            max(0.01, conf_threshold - band),
+            imgsz=self.adaptive['preview_size']
+        )
+        
+        results = []
+        counts = {'no_detections': 0, 'low_confidence': 0}
+        for preview in previews:
+            confidences = preview.boxes.conf.cpu().numpy()
+            if len(confidences) == 0:
+                counts['no_detections'] += 1
+                results.append(None)
+            elif confidences.max() < conf_threshold + band:
+                counts['low_confidence'] += 1
+                results.append(None)
+            else:
+                results.append(preview[confidences >= conf_threshold])
+        
+        with self._escalations_lock:
+            self._escalations['previews_total'] += len(images)
+            for reason, count in counts.items():
+                self._escalations[reason] += count
+        return results
+
+    def _use_tiling(self, image: DecodedImage) -> bool:
+        return (
+            self.tiling is not None and
+            image.width * image.height >= self.tiling['min_megapixels'] * 1e6
+        )
+
+    def _predict_tiled(self, image: np.ndarray, conf_threshold: float) -> Results:
+        """
+        Sliced inference over one large BGR image
+        
+        Args:
+            image: Decoded BGR image
+            conf_threshold: Minimum confidence for detections
+            
+        Returns:
+            Ultralytics Results with the merged boxes in image coordinates
+        """
+        height, width = image.shape[:2]
+        windows = tile_grid(width, height, self.tiling['tile_size'], self.tiling['overlap'])
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+        
+        # Tiles plus the full frame in a single batch
+        results = self._predict(crops + [image], conf_threshold)
+        offsets = [(x1, y1, x1, y1) for x1, y1, _, _ in windows] + [(0, 0, 0, 0)]
+        
+        # Rows of (x1, y1, x2, y2, conf, cls), shifted to image coordinates
+        boxes = np.concatenate([
+            result.boxes.data.cpu().numpy()[:, :6] + np.array(offset + (0, 0), dtype=np.float32)
+            for result, offset in zip(results, offsets)
+        ])
+        keep = merge_boxes(
+            boxes[:, :4], boxes[:, 4], boxes[:, 5], self.tiling['match_threshold']
+        )
+        return Results(
+            image, path='', names=self.model.names, boxes=torch.from_numpy(boxes[keep])
+        )
+
+    def _build_result(
+        self,
+        image: DecodedImage,
+        result,
+        include_fraud_indicators: bool = True
+    ) -> Dict:
+        """
+        Convert a single ultralytics Results object into the API response
+        
+        Args:
+            image: Decoded image the result belongs to
+            result: Ultralytics Results for that image
+            include_fraud_indicators: Skip fraud analysis when False
+            
+        Returns:
+            Dictionary containing detection results
+        """
+        start = time.perf_counter()
+        
+        # Get image dimensions
+        height, width = image.bgr.shape[:2]
+        total_pixels = height * width
+        
+        # Pull classes, confidences and boxes to the host once per image
+        # rather than indexing tensors box by box
+        boxes = result.boxes
+        class_ids = boxes.cls.cpu().numpy().astype(int)
+        confidences = boxes.conf.cpu().numpy().astype(np.float64)
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float64)
+        
+        # Calculate bounding box areas
+        box_areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        area_percentages = box_areas / total_pixels * 100
+        
+        detections = [
+            {
+                'issue_type': self.ISSUE_TYPES.get(class_id, 'UNKNOWN'),
+                'confidence': round(confidence, 3),
+                'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+                'area_percentage': round(area_percentage, 2)
+            }
+            for class_id, confidence, (x1, y1, x2, y2), area_percentage in zip(
+                class_ids.tolist(),
+                confidences.tolist(),
+                xyxy.astype(int).tolist(),
+                area_percentages.tolist()
+            )
+        ]
+        
+        # Overlapping boxes count once, so this never exceeds 100%
+        total_area_percentage = _union_area(xyxy) / total_pixels * 100
+        
+        # Determine severity
+        severity = self._determine_severity(detections, total_area_percentage)
+        
+        result_dict = {
+            'detected': len(detections) > 0,
+            'num_detections': len(detections),
+            'detections': detections,
+            'severity': severity,
+            'total_area_percentage': round(total_area_percentage, 2),
+            'image_dimensions': {
+                'width': width,
+                'height': height
+            }
+        }
+        
+        # Calculate fraud risk indicators
+        if include_fraud_indicators:
+            fraud_indicators = self._calculate_fraud_indicators(image, detections)
+            result_dict['fraud_risk_score'] = fraud_indicators['risk_score']
+            result_dict['fraud_indicators'] = fraud_indicators['indicators']
+        
+        POSTPROCESS_SECONDS.observe(time.perf_counter() - start)
+        return result_dict
+
     def compare_images(
         self, 
-        before_bytes: bytes, 
-        after_bytes: bytes
+        before: Union[bytes, DecodedImage], 
+        after: Union[bytes, DecodedImage]
     ) -> Dict:
         """
         Compare before and after images to verify issue resolution
         
         Args:
-            before_bytes: Before image data as bytes
-            after_bytes: After image data as bytes
+            before: Before image data as bytes or a shared DecodedImage
+            after: After image data as bytes or a shared DecodedImage
             
         Returns:
             Dictionary with verification results
         """
         try:
-            # Decode images
-            before_arr = np.frombuffer(before_bytes, np.uint8)
-            after_arr = np.frombuffer(after_bytes, np.uint8)
-            
-            before_img = cv2.imdecode(before_arr, cv2.IMREAD_COLOR)
-            after_img = cv2.imdecode(after_arr, cv2.IMREAD_COLOR)
-            
-            if before_img is None or after_img is None:
-                raise ValueError("Failed to decode one or both images")
-            
-            # Resize images to same dimensions
-            height, width = before_img.shape[:2]
-            after_img_resized = cv2.resize(after_img, (width, height))
+            # Decode images once; the detections below reuse them
+            before = DecodedImage.ensure(before)
+            after = DecodedImage.ensure(after)
             
-            # Convert to grayscale for SSIM
-            before_gray = cv2.cvtColor(before_img, cv2.COLOR_BGR2GRAY)
-            after_gray = cv2.cvtColor(after_img_resized, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate Structural Similarity Index (SSIM)
-            similarity_score, diff_image = ssim(
-                before_gray, 
-                after_gray, 
-                full=True
+            # Calculate Structural Similarity Index (SSIM) at the
+            # configured analysis resolution, without a full diff map
+            similarity_score = compute_similarity(
+                before,
+                after,
+                analysis_size=settings.ssim_analysis_size,
+                method=settings.ssim_method,
+                gaussian_weights=settings.ssim_gaussian_weights
             )
             
-            # Detect issues in both images
-            before_detection = self.detect(before_bytes)
-            after_detection = self.detect(after_bytes)
+            # Detect issues in both images with one batched forward pass,
+            # shared with concurrent /detect images when micro-batching is
+            # enabled; their fraud indicators are not used here
+            before_detection, after_detection = self.detect_batch(
+                [before, after],
+                include_fraud_indicators=False,
+                share_batches=True
+            )
             
             # Calculate resolution metrics
             before_count = before_detection['num_detections']
@@ -281,14 +689,14 @@ class YOLODetector:
 
     def _calculate_fraud_indicators(
         self, 
-        image: np.ndarray, 
+        image: DecodedImage, 
         detections: List[Dict]
     ) -> Dict:
         """
         Calculate fraud risk indicators from image analysis
         
         Args:
-            image: Image as numpy array
+            image: Shared decoded image
             detections: List of detections
             
         Returns:
@@ -297,11 +705,16 @@ class YOLODetector:
         indicators = []
         risk_score = 0.0
         
-        # Check image quality
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
+        # Shared with the manipulation check, computed once per image; the
+        # image-statistics checks are skipped if they cannot be computed
+        try:
+            features = image.forensics
+        except (ValueError, cv2.error) as e:
+            logger.warning(f"Image forensics unavailable, skipping quality checks: {e}")
+            features = None
         
-        if blur_score < 100:
+        # Check image quality
+        if features is not None and features.laplacian_variance < 100:
             indicators.append('Low image quality detected')
             risk_score += 0.2
         
@@ -311,14 +724,13 @@ class YOLODetector:
             risk_score += 0.3
         
         # Check image dimensions (too small might be suspicious)
-        height, width = image.shape[:2]
+        height, width = image.bgr.shape[:2]
         if width < 640 or height < 480:
             indicators.append('Image resolution below recommended minimum')
             risk_score += 0.1
         
         # Check for extreme brightness/darkness
-        mean_brightness = np.mean(gray)
-        if mean_brightness < 30 or mean_brightness > 225:
+        if features is not None and (features.mean_brightness < 30 or features.mean_brightness > 225):
             indicators.append('Unusual lighting conditions')
             risk_score += 0.15
         
@@ -372,5 +784,19 @@ class YOLODetector:
             )
 
 
-# Create singleton instance
-detector = YOLODetector()
+def _union_area(xyxy: np.ndarray) -> float:
+    """
+    Area covered by the union of (x1, y1, x2, y2) boxes
+    
+    The box edges split the plane into a grid of cells; a cell is covered
+    when some box spans it in both x and y, which one matrix product over
+    the per-axis span masks answers for all cells at once.
+    """
+    if len(xyxy) == 0:
+        return 0.0
+    xs = np.unique(xyxy[:, [0, 2]])
+    ys = np.unique(xyxy[:, [1, 3]])
+    spans_x = (xyxy[:, 0:1] <= xs[:-1]) & (xs[:-1] < xyxy[:, 2:3])
+    spans_y = (xyxy[:, 1:2] <= ys[:-1]) & (ys[:-1] < xyxy[:, 3:4])
+    covered = (spans_x.T.astype(np.float64) @ spans_y.astype(np.float64)) > 0
+    return float(np.diff(xs) @ covered @ np.diff(ys))
@@ -1,14 +1,39 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Optional
-import exifread
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import BinaryIO, Iterator, List, Optional
 from datetime import datetime
-import hashlib
-import redis
+import asyncio
+import io
 import json
-from models.yolo_detector import detector
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from redis.exceptions import RedisError
+from models.model_loader import model_loader
+from models.inference_executor import inference_executor, InferenceQueueFull
+from models.bulk_detection import BulkDetector, iter_tarball
+from models.video_detection import (
+    VideoDetector, FrameSampler, IssueTracker, GpsTrack, VIDEO_EXTENSIONS
+)
 from utils.gps_validator import validate_gps_coordinates, calculate_distance
-from utils.image_validator import validate_image, check_image_manipulation
+from utils.image_validator import (
+    validate_image, check_image_manipulation, has_allowed_extension, ALLOWED_EXTENSIONS
+)
+from utils.image_context import DecodedImage
+from utils.perceptual_hash import phash
+from utils.duplicate_index import NearDuplicateIndex
+from utils.geo_index import GeoSubmissionIndex
+from utils.timing import RequestTimer
+from utils.metrics import observe_request
+from utils.fraud_scoring import get_risk_level
+from utils.upload_limits import read_image_upload, peak_rss_mb
+from utils.result_cache import DetectionResultCache, content_hash
+from utils.rate_limiter import RateLimiter, RateLimitExceeded
+from config.settings import settings
+from config.redis import redis_client
 import logging
 
 # Configure logging
@@ -18,17 +43,45 @@ logger = logging.getLogger(__name__)
 # Initialize router
 router = APIRouter(prefix="/api/v1/issues", tags=["Detection"])
 
-# Redis client for duplicate detection
-redis_client = redis.Redis(
-    host='localhost',
-    port=6379,
-    db=0,
-    decode_responses=True
+# Near-duplicate index over perceptual hashes of recent submissions
+duplicate_index = NearDuplicateIndex(
+    radius=settings.duplicate_hash_radius,
+    ttl_seconds=3600,
+    redis_client=redis_client
+)
+
+# Spatial index over recent submission locations, for merging nearby reports
+geo_index = GeoSubmissionIndex(
+    cell_size_m=settings.nearby_radius_meters,
+    ttl_seconds=settings.nearby_window_minutes * 60,
+    redis_client=redis_client
+)
+
+# Analysis results of recent uploads, so retried identical bytes skip
+# decoding, manipulation analysis and inference
+result_cache = DetectionResultCache(
+    max_entries=settings.result_cache_size,
+    redis_client=redis_client,
+    ttl_seconds=settings.result_cache_ttl_seconds
+)
+
+# Bulk jobs allowed to stream results at once; released by the stream itself
+_bulk_slots = threading.BoundedSemaphore(settings.bulk_max_jobs)
+
+# Per-device and per-IP submission limits, checked before any image work
+rate_limiter = RateLimiter(
+    redis_client,
+    limits={
+        'device': (settings.device_rate_limit, settings.device_rate_window_seconds),
+        'ip': (settings.ip_rate_limit, settings.ip_rate_window_seconds)
+    },
+    local_cache_size=settings.rate_limit_local_cache_size
 )
 
 
 @router.post("/detect")
 async def detect_civic_issue(
+    request: Request,
     image: UploadFile = File(...),
     latitude: float = Form(...),
     longitude: float = Form(...),
@@ -50,12 +103,48 @@ async def detect_civic_issue(
     Returns:
         Detection results with fraud risk assessment
     """
+    timer = RequestTimer()
     try:
+        # Reject abusive clients before reading the upload; every request
+        # counts against the IP limit
+        with timer.stage('redis'):
+            await rate_limiter.hit('ip', _client_ip(request))
+        
         # Read image bytes
-        image_bytes = await image.read()
+        with timer.stage('upload'):
+            image_bytes = await read_image_upload(image, _max_upload_bytes())
+        
+        # Decode once and share the pixel buffer across the pipeline
+        decoded = DecodedImage(image_bytes)
+        upload_hash = content_hash(image_bytes)
+        
+        # Reject abusive devices before decoding or inference. Only uploads
+        # that were read count, once per distinct image: a client retrying
+        # the same bytes is not charged again
+        with timer.stage('redis'):
+            submission_count = await rate_limiter.hit('device', device_id, upload_hash)
+        
+        # Byte-identical resubmissions (client retries) reuse the analysis
+        # of the first upload; the bookkeeping below still runs for them
+        cached = None
+        if model_loader.model_version is not None:
+            with timer.stage('cache'):
+                cached = await result_cache.get(
+                    upload_hash, model_loader.model_version, settings.yolo_confidence_threshold
+                )
         
         # 1. VALIDATE IMAGE FORMAT AND INTEGRITY
-        validation_result = validate_image(image_bytes, image.filename)
+        if cached is not None:
+            # Same bytes passed validation before; only the name can differ
+            validation_result = {'valid': has_allowed_extension(image.filename)}
+            if not validation_result['valid']:
+                validation_result['error'] = f'Invalid file format. Allowed: {ALLOWED_EXTENSIONS}'
+        else:
+            with timer.stage('validate'):
+                validation_result = await inference_executor.run(
+                    validate_image, decoded, image.filename
+                )
+            timer.split('validate', 'decode', decoded.decode_ms)
         if not validation_result['valid']:
             raise HTTPException(
                 status_code=400,
@@ -63,7 +152,13 @@ async def detect_civic_issue(
             )
         
         # 2. CHECK FOR IMAGE MANIPULATION
-        manipulation_check = check_image_manipulation(image_bytes)
+        if cached is not None:
+            manipulation_check = cached['manipulation']
+        else:
+            with timer.stage('manipulation'):
+                manipulation_check = await inference_executor.run(
+                    check_image_manipulation, decoded
+                )
         if manipulation_check['manipulated']:
             logger.warning(f"Potential image manipulation detected: {manipulation_check['indicators']}")
         
@@ -76,15 +171,19 @@ async def detect_civic_issue(
             )
         
         # 4. CHECK FOR DUPLICATE SUBMISSIONS
-        # Create hash of image for duplicate detection
-        image_hash = hashlib.md5(image_bytes).hexdigest()
-        duplicate_key = f"submission:{image_hash}"
-        
-        # Check if this image was submitted recently (within 1 hour)
-        recent_submission = redis_client.get(duplicate_key)
-        if recent_submission:
-            submission_data = json.loads(recent_submission)
-            
+        # Perceptual hash survives re-compression, resizing and EXIF stripping
+        if cached is not None:
+            image_hash = int(cached['phash'], 16)
+        else:
+            with timer.stage('hash'):
+                image_hash = await inference_executor.run(phash, decoded)
+        
+        # Pull entries other pods wrote (throttled; usually no round-trip)
+        with timer.stage('redis'):
+            await asyncio.gather(duplicate_index.sync(), geo_index.sync())
+        
+        # Check if a near-identical image was submitted recently (within 1 hour)
+        for _, submission_data in duplicate_index.query(image_hash):
             # Calculate distance from previous submission
             prev_lat = submission_data['latitude']
             prev_lon = submission_data['longitude']
@@ -97,111 +196,147 @@ async def detect_civic_issue(
                     detail="Duplicate submission detected. Same image submitted recently from nearby location."
                 )
         
-        # 5. CHECK DEVICE SUBMISSION RATE
-        device_rate_key = f"device_rate:{device_id}"
-        submission_count = redis_client.incr(device_rate_key)
-        
-        if submission_count == 1:
-            # Set expiry to 1 hour
-            redis_client.expire(device_rate_key, 3600)
+        # Find other recent reports around the same spot (different photos of
+        # the same issue) so they can be merged downstream
+        nearby_submissions = [
+            {
+                'submission_id': nearby['submission_id'],
+                'distance_m': round(distance_m, 1),
+                'timestamp': nearby['timestamp'],
+                'issue_types': nearby['issue_types']
+            }
+            for distance_m, nearby in geo_index.query(
+                latitude,
+                longitude,
+                settings.nearby_radius_meters,
+                settings.nearby_window_minutes * 60
+            )
+        ]
         
+        # 5. CHECK DEVICE SUBMISSION RATE (counted by the rate limiter)
         # Alert if device submitting too frequently (> 10 per hour)
         if submission_count > 10:
             logger.warning(f"High submission rate from device {device_id}: {submission_count}/hour")
         
         # 6. EXTRACT EXIF DATA FOR VERIFICATION
-        exif_data = {}
-        try:
-            tags = exifread.process_file(image.file)
-            exif_data = {
-                'datetime': str(tags.get('EXIF DateTimeOriginal', '')),
-                'make': str(tags.get('Image Make', '')),
-                'model': str(tags.get('Image Model', '')),
-                'gps_latitude': str(tags.get('GPS GPSLatitude', '')),
-                'gps_longitude': str(tags.get('GPS GPSLongitude', ''))
-            }
-        except Exception as e:
-            logger.warning(f"Failed to extract EXIF data: {e}")
+        # Header-only probe, usually already done by validate_image
+        with timer.stage('exif'):
+            exif_data = decoded.probe['exif']
         
         # 7. RUN YOLO DETECTION
-        detection_result = detector.detect(image_bytes)
+        if cached is not None:
+            detection_result = cached['detection']
+        else:
+            with timer.stage('inference'):
+                detection_result = await inference_executor.run(model_loader.detect, decoded)
+            with timer.stage('cache'):
+                await result_cache.put(
+                    upload_hash,
+                    model_loader.model_version,
+                    settings.yolo_confidence_threshold,
+                    {
+                        'manipulation': manipulation_check,
+                        'phash': format(image_hash, 'x'),
+                        'detection': detection_result
+                    }
+                )
         
         # 8. CALCULATE COMPREHENSIVE FRAUD RISK SCORE
-        fraud_risk_factors = []
-        total_fraud_score = detection_result['fraud_risk_score']
-        
-        # Add manipulation risk
-        if manipulation_check['manipulated']:
-            fraud_risk_factors.append('Image manipulation detected')
-            total_fraud_score += 0.3
-        
-        # Add GPS spoofing risk
-        if gps_validation.get('possible_spoofing'):
-            fraud_risk_factors.append('GPS spoofing suspected')
-            total_fraud_score += 0.4
-        
-        # Add high submission rate risk
-        if submission_count > 10:
-            fraud_risk_factors.append('Abnormal submission frequency')
-            total_fraud_score += 0.2
-        
-        # Add EXIF inconsistency risk
-        if exif_data.get('datetime'):
-            try:
-                exif_time = datetime.strptime(exif_data['datetime'], '%Y:%m:%d %H:%M:%S')
-                submitted_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                time_diff = abs((submitted_time - exif_time).total_seconds())
+        with timer.stage('postprocess'):
+            fraud_risk_factors = []
+            total_fraud_score = detection_result['fraud_risk_score']
+        
+            # Add manipulation risk
+            if manipulation_check['manipulated']:
+                fraud_risk_factors.append('Image manipulation detected')
+                total_fraud_score += 0.3
+        
+            # Add GPS spoofing risk
+            if gps_validation.get('possible_spoofing'):
+                fraud_risk_factors.append('GPS spoofing suspected')
+                total_fraud_score += 0.4
+        
+            # Add high submission rate risk
+            if submission_count > 10:
+                fraud_risk_factors.append('Abnormal submission frequency')
+                total_fraud_score += 0.2
+        
+            # Add EXIF inconsistency risk
+            if exif_data.get('datetime'):
+                try:
+                    exif_time = datetime.strptime(exif_data['datetime'], '%Y:%m:%d %H:%M:%S')
+                    submitted_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                    time_diff = abs((submitted_time - exif_time).total_seconds())
                 
-                # If time difference > 1 hour, suspicious
-                if time_diff > 3600:
-                    fraud_risk_factors.append('EXIF timestamp mismatch')
-                    total_fraud_score += 0.15
-            except:
-                pass
+                    # If time difference > 1 hour, suspicious
+                    if time_diff > 3600:
+                        fraud_risk_factors.append('EXIF timestamp mismatch')
+                        total_fraud_score += 0.15
+                except:
+                    pass
         
-        # Normalize fraud score
-        total_fraud_score = min(1.0, total_fraud_score)
+            # Normalize fraud score
+            total_fraud_score = min(1.0, total_fraud_score)
         
         # 9. STORE SUBMISSION DATA FOR DUPLICATE DETECTION
+        submission_id = uuid.uuid4().hex
         submission_data = {
+            'submission_id': submission_id,
             'latitude': latitude,
             'longitude': longitude,
             'device_id': device_id,
             'timestamp': timestamp,
-            'detection_count': detection_result['num_detections']
+            'detection_count': detection_result['num_detections'],
+            'issue_types': sorted({d['issue_type'] for d in detection_result['detections']})
         }
-        redis_client.setex(duplicate_key, 3600, json.dumps(submission_data))
+        with timer.stage('redis'):
+            await _store_submission(image_hash, submission_data)
         
         # 10. PREPARE RESPONSE
-        response = {
-            'success': True,
-            'detection': detection_result,
-            'fraud_assessment': {
-                'risk_score': round(total_fraud_score, 2),
-                'risk_level': _get_risk_level(total_fraud_score),
-                'risk_factors': fraud_risk_factors + detection_result['fraud_indicators']
-            },
-            'gps_validation': gps_validation,
-            'metadata': {
-                'device_id': device_id,
-                'timestamp': timestamp,
-                'submission_count_hourly': submission_count,
-                'exif_data': exif_data
+        with timer.stage('postprocess'):
+            response = {
+                'success': True,
+                'detection': detection_result,
+                'fraud_assessment': {
+                    'risk_score': round(total_fraud_score, 2),
+                    'risk_level': get_risk_level(total_fraud_score),
+                    'risk_factors': fraud_risk_factors + detection_result['fraud_indicators']
+                },
+                'gps_validation': gps_validation,
+                'nearby_submissions': nearby_submissions,
+                'metadata': {
+                    'submission_id': submission_id,
+                    'device_id': device_id,
+                    'timestamp': timestamp,
+                    'submission_count_hourly': submission_count,
+                    'result_cached': cached is not None,
+                    'exif_data': exif_data
+                }
             }
-        }
         
         logger.info(
             f"Detection completed - Issues: {detection_result['num_detections']}, "
             f"Fraud Risk: {total_fraud_score:.2f}"
         )
+        logger.info(f"Detection latency breakdown: {timer.summary()}")
+        logger.info(
+            f"Detection memory: image buffers={decoded.nbytes / 1e6:.1f}MB, "
+            f"process peak RSS={peak_rss_mb():.0f}MB"
+        )
         
-        return JSONResponse(content=response)
+        return _timed_response(response, timer)
         
     except HTTPException:
         raise
+    except RateLimitExceeded as e:
+        raise _rate_limited(e)
+    except InferenceQueueFull as e:
+        raise _service_busy(e)
     except Exception as e:
         logger.error(f"Detection endpoint error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        observe_request('detect', timer)
 
 
 @router.post("/verify-completion")
@@ -225,14 +360,25 @@ async def verify_task_completion(
     Returns:
         Verification results with AI confidence score
     """
+    timer = RequestTimer()
     try:
         # Read image bytes
-        before_bytes = await before_image.read()
-        after_bytes = await after_image.read()
+        with timer.stage('upload'):
+            before_bytes = await read_image_upload(before_image, _max_upload_bytes())
+            after_bytes = await read_image_upload(after_image, _max_upload_bytes())
+        
+        before_decoded = DecodedImage(before_bytes)
+        after_decoded = DecodedImage(after_bytes)
         
         # Validate both images
-        before_validation = validate_image(before_bytes, before_image.filename)
-        after_validation = validate_image(after_bytes, after_image.filename)
+        with timer.stage('validate'):
+            before_validation = await inference_executor.run(
+                validate_image, before_decoded, before_image.filename
+            )
+            after_validation = await inference_executor.run(
+                validate_image, after_decoded, after_image.filename
+            )
+        timer.split('validate', 'decode', before_decoded.decode_ms + after_decoded.decode_ms)
         
         if not before_validation['valid'] or not after_validation['valid']:
             raise HTTPException(
@@ -241,17 +387,9 @@ async def verify_task_completion(
             )
         
         # Extract EXIF timestamps from both images
-        before_exif_time = None
-        after_exif_time = None
-        
-        try:
-            before_tags = exifread.process_file(before_image.file)
-            after_tags = exifread.process_file(after_image.file)
-            
-            before_exif_time = str(before_tags.get('EXIF DateTimeOriginal', ''))
-            after_exif_time = str(after_tags.get('EXIF DateTimeOriginal', ''))
-        except Exception as e:
-            logger.warning(f"Failed to extract EXIF timestamps: {e}")
+        with timer.stage('exif'):
+            before_exif_time = before_decoded.probe['exif']['datetime']
+            after_exif_time = after_decoded.probe['exif']['datetime']
         
         # Verify timestamps: after image should be taken after before image
         timestamp_valid = True
@@ -267,7 +405,10 @@ async def verify_task_completion(
                 pass
         
         # Run image comparison
-        comparison_result = detector.compare_images(before_bytes, after_bytes)
+        with timer.stage('inference'):
+            comparison_result = await inference_executor.run(
+                model_loader.compare_images, before_decoded, after_decoded
+            )
         
         # Additional verification checks
         verification_flags = []
@@ -277,50 +418,328 @@ async def verify_task_completion(
             comparison_result['verification_confidence'] *= 0.7
         
         # Check for manipulation in after image
-        after_manipulation = check_image_manipulation(after_bytes)
+        with timer.stage('manipulation'):
+            after_manipulation = await inference_executor.run(
+                check_image_manipulation, after_decoded
+            )
         if after_manipulation['manipulated']:
             verification_flags.append('After image may be manipulated')
             comparison_result['verification_confidence'] *= 0.6
         
         # Prepare response
-        response = {
-            'success': True,
-            'task_id': task_id,
-            'verification': comparison_result,
-            'timestamp_verification': {
-                'valid': timestamp_valid,
-                'before_timestamp': before_exif_time,
-                'after_timestamp': after_exif_time
-            },
-            'verification_flags': verification_flags,
-            'recommendation': _get_verification_recommendation(
-                comparison_result,
-                verification_flags
-            )
-        }
+        with timer.stage('postprocess'):
+            response = {
+                'success': True,
+                'task_id': task_id,
+                'verification': comparison_result,
+                'timestamp_verification': {
+                    'valid': timestamp_valid,
+                    'before_timestamp': before_exif_time,
+                    'after_timestamp': after_exif_time
+                },
+                'verification_flags': verification_flags,
+                'recommendation': _get_verification_recommendation(
+                    comparison_result,
+                    verification_flags
+                )
+            }
         
         logger.info(
             f"Task verification completed - Task: {task_id}, "
             f"Resolved: {comparison_result['issue_resolved']}"
         )
         
-        return JSONResponse(content=response)
+        logger.info(f"Verification latency breakdown: {timer.summary()}")
+        
+        return _timed_response(response, timer)
         
     except HTTPException:
         raise
+    except InferenceQueueFull as e:
+        raise _service_busy(e)
     except Exception as e:
         logger.error(f"Verification endpoint error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        observe_request('verify_completion', timer)
 
 
-def _get_risk_level(risk_score: float) -> str:
-    """Determine risk level from fraud score"""
-    if risk_score >= 0.7:
-        return 'HIGH'
-    elif risk_score >= 0.4:
-        return 'MEDIUM'
-    else:
-        return 'LOW'
+@router.post("/detect/batch")
+async def detect_civic_issues_batch(
+    images: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None)
+):
+    """
+    Detect civic issues in many images at once
+    
+    Images are decoded, validated and run through YOLO in batches; results
+    are streamed back as NDJSON, one line per image as soon as its batch
+    finishes, followed by a summary line with throughput. No submissions are
+    recorded: this is for backlogs and audits, not live reports.
+    
+    Args:
+        images: Image files (multipart, repeated field)
+        archive: Optional tar / tar.gz of images, read as a stream
+        
+    Returns:
+        application/x-ndjson stream of per-image results and a summary
+    """
+    if not images and archive is None:
+        raise HTTPException(status_code=400, detail="No images or archive provided")
+    
+    if not _bulk_slots.acquire(blocking=False):
+        raise _service_busy(InferenceQueueFull(settings.inference_retry_after_seconds))
+    job = _BulkJob()
+    try:
+        # The request's uploads are closed as soon as this handler returns,
+        # before the response is streamed, so take the spooled files over
+        uploads = []
+        for upload in images or []:
+            uploads.append((upload.filename, job.own(_detach_upload(upload))))
+        archive_file = job.own(_detach_upload(archive)) if archive is not None else None
+        
+        def results() -> Iterator[bytes]:
+            try:
+                bulk = BulkDetector(
+                    model_loader.get(),
+                    batch_size=settings.bulk_batch_size,
+                    decode_workers=settings.bulk_decode_workers
+                )
+                for result in bulk.run(_iter_uploads(uploads, archive_file)):
+                    yield (json.dumps(result) + '\n').encode()
+            except Exception as e:
+                logger.error(f"Bulk detection error: {e}")
+                yield (json.dumps({'type': 'error', 'error': str(e)}) + '\n').encode()
+            finally:
+                job.release()
+        
+        # The background task also runs when the client disconnects before
+        # the stream starts, which never runs the generator's finally
+        return StreamingResponse(
+            results(), media_type='application/x-ndjson', background=BackgroundTask(job.release)
+        )
+    except BaseException:
+        job.release()
+        raise
+
+
+@router.post("/detect/video")
+async def detect_civic_issues_video(
+    video: UploadFile = File(...),
+    gps_track: Optional[UploadFile] = File(None),
+    gps_offset_seconds: float = Form(0.0),
+    include_frames: bool = Form(False)
+):
+    """
+    Detect civic issues in a dashcam / survey video
+    
+    Frames are sampled as the video is decoded, run through YOLO in batches
+    and merged across frames, so each physical object is reported once with
+    its best frame. Results are streamed back as NDJSON, one line per issue
+    as soon as the object leaves the view, followed by a summary line with
+    frames/sec. No submissions are recorded.
+    
+    Args:
+        video: Video file (mp4, mov, avi, mkv or webm)
+        gps_track: Optional GPS sidecar (.gpx, or .csv with
+            seconds,latitude,longitude) used to locate each issue
+        gps_offset_seconds: Video time of the first GPX track point
+        include_frames: Embed each issue's best frame as base64 JPEG
+        
+    Returns:
+        application/x-ndjson stream of issues and a summary
+    """
+    extension = os.path.splitext(video.filename or '')[1].lower()
+    if extension not in VIDEO_EXTENSIONS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported video format. Allowed: {list(VIDEO_EXTENSIONS)}"
+        )
+    
+    gps = None
+    if gps_track is not None:
+        try:
+            gps = GpsTrack.load(gps_track.file, gps_track.filename or '', gps_offset_seconds)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if not _bulk_slots.acquire(blocking=False):
+        raise _service_busy(InferenceQueueFull(settings.inference_retry_after_seconds))
+    
+    job = _BulkJob()
+    try:
+        video_file = job.own(_detach_upload(video))
+        
+        def results() -> Iterator[bytes]:
+            try:
+                # OpenCV reads videos from a path; copy the spooled upload in chunks
+                with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as f:
+                    job.paths.append(f.name)
+                    video_file.seek(0)
+                    shutil.copyfileobj(video_file, f, 1024 * 1024)
+                video_file.close()
+                
+                detector = VideoDetector(
+                    model_loader.get(),
+                    batch_size=settings.bulk_batch_size,
+                    sampler=FrameSampler(
+                        settings.video_sample_interval_seconds,
+                        settings.video_scene_threshold,
+                        settings.video_max_interval_seconds
+                    ),
+                    tracker=IssueTracker(
+                        max_gap_s=settings.video_track_max_gap_seconds,
+                        min_frames=settings.video_track_min_frames,
+                        keep_frames=include_frames
+                    )
+                )
+                for result in detector.run(f.name, gps):
+                    yield (json.dumps(result) + '\n').encode()
+            except Exception as e:
+                logger.error(f"Video detection error: {e}")
+                yield (json.dumps({'type': 'error', 'error': str(e)}) + '\n').encode()
+            finally:
+                job.release()
+        
+        return StreamingResponse(
+            results(), media_type='application/x-ndjson', background=BackgroundTask(job.release)
+        )
+    except BaseException:
+        job.release()
+        raise
+
+
+class _BulkJob:
+    """
+    A held bulk/video slot and the files the job owns
+
+    release() frees the slot and closes the files exactly once, whichever
+    of the stream's end, a disconnect or a handler error comes first.
+    """
+
+    def __init__(self):
+        self.files: List[BinaryIO] = []
+        self.paths: List[str] = []
+        self._released = False
+        self._lock = threading.Lock()
+
+    def own(self, f: BinaryIO) -> BinaryIO:
+        self.files.append(f)
+        return f
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        _bulk_slots.release()
+        for f in self.files:
+            f.close()
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _detach_upload(upload: UploadFile) -> BinaryIO:
+    """Take ownership of an upload's file so it outlives the request handler"""
+    f = upload.file
+    upload.file = io.BytesIO()
+    return f
+
+
+def _iter_uploads(
+    uploads: List[tuple],
+    archive_file: Optional[BinaryIO]
+) -> Iterator[tuple]:
+    """
+    Yield (filename, bytes) from multipart images, then the archive; bytes
+    is None for files over MAX_UPLOAD_MB, which are never read
+    """
+    max_bytes = _max_upload_bytes()
+    for filename, f in uploads:
+        # Spooled size, checked before the file is read into memory
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        yield filename or '', f.read() if size <= max_bytes else None
+    if archive_file is not None:
+        archive_file.seek(0)
+        yield from iter_tarball(archive_file, max_bytes)
+
+
+async def backfill_submission_indexes(retry_seconds: float = 5.0):
+    """
+    Load recent submissions other pods stored into the in-process indexes,
+    page by page, retrying until Redis answers. Runs as a background task
+    from the startup hook so /detect only ever pulls small deltas.
+    """
+    while True:
+        done = await asyncio.gather(duplicate_index.backfill(), geo_index.backfill())
+        if all(done):
+            logger.info(
+                f"Submission indexes loaded: {len(duplicate_index)} hashes, "
+                f"{len(geo_index)} locations"
+            )
+            return
+        await asyncio.sleep(retry_seconds)
+
+
+async def _store_submission(image_hash: int, submission_data: dict):
+    """Record a submission in both indexes with a single Redis round-trip"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        duplicate_index.add(image_hash, submission_data, pipe=pipe)
+        geo_index.add(
+            submission_data['latitude'],
+            submission_data['longitude'],
+            submission_data,
+            pipe=pipe
+        )
+        try:
+            await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Redis unavailable, submission kept in-process only: {e}")
+
+
+def _max_upload_bytes() -> int:
+    return settings.max_upload_mb * 1024 * 1024
+
+
+def _timed_response(content: dict, timer: RequestTimer) -> JSONResponse:
+    """Serialize the response, optionally exposing the stage breakdown"""
+    with timer.stage('serialization'):
+        response = JSONResponse(content=content)
+    if settings.timing_header:
+        response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+
+def _client_ip(request: Request) -> str:
+    # Behind a proxy this is the forwarded address only for the proxies
+    # listed in SERVE_FORWARDED_ALLOW_IPS
+    return request.client.host if request.client else 'unknown'
+
+
+def _rate_limited(error: RateLimitExceeded) -> HTTPException:
+    """Build a 429 response telling clients when to retry"""
+    logger.warning(f"Rate limit exceeded ({error.scope}), retry after {error.retry_after}s")
+    return HTTPException(
+        status_code=429,
+        detail=(
+            f"Too many submissions from this {error.scope} "
+            f"(limit {error.limit} per {error.window_seconds}s), please retry later"
+        ),
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
+
+def _service_busy(error: InferenceQueueFull) -> HTTPException:
+    """Build a 503 response telling clients when to retry"""
+    return HTTPException(
+        status_code=503,
+        detail="Detection service is busy, please retry later",
+        headers={'Retry-After': str(error.retry_after)}
+    )
 
 
 def _get_verification_recommendation(
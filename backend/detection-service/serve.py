@@ -0,0 +1,186 @@
+"""
+Prefork server: load the model once, then fork workers that share it
+
+One uvicorn process uses about one core (the GIL plus synchronous
+OpenCV/skimage work), while ``uvicorn --workers`` spawns fresh interpreters
+that each import torch and load their own copy of the weights. Here the
+parent imports the app, loads and warms up the detector (warm-up also fuses
+the layers, so the fused weights are shared too), freezes the GC so
+collections do not dirty the shared pages, binds the listening socket and
+forks the workers. Each worker restarts the threads that do not survive
+fork, limits torch/OpenCV to its share of the cores and serves the shared
+socket; the parent restarts workers that die and forwards SIGTERM/SIGINT.
+
+Each worker has its own Prometheus registry, so before the app is imported
+PROMETHEUS_MULTIPROC_DIR is pointed at a directory that is emptied on
+start: the histograms are written there per process and /metrics on any
+worker sums them.
+
+Only the torch backend is preloaded: ONNX Runtime and OpenVINO sessions own
+thread pools that do not survive fork, so with those backends each worker
+loads the model itself.
+
+Usage (from the detection-service directory):
+    python serve.py
+    python serve.py --workers 4 --threads-per-worker 2
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from config.settings import settings
+
+logger = logging.getLogger('serve')
+
+# Respawning faster than this means workers crash on startup
+_MIN_WORKER_LIFETIME_S = 5.0
+
+
+def threads_per_worker(workers: int, threads: int) -> int:
+    """Threads each worker may use: explicit, or the cores split evenly"""
+    if threads > 0:
+        return threads
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_metrics_dir() -> str:
+    """Point prometheus_client at an empty multiprocess directory"""
+    path = os.environ.setdefault(
+        'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'detection-service-metrics')
+    )
+    os.makedirs(path, exist_ok=True)
+    # Files left by a previous run would be summed into this one's
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+    return path
+
+
+def preload(model_loader):
+    """Load and warm up the model in the parent so workers inherit it"""
+    if not settings.model_preload:
+        return
+    if settings.yolo_backend != 'torch':
+        logger.warning(
+            f"{settings.yolo_backend} sessions do not survive fork; each worker loads its own model"
+        )
+        return
+    model_loader.load()
+    model_loader.warm_up(
+        settings.model_warmup_iterations,
+        settings.model_warmup_width,
+        settings.model_warmup_height
+    )
+
+
+def run_worker(app, sock: socket.socket, num_threads: int):
+    """Body of a forked worker; never returns"""
+    import uvicorn
+    from models.model_loader import model_loader
+
+    # Back to default handlers; uvicorn installs its own graceful ones
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    model_loader.after_fork(num_threads)
+
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        log_config=None,
+        timeout_graceful_shutdown=30,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.serve_forwarded_allow_ips
+    ))
+    try:
+        server.run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default=settings.serve_host)
+    parser.add_argument('--port', type=int, default=settings.serve_port)
+    parser.add_argument('--workers', type=int, default=settings.serve_workers)
+    parser.add_argument('--threads-per-worker', type=int, default=settings.serve_threads_per_worker)
+    args = parser.parse_args()
+
+    num_threads = threads_per_worker(args.workers, args.threads_per_worker)
+    # Before torch and OpenCV are imported, so no pool starts oversized
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(num_threads)
+    # Likewise before anything imports prometheus_client
+    prepare_metrics_dir()
+
+    from main import app
+    from models.model_loader import model_loader
+    from prometheus_client import multiprocess
+
+    preload(model_loader)
+    sock = bind_socket(args.host, args.port)
+    # Keep the collector off the inherited heap so it stays shared
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            run_worker(app, sock, num_threads)
+        workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(
+        f"Serving on {args.host}:{args.port} with {args.workers} worker(s), "
+        f"{num_threads} thread(s) each"
+    )
+    for _ in range(args.workers):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None:
+            continue
+        multiprocess.mark_process_dead(pid)
+        if stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+        if time.monotonic() - started < _MIN_WORKER_LIFETIME_S:
+            time.sleep(_MIN_WORKER_LIFETIME_S)
+        spawn()
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Exported inference backends must detect the same objects as torch
+
+Skipped for backends whose runtime is not installed or whose export has not
+been generated (python -m models.export --weights <model> --backends ...).
+"""
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from config.settings import settings
+from utils.image_context import DecodedImage
+
+yolo_detector = pytest.importorskip('models.yolo_detector')
+YOLODetector = yolo_detector.YOLODetector
+
+CONF = 0.25
+IOU = 0.9
+CONF_TOLERANCE = 0.02
+RUNTIMES = {'onnxruntime': 'onnxruntime', 'torchscript': 'torch', 'openvino': 'openvino'}
+
+
+def fixture_images() -> dict:
+    """Photos shipped with ultralytics plus a synthetic street-sized frame"""
+    import ultralytics
+    assets = Path(ultralytics.__file__).parent / 'assets'
+    images = {path.name: DecodedImage(path.read_bytes()) for path in sorted(assets.glob('*.jpg'))}
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(1080 // 16, 1920 // 16, 3), dtype=np.uint8)
+    image = cv2.resize(image, (1920, 1080), interpolation=cv2.INTER_CUBIC)
+    images['synthetic_1920x1080'] = DecodedImage(cv2.imencode('.jpg', image)[1].tobytes())
+    return images
+
+
+def iou(a: dict, b: dict) -> float:
+    x1, y1 = max(a['x1'], b['x1']), max(a['y1'], b['y1'])
+    x2, y2 = min(a['x2'], b['x2']), min(a['y2'], b['y2'])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a['x2'] - a['x1']) * (a['y2'] - a['y1']) + (b['x2'] - b['x1']) * (b['y2'] - b['y1']) - inter
+    return inter / union if union else 0.0
+
+
+@pytest.fixture(scope='module')
+def reference():
+    if not Path(settings.yolo_model_path).exists():
+        pytest.skip(f"Model weights not found at {settings.yolo_model_path}")
+    return YOLODetector(settings.yolo_model_path, CONF, backend='torch')
+
+
+@pytest.mark.parametrize('backend', sorted(RUNTIMES))
+def test_backend_matches_torch(reference, backend):
+    pytest.importorskip(RUNTIMES[backend])
+    try:
+        candidate = YOLODetector(settings.yolo_model_path, CONF, backend=backend)
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+
+    for name, image in fixture_images().items():
+        expected = reference.detect(image)['detections']
+        actual = list(candidate.detect(image)['detections'])
+        assert len(actual) == len(expected), name
+
+        for detection in expected:
+            best = max(
+                (c for c in actual if c['issue_type'] == detection['issue_type']),
+                key=lambda c: iou(detection['bbox'], c['bbox']),
+                default=None
+            )
+            assert best is not None and iou(detection['bbox'], best['bbox']) >= IOU, name
+            assert abs(detection['confidence'] - best['confidence']) <= CONF_TOLERANCE, name
+            actual.remove(best)
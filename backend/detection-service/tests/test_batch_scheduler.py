@@ -0,0 +1,32 @@
+"""
+BatchScheduler: single and multi-image submissions share batches
+"""
+import threading
+
+import numpy as np
+
+from models.batch_scheduler import BatchScheduler
+
+
+def test_pair_shares_a_batch_with_concurrent_images():
+    batches = []
+
+    def predict(images, conf_threshold):
+        batches.append(len(images))
+        return [int(image[0, 0, 0]) for image in images]
+
+    scheduler = BatchScheduler(predict, max_batch_size=4, max_wait_ms=200)
+    image = lambda value: np.full((2, 2, 3), value, dtype=np.uint8)
+    single = {}
+    thread = threading.Thread(target=lambda: single.update(result=scheduler.submit(image(7), 0.5)))
+    try:
+        thread.start()
+        # Before/after pair of a /verify-completion request
+        assert scheduler.submit_many([image(1), image(2)], 0.5) == [1, 2]
+        thread.join()
+    finally:
+        scheduler.shutdown()
+
+    assert single['result'] == 7
+    assert batches == [3]
+    assert scheduler.stats()['images_total'] == 3
@@ -0,0 +1,101 @@
+import io
+import json
+import tarfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.detection
+from config.settings import settings
+from models.bulk_detection import iter_directory, iter_tarball
+from utils.rate_limiter import RateLimiter
+
+
+def make_tarball(members: dict, mode: str = 'w:gz') -> io.BytesIO:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+
+def test_iter_tarball_skips_oversized_members_unread():
+    archive = make_tarball({
+        'a.jpg': b'x' * 10,
+        'notes.txt': b'ignored',
+        'big.jpg': b'x' * 1000,
+        'c.png': b'y' * 20
+    })
+    assert list(iter_tarball(archive, max_bytes=100)) == [
+        ('a.jpg', b'x' * 10), ('big.jpg', None), ('c.png', b'y' * 20)
+    ]
+
+
+def test_iter_tarball_without_limit_reads_everything():
+    archive = make_tarball({'big.jpg': b'x' * 1000}, mode='w')
+    assert list(iter_tarball(archive)) == [('big.jpg', b'x' * 1000)]
+
+
+def test_iter_directory_applies_the_limit(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'b.jpg').write_bytes(b'x' * 1000)
+    (tmp_path / 'a.jpg').write_bytes(b'x' * 10)
+    assert list(iter_directory(str(tmp_path), max_bytes=100)) == [
+        ('a.jpg', b'x' * 10), ('sub/b.jpg', None)
+    ]
+
+
+@pytest.fixture
+def batch_client(monkeypatch):
+    """Client for the detection routes with a stub model and no rate limits"""
+    class StubBulkDetector:
+        def __init__(self, detector, **kwargs):
+            pass
+
+        def run(self, items):
+            for filename, data in items:
+                yield {'type': 'result', 'filename': filename, 'bytes': len(data)}
+
+    monkeypatch.setattr(routes.detection, 'rate_limiter', RateLimiter(None, {}))
+    monkeypatch.setattr(routes.detection, 'BulkDetector', StubBulkDetector)
+    monkeypatch.setattr(routes.detection.model_loader, 'get', lambda: None)
+    app = FastAPI()
+    app.include_router(routes.detection.router)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _bulk_slots_free() -> bool:
+    slots = routes.detection._bulk_slots
+    acquired = 0
+    while slots.acquire(blocking=False):
+        acquired += 1
+    for _ in range(acquired):
+        slots.release()
+    return acquired == settings.bulk_max_jobs
+
+
+def test_batch_stream_releases_its_slot(batch_client):
+    response = batch_client.post(
+        '/api/v1/issues/detect/batch', files=[('images', ('a.jpg', b'x' * 10, 'image/jpeg'))]
+    )
+    assert response.status_code == 200
+    assert json.loads(response.text.splitlines()[0]) == {'type': 'result', 'filename': 'a.jpg', 'bytes': 10}
+    assert _bulk_slots_free()
+
+
+def test_batch_handler_error_releases_its_slot(batch_client, monkeypatch):
+    def fail(upload):
+        raise OSError("spool file lost")
+
+    monkeypatch.setattr(routes.detection, '_detach_upload', fail)
+    for _ in range(settings.bulk_max_jobs + 1):
+        response = batch_client.post(
+            '/api/v1/issues/detect/batch', files=[('images', ('a.jpg', b'x' * 10, 'image/jpeg'))]
+        )
+        # Never 503: the failed requests gave their slots back
+        assert response.status_code == 500
+    assert _bulk_slots_free()
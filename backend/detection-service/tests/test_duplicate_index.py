@@ -0,0 +1,94 @@
+import random
+import time
+
+import fakeredis
+import pytest
+
+from utils.duplicate_index import NearDuplicateIndex
+
+
+def brute_force(stored: dict, query: int, radius: int) -> list:
+    return sorted(
+        (bin(h ^ query).count('1'), payload)
+        for h, payload in stored.items()
+        if bin(h ^ query).count('1') <= radius
+    )
+
+
+@pytest.mark.parametrize('num_chunks', [3, 4])
+def test_query_matches_brute_force(num_chunks):
+    rng = random.Random(0)
+    index = NearDuplicateIndex(radius=6, num_chunks=num_chunks)
+    stored = {}
+    for i in range(2000):
+        image_hash = rng.getrandbits(64)
+        stored[image_hash] = i
+        index.add(image_hash, i)
+
+    base = list(stored)[:50]
+    for image_hash in base:
+        # Flip up to 8 random bits so some queries fall outside the radius
+        query = image_hash
+        for bit in rng.sample(range(64), rng.randint(0, 8)):
+            query ^= 1 << bit
+        found = sorted((distance, payload) for distance, payload in index.query(query))
+        assert found == brute_force(stored, query, 6)
+
+
+def test_entries_expire():
+    index = NearDuplicateIndex(radius=2, ttl_seconds=60)
+    index.add(0b1011, {'id': 'old'}, created_at=time.time() - 120)
+    index.add(0b1011, {'id': 'new'})
+
+    assert [payload['id'] for _, payload in index.query(0b1011)] == ['new']
+    assert len(index) == 1
+
+
+def make_index(server, page_size=7):
+    index = NearDuplicateIndex(
+        radius=4, redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    )
+    index._log.page_size = page_size
+    return index
+
+
+async def store(index, count, created_at):
+    pipe = index._log.redis_client.pipeline()
+    for i in range(count):
+        index.add(i << 20, {'n': i}, created_at=created_at, pipe=pipe)
+    await pipe.execute()
+
+
+@pytest.mark.asyncio
+async def test_backfill_pages_through_the_ttl_window():
+    server = fakeredis.FakeServer()
+    writer = make_index(server)
+    # Same score for every entry: paging must still make progress
+    await store(writer, 30, created_at=time.time() - 600)
+
+    reader = make_index(server)
+    assert await reader.sync(force=True) == 0  # requests only see new entries
+    assert await reader.backfill()
+    assert len(reader) == 30
+    assert reader.query(5 << 20)[0][1] == {'n': 5}
+
+
+@pytest.mark.asyncio
+async def test_pull_reads_one_page_per_sync():
+    server = fakeredis.FakeServer()
+    reader = make_index(server, page_size=10)
+    writer = make_index(server)
+    await store(writer, 25, created_at=time.time())
+
+    counts = [await reader.sync(force=True) for _ in range(4)]
+    assert counts[0] == 10
+    assert sum(counts) == 25
+    assert len(reader) == 25
+
+
+@pytest.mark.asyncio
+async def test_backfill_retries_after_redis_error():
+    index = NearDuplicateIndex(
+        redis_client=fakeredis.FakeAsyncRedis(connected=False, decode_responses=True)
+    )
+    assert not await index.backfill()
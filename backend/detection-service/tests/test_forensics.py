@@ -0,0 +1,83 @@
+"""
+Forensic features: error level analysis scoring, gating and degraded paths
+"""
+import cv2
+import numpy as np
+import pytest
+
+from config.settings import settings
+from models.yolo_detector import YOLODetector
+from utils.forensics import ForensicFeatures, extract_features
+from utils.image_context import DecodedImage
+from utils.image_validator import check_image_manipulation
+
+
+@pytest.fixture
+def photo():
+    rng = np.random.default_rng(0)
+    image = cv2.resize(rng.integers(0, 256, (60, 80, 3), dtype=np.uint8), (1600, 1200))
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+
+
+def test_error_levels_unless_disabled(photo):
+    bgr = DecodedImage(photo).bgr
+
+    features = extract_features(bgr)
+    assert features.ela_mean > 0 and features.ela_contrast >= 1.0
+
+    features = extract_features(bgr, error_levels=False)
+    assert features.ela_mean is None and features.ela_contrast is None
+    assert features.laplacian_variance > 0
+
+
+def test_manipulation_check_reports_ela_per_setting(photo, monkeypatch):
+    result = check_image_manipulation(photo)
+    assert 'error' not in result
+    assert set(result['error_level_analysis']) == {'mean', 'contrast'}
+    assert 'Inconsistent compression error levels' not in result['indicators']
+
+    monkeypatch.setattr(settings, 'forensics_ela', False)
+    result = check_image_manipulation(photo)
+    assert result['error_level_analysis'] is None
+
+
+def _features(ela_contrast):
+    # Passes every other check
+    return ForensicFeatures(
+        laplacian_variance=500.0, histogram_variance=1e6, edge_density=0.1,
+        mean_brightness=120.0, mean_saturation=80.0,
+        ela_mean=None if ela_contrast is None else 1.0, ela_contrast=ela_contrast
+    )
+
+
+@pytest.mark.parametrize('ela_contrast, score', [(None, 0.0), (5.0, 0.0), (35.0, 0.2)])
+def test_error_level_contrast_is_scored(photo, monkeypatch, ela_contrast, score):
+    monkeypatch.setattr(DecodedImage, 'forensics', property(lambda self: _features(ela_contrast)))
+    result = check_image_manipulation(photo)
+
+    assert result['confidence'] == score
+    assert result['indicators'] == (['Inconsistent compression error levels'] if score else [])
+    assert not result['manipulated']
+
+
+def test_failed_error_levels_are_unavailable(photo, monkeypatch):
+    monkeypatch.setattr(cv2, 'imencode', lambda *args, **kwargs: (False, None))
+    features = extract_features(DecodedImage(photo).bgr, error_levels=True)
+
+    assert features.ela_mean is None and features.ela_contrast is None
+    assert features.edge_density > 0
+
+
+def test_fraud_indicators_survive_forensics_errors(photo, monkeypatch):
+    def broken(self):
+        raise ValueError("analysis failed")
+
+    monkeypatch.setattr(DecodedImage, 'forensics', property(broken))
+    detector = YOLODetector.__new__(YOLODetector)
+    image = DecodedImage(cv2.imencode('.jpg', np.zeros((240, 320, 3), dtype=np.uint8))[1].tobytes())
+
+    result = detector._calculate_fraud_indicators(image, [])
+
+    # Only the checks that do not need image statistics remain
+    assert result['indicators'] == ['Image resolution below recommended minimum']
+    assert result['risk_score'] == 0.1
@@ -0,0 +1,134 @@
+"""
+GeofenceIndex raster shortcut vs. exact ray casting
+"""
+import math
+
+import numpy as np
+import pytest
+
+from utils.geofence_index import GeofenceIndex, _INSIDE, _OUTSIDE, _ray_cast
+
+# Concave "C" shape around Jaipur with a square hole in its spine
+C_SHAPE = [
+    (75.70, 26.80), (75.90, 26.80), (75.90, 26.84), (75.74, 26.84),
+    (75.74, 26.96), (75.90, 26.96), (75.90, 27.00), (75.70, 27.00)
+]
+HOLE = [(75.71, 26.89), (75.73, 26.89), (75.73, 26.91), (75.71, 26.91)]
+
+
+def _circle(lon, lat, radius, vertices):
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    # Jagged radius so the raster has boundary cells with many edges
+    radii = radius * (1 + 0.05 * np.sin(angles * 37))
+    return list(zip(lon + radii * np.cos(angles), lat + radii * np.sin(angles)))
+
+
+def _exact(rings, lats, lons):
+    edges = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=np.float64)
+        edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))
+    return _ray_cast(lons, lats, np.concatenate(edges))
+
+
+def _random_points(rings, count, seed=0):
+    points = np.concatenate([np.asarray(r) for r in rings])
+    low, high = points.min(axis=0) - 0.02, points.max(axis=0) + 0.02
+    rng = np.random.default_rng(seed)
+    lons = rng.uniform(low[0], high[0], count)
+    lats = rng.uniform(low[1], high[1], count)
+    return lats, lons
+
+
+@pytest.mark.parametrize('rings', [
+    [C_SHAPE],
+    [C_SHAPE, HOLE],
+    # More than 256 edges: boundary points use the per-row edge buckets
+    [_circle(75.80, 26.90, 0.1, 2000)],
+], ids=['concave', 'hole', 'row-buckets'])
+@pytest.mark.parametrize('raster_size', [8, 128])
+def test_matches_exact_ray_casting(rings, raster_size):
+    index = GeofenceIndex(cell_size_deg=0.05, raster_size=raster_size)
+    index.add('fence', rings)
+    lats, lons = _random_points(rings, 20000)
+
+    expected = _exact(rings, lats, lons)
+    assert expected.any() and not expected.all()
+    np.testing.assert_array_equal(index.contains_batch(lats, lons)[:, 0], expected)
+    # The single-point path agrees with the batch path
+    for lat, lon, inside in zip(lats[:300], lons[:300], expected[:300]):
+        assert index.contains(lat, lon) == (['fence'] if inside else [])
+
+
+def test_raster_cells_are_never_misclassified():
+    index = GeofenceIndex(raster_size=64)
+    index.add('fence', [C_SHAPE, HOLE])
+    fence = index._fences[0]
+
+    # Every corner of a cell marked inside/outside must agree with it exactly
+    rows, cols = np.nonzero(fence.raster != 2)
+    for d_row, d_col in ((0, 0), (0, 1), (1, 0), (1, 1)):
+        x = fence.min_x + (cols + d_col) * fence.cell
+        y = fence.min_y + (rows + d_row) * fence.cell
+        exact = _ray_cast(x, y, fence.edges)
+        state = fence.raster[rows, cols]
+        assert not np.any(exact & (state == _OUTSIDE))
+        assert np.all(exact | (state != _INSIDE))
+
+
+def test_hole_and_multipolygon():
+    index = GeofenceIndex()
+    index.add('c', [C_SHAPE, HOLE])
+    index.add('east', [[(76.00, 26.80), (76.10, 26.80), (76.10, 26.90), (76.00, 26.90)],
+                       [(76.20, 26.80), (76.30, 26.80), (76.30, 26.90), (76.20, 26.90)]])
+
+    assert index.contains(26.82, 75.80) == ['c']
+    # Inside the hole
+    assert index.contains(26.90, 75.72) == []
+    # In the mouth of the C
+    assert index.contains(26.90, 75.85) == []
+    assert index.contains(26.85, 76.25) == ['east']
+    assert index.contains(26.85, 76.15) == []
+
+
+def test_overlapping_fences_and_batch_columns():
+    index = GeofenceIndex()
+    index.add('big', [[(75.0, 26.0), (76.0, 26.0), (76.0, 27.0), (75.0, 27.0)]])
+    index.add('small', [[(75.4, 26.4), (75.6, 26.4), (75.6, 26.6), (75.4, 26.6)]])
+
+    assert index.fence_ids == ['big', 'small']
+    assert sorted(index.contains(26.5, 75.5)) == ['big', 'small']
+    mask = index.contains_batch(np.array([26.5, 26.1, 30.0]), np.array([75.5, 75.1, 75.5]))
+    np.testing.assert_array_equal(mask, [[True, True], [True, False], [False, False]])
+    np.testing.assert_array_equal(
+        index.contains_any(np.array([26.5, 30.0]), np.array([75.5, 75.5])), [True, False]
+    )
+
+
+def test_empty_inputs():
+    index = GeofenceIndex()
+    assert index.contains(26.9, 75.8) == []
+    assert index.contains_batch(np.array([26.9]), np.array([75.8])).shape == (1, 0)
+
+    index.add('c', [C_SHAPE])
+    assert index.contains_batch(np.array([]), np.array([])).shape == (0, 1)
+
+
+def test_degenerate_ring_is_rejected():
+    with pytest.raises(ValueError):
+        GeofenceIndex().add('line', [[(75.0, 26.0), (76.0, 26.0)]])
+
+
+def test_from_geojson_ids():
+    square = [[[75.0, 26.0], [76.0, 26.0], [76.0, 27.0], [75.0, 27.0], [75.0, 26.0]]]
+    data = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'ward': 'W1'}, 'geometry': {'type': 'Polygon', 'coordinates': square}},
+        {'type': 'Feature', 'id': 7, 'properties': {}, 'geometry': {'type': 'MultiPolygon', 'coordinates': [square]}},
+        {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Point', 'coordinates': [75.5, 26.5]}},
+        {'type': 'Feature', 'properties': None, 'geometry': {'type': 'Polygon', 'coordinates': square}},
+    ]}
+    index = GeofenceIndex.from_geojson(data, id_property='ward')
+
+    assert index.fence_ids == ['W1', '7', '3']
+    assert index.contains(26.5, 75.5) == ['W1', '7', '3']
+    assert len(GeofenceIndex.from_geojson({'type': 'Polygon', 'coordinates': square})) == 1
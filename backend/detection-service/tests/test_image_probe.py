@@ -0,0 +1,174 @@
+"""
+Header probe on well-formed, truncated and malformed EXIF blocks
+"""
+import struct
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.image_probe import probe_image
+
+ASCII, SHORT, LONG, RATIONAL = 2, 3, 4, 5
+
+
+def _tiff(ifd0, exif=None, gps=None):
+    """
+    Little-endian TIFF block with IFD0 and optional EXIF and GPS IFDs
+
+    Each IFD is a list of (tag, type, count, payload): payloads of up to 4
+    bytes are stored in the entry, longer ones after the IFD. A payload of
+    None writes the count with a value offset past the end of the block.
+    """
+    ifds = [list(ifd0)]
+    if exif is not None:
+        ifds[0].append((0x8769, LONG, 1, None))
+        ifds.append(list(exif))
+    if gps is not None:
+        ifds[0].append((0x8825, LONG, 1, None))
+        ifds.append(list(gps))
+
+    # Lay out the IFDs one after another, each followed by its long values
+    offsets, position = [], 8
+    for ifd in ifds:
+        offsets.append(position)
+        position += 2 + 12 * len(ifd) + 4
+        position += sum(len(p) for _, _, _, p in ifd if p is not None and len(p) > 4)
+
+    pointers = {0x8769: offsets[1] if exif is not None else 0}
+    if gps is not None:
+        pointers[0x8825] = offsets[-1]
+
+    block = bytearray(b'II*\x00' + struct.pack('<I', offsets[0]))
+    for index, ifd in enumerate(ifds):
+        extra = offsets[index] + 2 + 12 * len(ifd) + 4
+        entries, data = bytearray(struct.pack('<H', len(ifd))), bytearray()
+        for tag, field_type, count, payload in ifd:
+            if payload is None and tag in pointers and index == 0:
+                payload = struct.pack('<I', pointers[tag])
+            entries += struct.pack('<HHI', tag, field_type, count)
+            if payload is None:
+                entries += struct.pack('<I', 0xFFFFFF00)
+            elif len(payload) <= 4:
+                entries += payload.ljust(4, b'\x00')
+            else:
+                entries += struct.pack('<I', extra + len(data))
+                data += payload
+        block += entries + b'\x00\x00\x00\x00' + data
+    return bytes(block)
+
+
+def _jpeg(tiff):
+    """Small JPEG with the TIFF block inserted as its APP1 Exif segment"""
+    ok, encoded = cv2.imencode('.jpg', np.zeros((48, 64, 3), dtype=np.uint8))
+    assert ok
+    app1 = b'Exif\x00\x00' + tiff
+    return encoded[:2].tobytes() + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1 + encoded[2:].tobytes()
+
+
+def _rationals(*values):
+    return b''.join(struct.pack('<II', numerator, denominator) for numerator, denominator in values)
+
+
+MAKE = (0x010F, ASCII, 6, b'Canon\x00')
+DATETIME = (0x9003, ASCII, 20, b'2024:01:02 03:04:05\x00')
+LAT_REF = (0x0001, ASCII, 2, b'N\x00')
+LAT = (0x0002, RATIONAL, 3, _rationals((26, 1), (54, 1), (617, 25)))
+LON_REF = (0x0003, ASCII, 2, b'E\x00')
+LON = (0x0004, RATIONAL, 3, _rationals((75, 1), (47, 1), (0, 1)))
+
+
+def test_reads_tags_and_dimensions():
+    result = probe_image(_jpeg(_tiff([MAKE], exif=[DATETIME], gps=[LAT_REF, LAT, LON_REF, LON])))
+
+    assert (result['format'], result['width'], result['height']) == ('JPEG', 64, 48)
+    assert result['exif']['make'] == 'Canon'
+    assert result['exif']['datetime'] == '2024:01:02 03:04:05'
+    assert result['exif']['gps_latitude'] == '[26, 54, 617/25]'
+    assert result['gps'] == pytest.approx((26.0 + 54 / 60 + 24.68 / 3600, 75.0 + 47 / 60))
+
+
+def test_huge_rational_count_is_rejected_without_allocating():
+    # Claims ~4 billion values; must fail the bounds check, not build a format
+    # string of that size
+    bad_lat = (0x0002, RATIONAL, 0xFFFFFFF0, _rationals((26, 1), (54, 1), (0, 1)))
+    result = probe_image(_jpeg(_tiff([MAKE], gps=[LAT_REF, bad_lat, LON_REF, LON])))
+
+    assert result['exif']['gps_latitude'] == ''
+    assert result['gps'] is None
+    # The other tags survive the bad field
+    assert result['exif']['make'] == 'Canon'
+    assert result['exif']['gps_longitude'] == '[75, 47, 0]'
+
+
+@pytest.mark.parametrize('field', [
+    # More values than degrees/minutes/seconds
+    (0x0002, RATIONAL, 4, _rationals((1, 1), (2, 1), (3, 1), (4, 1))),
+    # Values past the end of the block
+    (0x0002, RATIONAL, 3, None),
+    # Not a numeric type
+    (0x0002, ASCII, 8, b'26,54,0\x00'),
+])
+def test_malformed_gps_field_only_loses_that_tag(field):
+    result = probe_image(_jpeg(_tiff([MAKE], exif=[DATETIME], gps=[LAT_REF, field, LON_REF, LON])))
+
+    assert result['exif']['gps_latitude'] == ''
+    assert result['exif']['gps_longitude'] == '[75, 47, 0]'
+    assert result['exif']['make'] == 'Canon'
+    assert result['exif']['datetime'] == '2024:01:02 03:04:05'
+
+
+def test_bad_ifd_pointer_only_loses_that_ifd():
+    # EXIF pointer with two values instead of one
+    bad_pointer = (0x8769, LONG, 2, struct.pack('<HH', 8, 8))
+    block = _tiff([MAKE, bad_pointer], gps=[LAT_REF, LAT, LON_REF, LON])
+    result = probe_image(_jpeg(block))
+
+    assert result['exif']['datetime'] == ''
+    assert result['exif']['make'] == 'Canon'
+    assert result['gps'] is not None
+
+
+def test_ascii_past_end_of_block_is_skipped():
+    bad_make = (0x010F, ASCII, 0x7FFFFFFF, None)
+    result = probe_image(_jpeg(_tiff([bad_make], exif=[DATETIME])))
+
+    assert result['exif']['make'] == ''
+    assert result['exif']['datetime'] == '2024:01:02 03:04:05'
+
+
+def test_ifd_count_past_end_of_block():
+    block = bytearray(_tiff([MAKE]))
+    # IFD0 claims 0xFFFF entries
+    block[8:10] = b'\xff\xff'
+    result = probe_image(_jpeg(bytes(block)))
+
+    assert result['exif'] == {
+        'datetime': '', 'make': '', 'model': '', 'gps_latitude': '', 'gps_longitude': ''
+    }
+
+
+@pytest.mark.parametrize('cut', [4, 9, 20, 40, 80])
+def test_truncated_exif_block(cut):
+    block = _tiff([MAKE], exif=[DATETIME], gps=[LAT_REF, LAT, LON_REF, LON])
+    result = probe_image(_jpeg(block[:cut]))
+
+    # Whatever is left must not raise; dimensions come from the frame header
+    assert (result['width'], result['height']) == (64, 48)
+    assert result['gps'] is None
+
+
+@pytest.mark.parametrize('cut', [3, 10, 30, 200])
+def test_truncated_file(cut):
+    data = _jpeg(_tiff([MAKE], exif=[DATETIME]))
+    result = probe_image(data[:cut])
+
+    assert result['format'] == 'JPEG'
+    assert isinstance(result['exif'], dict)
+
+
+def test_unrecognised_data():
+    result = probe_image(b'not an image at all')
+
+    assert result['format'] is None
+    assert result['gps'] is None
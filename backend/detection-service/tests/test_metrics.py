@@ -0,0 +1,59 @@
+"""
+/metrics under prefork: histograms summed across workers, stats per worker
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from prometheus_client import REGISTRY
+
+from utils.metrics import StatsCollector, scrape_registry
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# prometheus_client picks its value storage at import time, so each case
+# runs in a fresh interpreter
+SCRAPE = textwrap.dedent('''
+    import os
+    from prometheus_client import generate_latest
+    from utils.metrics import REQUEST_SECONDS, StatsCollector, scrape_registry
+
+    pid = os.fork()
+    if pid == 0:
+        REQUEST_SECONDS.labels('detect').observe(0.2)
+        os._exit(0)
+    os.waitpid(pid, 0)
+    REQUEST_SECONDS.labels('detect').observe(0.3)
+
+    collector = StatsCollector('queue', lambda: {'depth': 3, 'rejected_total': 1}, counters=['rejected_total'])
+    print(generate_latest(scrape_registry([collector])).decode())
+''')
+
+
+def _scrape(env: dict) -> str:
+    return subprocess.run(
+        [sys.executable, '-c', SCRAPE], cwd=SERVICE_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="prefork needs fork")
+def test_histograms_are_summed_across_workers(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    output = _scrape(env)
+
+    assert 'detection_request_duration_seconds_count{endpoint="detect"} 2.0' in output
+    assert 'detection_request_duration_seconds_sum{endpoint="detect"} 0.5' in output
+    assert 'queue_depth{pid="' in output
+    assert 'queue_rejected_total{pid="' in output
+
+
+def test_single_process_scrapes_the_default_registry(monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+    collector = StatsCollector('queue', lambda: {'depth': 3})
+
+    assert scrape_registry([collector]) is REGISTRY
+    family, = collector.collect()
+    assert [(sample.labels, sample.value) for sample in family.samples] == [({}, 3)]
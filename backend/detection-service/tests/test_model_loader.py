@@ -0,0 +1,44 @@
+"""
+ModelLoader start-up in serve.py workers forked from a preloading parent
+"""
+from models.model_loader import ModelLoader
+
+
+class _StubDetector:
+    def __init__(self):
+        self.threads = None
+
+    def after_fork(self, num_threads):
+        self.threads = num_threads
+
+
+def _loader(monkeypatch, detector=None, warmup_seconds=None):
+    loader = ModelLoader()
+    loader._detector = detector
+    loader.warmup_seconds = warmup_seconds
+    warm_ups = []
+    monkeypatch.setattr(loader, 'load', lambda: None)
+    monkeypatch.setattr(loader, 'warm_up', lambda *args: warm_ups.append(args))
+    return loader, warm_ups
+
+
+def test_worker_of_preloading_parent_skips_warm_up(monkeypatch):
+    detector = _StubDetector()
+    loader, warm_ups = _loader(monkeypatch, detector, warmup_seconds=1.2)
+
+    loader.after_fork(2)
+    loader.load_and_warm_up()
+
+    assert detector.threads == 2
+    assert loader.ready and loader.preloaded
+    assert warm_ups == []
+
+
+def test_worker_without_preload_warms_up(monkeypatch):
+    loader, warm_ups = _loader(monkeypatch)
+
+    loader.after_fork(2)
+    loader.load_and_warm_up()
+
+    assert loader.ready and not loader.preloaded
+    assert len(warm_ups) == 1
@@ -0,0 +1,115 @@
+"""
+Sliding-window rate limiter (Lua script on fakeredis) and its use in /detect
+"""
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.detection
+from utils.rate_limiter import RateLimiter, RateLimitExceeded
+
+pytest.importorskip('lupa', reason="fakeredis needs lupa to run Lua scripts")
+
+
+def _limiter(server=None, limits=None, **kwargs):
+    redis_client = None
+    if server is not None:
+        redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    return RateLimiter(redis_client, limits or {'device': (3, 3600)}, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_window_is_shared_between_processes():
+    server = fakeredis.FakeServer()
+    first, second = _limiter(server), _limiter(server)
+
+    assert await first.hit('device', 'd1') == 1
+    assert await second.hit('device', 'd1') == 2
+    assert await first.hit('device', 'd1') == 3
+    # second's local bucket still has tokens; Redis rejects
+    with pytest.raises(RateLimitExceeded) as error:
+        await second.hit('device', 'd1')
+    assert error.value.scope == 'device'
+    assert 3590 <= error.value.retry_after <= 3600
+    assert second.stats()['redis_rejections_total'] == 1
+
+    # Blocked locally afterwards, without asking Redis
+    with pytest.raises(RateLimitExceeded):
+        await second.hit('device', 'd1')
+    assert second.stats()['local_rejections_total'] == 1
+    # Other identities are unaffected
+    assert await second.hit('device', 'd2') == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_hit_key_is_counted_once():
+    server = fakeredis.FakeServer()
+    limiter = _limiter(server)
+
+    assert await limiter.hit('device', 'd1', 'image-a') == 1
+    # Retries of the same upload, also when landing on another process
+    assert await limiter.hit('device', 'd1', 'image-a') == 1
+    assert await _limiter(server).hit('device', 'd1', 'image-a') == 1
+    assert await limiter.hit('device', 'd1', 'image-b') == 2
+    assert await limiter.hit('device', 'd1', 'image-c') == 3
+
+    # At the limit, a retry of a counted upload still goes through
+    assert await limiter.hit('device', 'd1', 'image-c') == 3
+    assert await _limiter(server).hit('device', 'd1', 'image-a') == 3
+    with pytest.raises(RateLimitExceeded):
+        await limiter.hit('device', 'd1', 'image-d')
+    with pytest.raises(RateLimitExceeded):
+        await limiter.hit('device', 'd1', 'image-d')
+
+
+@pytest.mark.asyncio
+async def test_local_buckets_without_redis():
+    for limiter in (_limiter(), RateLimiter(fakeredis.FakeAsyncRedis(connected=False), {'device': (3, 3600)})):
+        for _ in range(3):
+            assert await limiter.hit('device', 'd1') == 0
+        with pytest.raises(RateLimitExceeded):
+            await limiter.hit('device', 'd1')
+        # Repeating the last key does not use a token
+        assert await limiter.hit('device', 'd2', 'image-a') == 0
+        assert await limiter.hit('device', 'd2', 'image-a') == 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_scope():
+    limiter = _limiter(fakeredis.FakeServer(), limits={'device': (0, 3600), 'ip': (1, 60)})
+    for _ in range(5):
+        assert await limiter.hit('device', 'd1') == 0
+    assert await limiter.hit('ip', '10.0.0.1') == 1
+
+
+@pytest.fixture
+def detect_client(monkeypatch):
+    """Client for the detection routes with a fresh limiter: 1 hit per IP"""
+    server = fakeredis.FakeServer()
+    limiter = _limiter(server, limits={'device': (5, 3600), 'ip': (1, 3600)})
+    monkeypatch.setattr(routes.detection, 'rate_limiter', limiter)
+    app = FastAPI()
+    app.include_router(routes.detection.router)
+    return TestClient(app), fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_do_not_charge_the_device(detect_client):
+    client, redis_client = detect_client
+    form = {'latitude': 26.9, 'longitude': 75.8, 'device_id': 'd1', 'timestamp': '2024-01-01T00:00:00Z'}
+
+    # Not an image: rejected while reading the upload (415)
+    response = client.post(
+        '/api/v1/issues/detect', data=form, files={'image': ('a.jpg', b'GIF89a' + b'0' * 64, 'image/jpeg')}
+    )
+    assert response.status_code == 415
+    # Over the IP limit: rejected before the upload is read (429)
+    response = client.post(
+        '/api/v1/issues/detect', data=form, files={'image': ('a.jpg', b'GIF89a' + b'0' * 64, 'image/jpeg')}
+    )
+    assert response.status_code == 429
+
+    ip_keys = await redis_client.keys('rate:ip:*')
+    assert len(ip_keys) == 1 and await redis_client.zcard(ip_keys[0]) == 1
+    assert await redis_client.keys('rate:device:*') == []
@@ -0,0 +1,80 @@
+"""
+DetectionResultCache tiers, version changes and explicit invalidation
+"""
+import asyncio
+
+import fakeredis
+import pytest
+
+from utils.result_cache import DetectionResultCache, content_hash
+
+
+def _redis(server=None):
+    return fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer(), decode_responses=True)
+
+
+def _cache(redis_client=None, **kwargs):
+    return DetectionResultCache(max_entries=16, redis_client=redis_client, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_serves_other_processes():
+    server = fakeredis.FakeServer()
+    first = _cache(_redis(server))
+    second = _cache(_redis(server))
+    image_hash = content_hash(b'image')
+
+    await first.put(image_hash, 'v1', 0.5, {'detections': [1]})
+    result = await second.get(image_hash, 'v1', 0.5)
+
+    assert result == {'detections': [1]}
+    assert second.redis_hits == 1
+    # Served from the LRU afterwards, as a fresh copy
+    result['detections'].append(2)
+    assert await second.get(image_hash, 'v1', 0.5) == {'detections': [1]}
+    assert second.local_hits == 1
+    assert await second.get(image_hash, 'v1', 0.6) is None
+
+
+@pytest.mark.asyncio
+async def test_version_change_does_not_touch_redis():
+    redis_client = _redis()
+    cache = _cache(redis_client)
+    await cache.put('a', 'v1', 0.5, {'n': 1})
+
+    assert await cache.get('a', 'v2', 0.5) is None
+    # Let any stray background task run
+    await asyncio.sleep(0)
+    assert await redis_client.exists('detect_cache:v1:0.5:a') == 1
+    # The old version is still reachable under its own key
+    assert await cache.get('a', 'v1', 0.5) == {'n': 1}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_unlinks_other_versions_in_batches():
+    redis_client = _redis()
+    cache = _cache(redis_client)
+    for i in range(23):
+        await cache.put(f'old{i}', 'v1', 0.5, {'n': i})
+    for i in range(4):
+        await cache.put(f'new{i}', 'v2', 0.5, {'n': i})
+    await redis_client.set('unrelated', '1')
+
+    assert await cache.invalidate(keep_version='v2', batch_size=5) == 23
+    assert sorted(await redis_client.keys('detect_cache:*')) == sorted(
+        f'detect_cache:v2:0.5:new{i}' for i in range(4)
+    )
+
+    assert await cache.invalidate(batch_size=5) == 4
+    assert await redis_client.keys('*') == ['unrelated']
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_down_degrades_to_local_tier():
+    cache = _cache(fakeredis.FakeAsyncRedis(connected=False))
+
+    await cache.put('a', 'v1', 0.5, {'n': 1})
+    assert await cache.get('a', 'v1', 0.5) == {'n': 1}
+    assert await cache.get('b', 'v1', 0.5) is None
+    assert await cache.invalidate() == 0
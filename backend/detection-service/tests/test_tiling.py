@@ -0,0 +1,117 @@
+"""
+Tile grids, cross-tile box merging and the tiled predict path
+"""
+import cv2
+import numpy as np
+import pytest
+import torch
+from ultralytics.engine.results import Results
+
+from models.tiling import merge_boxes, tile_grid, tile_starts
+from models.yolo_detector import YOLODetector
+
+
+@pytest.mark.parametrize('length,tile_size,overlap', [
+    (1000, 1000, 0.2), (999, 1000, 0.2), (1001, 1000, 0.2),
+    (4000, 1280, 0.2), (4032, 1280, 0.0), (3024, 640, 0.5), (5000, 1280, 0.9)
+])
+def test_tile_starts_cover_the_axis(length, tile_size, overlap):
+    starts = tile_starts(length, tile_size, overlap)
+
+    assert starts[0] == 0
+    assert starts == sorted(set(starts))
+    assert min(starts[-1] + tile_size, length) == length
+    assert starts[-1] + tile_size <= max(length, tile_size)
+    # Consecutive tiles overlap by at least the requested fraction
+    for previous, current in zip(starts, starts[1:]):
+        assert current - previous <= int(tile_size * (1 - overlap))
+
+
+def test_tile_grid_windows():
+    windows = tile_grid(3000, 2000, 1280, 0.2)
+
+    assert len(windows) == 3 * 2
+    assert all(x2 - x1 == 1280 and y2 - y1 == 1280 for x1, y1, x2, y2 in windows)
+    covered = np.zeros((2000, 3000), dtype=bool)
+    for x1, y1, x2, y2 in windows:
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+
+    # Images smaller than a tile are one window, clipped to the image
+    assert tile_grid(800, 600, 1280, 0.2) == [(0, 0, 800, 600)]
+
+
+def test_merge_boxes_drops_partial_duplicates_of_the_same_class():
+    xyxy = np.array([
+        [100, 100, 300, 300],   # full box
+        [100, 100, 180, 300],   # same object cut by a tile edge: low IoU, inside the full box
+        [110, 110, 310, 310],   # near-identical box of another class
+        [600, 600, 700, 700],   # separate object
+    ], dtype=np.float32)
+    confidences = np.array([0.9, 0.95, 0.8, 0.7])
+    class_ids = np.array([0, 0, 1, 0])
+
+    keep = merge_boxes(xyxy, confidences, class_ids, match_threshold=0.5)
+
+    # Highest confidence first; the partial box wins over the full one here
+    assert keep.tolist() == [1, 2, 3]
+
+
+def test_merge_boxes_threshold_and_empty_input():
+    xyxy = np.array([[0, 0, 100, 100], [60, 0, 160, 100]], dtype=np.float32)
+    confidences = np.array([0.9, 0.8])
+    class_ids = np.array([0, 0])
+
+    # 40% of the smaller box overlaps
+    assert merge_boxes(xyxy, confidences, class_ids, 0.5).tolist() == [0, 1]
+    assert merge_boxes(xyxy, confidences, class_ids, 0.3).tolist() == [0]
+    assert merge_boxes(np.zeros((0, 4)), np.zeros(0), np.zeros(0)).tolist() == []
+
+
+def _rectangle_detector(tile_size, overlap, match_threshold=0.5):
+    """
+    YOLODetector whose model "detects" every white rectangle in an image,
+    so the tiled path can be checked without weights
+    """
+    detector = YOLODetector.__new__(YOLODetector)
+    detector.model = type('Model', (), {'names': {0: 'pothole'}})()
+    detector.tiling = {
+        'tile_size': tile_size,
+        'overlap': overlap,
+        'min_megapixels': 0,
+        'match_threshold': match_threshold
+    }
+
+    def predict(images, conf_threshold, imgsz=None):
+        results = []
+        for image in images:
+            mask = (image[:, :, 0] > 127).astype(np.uint8)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            rows = [
+                [x, y, x + w, y + h, 0.5 + 0.4 * (w * h) / mask.size, 0]
+                for x, y, w, h in (cv2.boundingRect(c) for c in contours)
+            ]
+            boxes = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+            results.append(Results(image, path='', names=detector.model.names, boxes=boxes))
+        return results
+
+    detector._predict = predict
+    return detector
+
+
+def test_predict_tiled_merges_objects_cut_by_tile_edges():
+    image = np.zeros((2000, 3000, 3), dtype=np.uint8)
+    objects = [
+        (1000, 1000, 1100, 1100),  # straddles the first vertical and horizontal tile edges
+        (20, 20, 60, 60),          # inside one tile
+        (2900, 1900, 2990, 1990),  # in the bottom right corner tile
+    ]
+    for x1, y1, x2, y2 in objects:
+        image[y1:y2, x1:x2] = 255
+
+    result = _rectangle_detector(tile_size=1024, overlap=0.2)._predict_tiled(image, 0.25)
+
+    boxes = sorted(result.boxes.xyxy.numpy().astype(int).tolist())
+    # One box per object, shifted back to image coordinates
+    assert boxes == sorted([x1, y1, x2, y2] for x1, y1, x2, y2 in objects)
+    assert result.orig_shape == (2000, 3000)
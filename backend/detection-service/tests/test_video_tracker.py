@@ -0,0 +1,216 @@
+"""
+IssueTracker track merging, the VideoDetector pipeline and /detect/video cleanup
+"""
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.detection
+from config.settings import settings
+from models.video_detection import FrameSampler, IssueTracker, VideoDetector
+from utils.rate_limiter import RateLimiter
+
+FRAME = np.zeros((360, 640, 3), dtype=np.uint8)
+
+
+def _detection(x1, y1, x2, y2, issue_type='POTHOLE', confidence=0.8):
+    return {
+        'issue_type': issue_type,
+        'confidence': confidence,
+        'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+        'area_percentage': 1.0
+    }
+
+
+def _run(tracker, frames):
+    """Feed [(timestamp, detections)] and return every finished track"""
+    finished = []
+    for index, (timestamp, detections) in enumerate(frames):
+        finished.extend(tracker.update(index, timestamp, detections, FRAME))
+    return finished + tracker.flush()
+
+
+def test_moving_object_is_one_track():
+    # Drifts 30px per sample: overlapping early on, then matched by center distance
+    frames = [(t * 0.5, [_detection(100 + 30 * t, 100, 180 + 30 * t, 160)]) for t in range(8)]
+    tracks = _run(IssueTracker(), frames)
+
+    assert len(tracks) == 1
+    assert tracks[0].hits == 8
+    assert (tracks[0].first_seen, tracks[0].last_seen) == (0.0, 3.5)
+
+
+def test_best_detection_is_highest_confidence():
+    frames = [
+        (0.0, [_detection(100, 100, 200, 200, confidence=0.6)]),
+        (0.5, [_detection(102, 100, 202, 200, confidence=0.9)]),
+        (1.0, [_detection(104, 100, 204, 200, confidence=0.7)]),
+    ]
+    track, = _run(IssueTracker(keep_frames=True), frames)
+
+    assert track.best_detection['confidence'] == 0.9
+    assert (track.best_index, track.best_time) == (1, 0.5)
+    assert cv2.imdecode(np.frombuffer(track.best_frame, np.uint8), cv2.IMREAD_COLOR).shape == FRAME.shape
+
+
+def test_issue_types_and_neighbours_are_kept_apart():
+    frames = [
+        (t * 0.5, [
+            _detection(100, 100, 200, 200),
+            _detection(100, 100, 200, 200, issue_type='WASTE_ACCUMULATION'),
+            _detection(400, 100, 500, 200),
+        ])
+        for t in range(3)
+    ]
+    tracks = _run(IssueTracker(), frames)
+
+    assert sorted((t.issue_type, t.hits) for t in tracks) == [
+        ('POTHOLE', 3), ('POTHOLE', 3), ('WASTE_ACCUMULATION', 3)
+    ]
+    # Matching is one-to-one: two detections of one object in a frame do
+    # not both extend the same track
+    tracks = _run(IssueTracker(), [
+        (0.0, [_detection(100, 100, 200, 200)]),
+        (0.5, [_detection(100, 100, 200, 200), _detection(105, 100, 205, 200)]),
+    ])
+    assert sorted(t.hits for t in tracks) == [2]
+
+
+def test_flicker_is_dropped():
+    frames = [
+        (0.0, [_detection(100, 100, 200, 200)]),
+        (0.5, [_detection(100, 100, 200, 200), _detection(400, 200, 450, 250)]),
+        (1.0, [_detection(100, 100, 200, 200)]),
+    ]
+    tracks = _run(IssueTracker(min_frames=2), frames)
+
+    assert [(t.issue_type, t.hits) for t in tracks] == [('POTHOLE', 3)]
+
+
+def test_gap_ends_track_when_it_is_exceeded():
+    tracker = IssueTracker(max_gap_s=1.5)
+    assert tracker.update(0, 0.0, [_detection(100, 100, 200, 200)], FRAME) == []
+    assert tracker.update(1, 0.5, [_detection(100, 100, 200, 200)], FRAME) == []
+    # Unseen for 1.5s: still open
+    assert tracker.update(2, 2.0, [_detection(100, 100, 200, 200)], FRAME) == []
+
+    # Unseen for 2s: the first track is reported and the object starts a new one
+    finished = tracker.update(3, 4.0, [_detection(100, 100, 200, 200)], FRAME)
+    assert [(t.track_id, t.hits, t.last_seen) for t in finished] == [(1, 3, 2.0)]
+    assert [t.track_id for t in tracker.flush()] == []
+
+
+def test_max_tracks_finishes_the_stalest():
+    tracker = IssueTracker(max_tracks=2, min_frames=1)
+    tracker.update(0, 0.0, [_detection(0, 0, 10, 10)], FRAME)
+    tracker.update(1, 0.1, [_detection(100, 0, 110, 10)], FRAME)
+    finished = tracker.update(2, 0.2, [_detection(200, 0, 210, 10)], FRAME)
+
+    assert [t.box[0] for t in finished] == [0]
+    assert sorted(t.box[0] for t in tracker.flush()) == [100, 200]
+
+
+class _RectangleDetector:
+    """Stand-in for YOLODetector.detect_batch: every white blob is a pothole"""
+
+    def detect_batch(self, images, include_fraud_indicators=True):
+        results = []
+        for image in images:
+            mask = (image.bgr[:, :, 0] > 127).astype(np.uint8)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            detections = []
+            for x, y, w, h in (cv2.boundingRect(c) for c in contours):
+                detection = _detection(x, y, x + w, y + h)
+                detection['area_percentage'] = 100.0 * w * h / mask.size
+                detections.append(detection)
+            results.append({'detections': detections})
+        return results
+
+
+@pytest.mark.parametrize('scene_threshold', [0, 8])
+def test_video_detector_reports_each_object_once(tmp_path, scene_threshold):
+    path = str(tmp_path / 'survey.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (640, 360))
+    if not writer.isOpened():
+        pytest.skip("OpenCV was built without an MJPG writer")
+    for index in range(60):
+        frame = FRAME.copy()
+        # A pothole drifting by for the first four seconds, then an empty road;
+        # too little change per frame to count as a scene change
+        if index < 40:
+            x = 100 + index
+            frame[200:260, x:x + 80] = 255
+        writer.write(frame)
+    writer.release()
+
+    sampler = FrameSampler(interval_s=0.5, scene_threshold=scene_threshold, max_interval_s=2.0)
+    detector = VideoDetector(_RectangleDetector(), batch_size=3, sampler=sampler)
+    lines = list(detector.run(path))
+
+    issues, summary = lines[:-1], lines[-1]
+    assert summary['type'] == 'summary' and summary['frames_read'] == 60
+    assert len(issues) == 1
+    assert issues[0]['issue_type'] == 'POTHOLE'
+    assert issues[0]['first_seen_s'] == 0.0
+    # Every 0.5s, or only every max_interval_s when skipping unchanged scenes
+    # (2s apart, beyond the tracker's default 1.5s gap, yet still one track)
+    assert issues[0]['frames'] == (8 if scene_threshold == 0 else 2)
+
+
+@pytest.fixture
+def video_client(monkeypatch):
+    """Client for the detection routes with a stub video pipeline"""
+    seen_paths = []
+
+    class StubVideoDetector:
+        def __init__(self, detector, **kwargs):
+            pass
+
+        def run(self, path, gps=None):
+            seen_paths.append(path)
+            yield {'type': 'summary', 'bytes': os.path.getsize(path)}
+
+    monkeypatch.setattr(routes.detection, 'rate_limiter', RateLimiter(None, {}))
+    monkeypatch.setattr(routes.detection, 'VideoDetector', StubVideoDetector)
+    monkeypatch.setattr(routes.detection.model_loader, 'get', lambda: None)
+    app = FastAPI()
+    app.include_router(routes.detection.router)
+    client = TestClient(app, raise_server_exceptions=False)
+    client.seen_paths = seen_paths
+    return client
+
+
+def _slots_free() -> bool:
+    slots = routes.detection._bulk_slots
+    acquired = 0
+    while slots.acquire(blocking=False):
+        acquired += 1
+    for _ in range(acquired):
+        slots.release()
+    return acquired == settings.bulk_max_jobs
+
+
+def test_video_stream_cleans_up(video_client):
+    response = video_client.post('/api/v1/issues/detect/video', files={'video': ('a.mp4', b'x' * 10)})
+
+    assert response.status_code == 200
+    assert json.loads(response.text) == {'type': 'summary', 'bytes': 10}
+    path, = video_client.seen_paths
+    assert not os.path.exists(path)
+    assert _slots_free()
+
+
+def test_video_handler_error_releases_its_slot(video_client, monkeypatch):
+    def fail(upload):
+        raise OSError("spool file lost")
+
+    monkeypatch.setattr(routes.detection, '_detach_upload', fail)
+    for _ in range(settings.bulk_max_jobs + 1):
+        response = video_client.post('/api/v1/issues/detect/video', files={'video': ('a.mp4', b'x' * 10)})
+        assert response.status_code == 500
+    assert _slots_free()
@@ -0,0 +1,210 @@
+import heapq
+import itertools
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+import redis.asyncio as redis
+from utils.redis_entry_log import RedisEntryLog
+
+
+class NearDuplicateIndex:
+    """
+    In-process multi-index hash table for Hamming-radius lookups
+
+    Each 64-bit perceptual hash is split into ``num_chunks`` substrings,
+    each indexed in its own table. Two hashes within Hamming distance r
+    must agree on some chunk to within r // num_chunks bits (pigeonhole),
+    so a query probes only those chunk neighbours and verifies the few
+    candidates with a popcount instead of scanning every stored hash.
+    Chunks of about log2(index size) bits keep buckets small: 4 chunks
+    suit ~100k entries, 3 chunks suit millions.
+
+    Entries expire after ``ttl_seconds``. When a Redis client is given,
+    entries added with a pipeline are also written to Redis so they survive
+    restarts and can be pulled in by other pods with sync(); a new process
+    loads the existing entries with backfill().
+    """
+
+    def __init__(
+        self,
+        radius: int = 6,
+        ttl_seconds: int = 3600,
+        num_chunks: int = 4,
+        hash_bits: int = 64,
+        redis_client: Optional[redis.Redis] = None,
+        key_prefix: str = 'phash',
+        sync_interval_seconds: float = 5.0
+    ):
+        """
+        Args:
+            radius: Default Hamming radius for query()
+            ttl_seconds: How long an entry stays in the index
+            num_chunks: Number of hash substrings / tables
+            hash_bits: Hash width in bits
+            redis_client: Optional async Redis client for the persistent store
+            key_prefix: Redis key prefix
+            sync_interval_seconds: Minimum time between Redis syncs
+        """
+        self.radius = radius
+        self.ttl_seconds = ttl_seconds
+        self.num_chunks = num_chunks
+        self._log = RedisEntryLog(
+            redis_client, key_prefix, ttl_seconds, sync_interval_seconds
+        ) if redis_client is not None else None
+
+        # (shift, width) of each chunk; widths differ by at most one bit
+        widths = [
+            hash_bits // num_chunks + (1 if i < hash_bits % num_chunks else 0)
+            for i in range(num_chunks)
+        ]
+        shifts = [sum(widths[:i]) for i in range(num_chunks)]
+        self._chunks = list(zip(shifts, widths))
+
+        self._tables: List[Dict[int, Set[str]]] = [{} for _ in range(num_chunks)]
+        self._entries: Dict[str, Tuple[int, Dict, float]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._flip_masks: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(
+        self,
+        image_hash: int,
+        payload: Dict,
+        created_at: float = None,
+        pipe: Optional[redis.client.Pipeline] = None
+    ) -> str:
+        """
+        Store a hash with its submission data
+
+        Args:
+            image_hash: Perceptual hash
+            payload: JSON-serialisable submission data
+            created_at: Entry timestamp (defaults to now)
+            pipe: Redis pipeline to queue the persistent write on; the caller
+                executes it (without one the entry is only kept in-process)
+
+        Returns:
+            Entry id
+        """
+        created_at = created_at or time.time()
+        entry_id = uuid.uuid4().hex
+        self._insert(entry_id, image_hash, payload, created_at)
+
+        if self._log is not None and pipe is not None:
+            self._log.append(
+                pipe,
+                entry_id,
+                {'hash': format(image_hash, 'x'), 'payload': payload},
+                created_at
+            )
+
+        return entry_id
+
+    def query(self, image_hash: int, radius: int = None) -> List[Tuple[int, Dict]]:
+        """
+        Find stored entries within a Hamming radius
+
+        Args:
+            image_hash: Perceptual hash to look up
+            radius: Hamming radius (defaults to the index radius)
+
+        Returns:
+            List of (distance, payload), closest first
+        """
+        radius = self.radius if radius is None else radius
+        self._evict_expired()
+
+        seen: Set[str] = set()
+        matches = []
+        for chunk_index, table in enumerate(self._tables):
+            chunk = self._chunk(image_hash, chunk_index)
+            width = self._chunks[chunk_index][1]
+            for flip in self._flips(width, radius // self.num_chunks):
+                ids = table.get(chunk ^ flip)
+                if not ids:
+                    continue
+                for entry_id in ids:
+                    if entry_id in seen:
+                        continue
+                    seen.add(entry_id)
+                    stored_hash, payload, _ = self._entries[entry_id]
+                    distance = (stored_hash ^ image_hash).bit_count()
+                    if distance <= radius:
+                        matches.append((distance, payload))
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    async def sync(self, force: bool = False) -> int:
+        """
+        Pull entries written to Redis (by this or other processes) that are
+        not yet in the local index
+
+        Args:
+            force: Sync even if the last sync was under sync_interval_seconds ago
+
+        Returns:
+            Number of entries added
+        """
+        if self._log is None:
+            return 0
+
+        return self._load(await self._log.pull(known=self._entries, force=force))
+
+    async def backfill(self) -> bool:
+        """
+        Load the entries written to Redis before this process started, page
+        by page; meant for a background task, not the request path
+
+        Returns:
+            Whether the whole TTL window is loaded (False after a Redis error)
+        """
+        if self._log is None:
+            return True
+        async for entries in self._log.backfill(known=self._entries):
+            self._load(entries)
+        return self._log.backfilled
+
+    def _load(self, entries: List[Tuple[str, float, Dict]]) -> int:
+        for entry_id, created_at, entry in entries:
+            self._insert(entry_id, int(entry['hash'], 16), entry['payload'], created_at)
+        return len(entries)
+
+    def _insert(self, entry_id: str, image_hash: int, payload: Dict, created_at: float):
+        expires_at = created_at + self.ttl_seconds
+        self._entries[entry_id] = (image_hash, payload, expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, entry_id))
+        for chunk_index, table in enumerate(self._tables):
+            table.setdefault(self._chunk(image_hash, chunk_index), set()).add(entry_id)
+
+    def _evict_expired(self):
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, entry_id = heapq.heappop(self._expiry_heap)
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                continue
+            for chunk_index, table in enumerate(self._tables):
+                chunk = self._chunk(entry[0], chunk_index)
+                ids = table.get(chunk)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del table[chunk]
+
+    def _chunk(self, image_hash: int, chunk_index: int) -> int:
+        shift, width = self._chunks[chunk_index]
+        return (image_hash >> shift) & ((1 << width) - 1)
+
+    def _flips(self, width: int, bits: int) -> List[int]:
+        """XOR masks with at most ``bits`` set bits within a chunk of ``width`` bits"""
+        key = (width, bits)
+        if key not in self._flip_masks:
+            masks = [0]
+            for count in range(1, bits + 1):
+                for positions in itertools.combinations(range(width), count):
+                    masks.append(sum(1 << p for p in positions))
+            self._flip_masks[key] = masks
+        return self._flip_masks[key]
@@ -0,0 +1,188 @@
+"""
+Image forensics at a fixed analysis size
+
+The manipulation check and the detector's fraud indicators look at the same
+handful of statistics: sharpness (Laplacian variance), grey-level histogram
+spread, edge density, brightness, saturation and compression error levels.
+They are computed together in one pass and returned as one feature vector
+that both consumers read, at a fixed pixel budget so the cost does not grow
+with megapixels:
+
+- pixel statistics come from a thumbnail whose longest side is capped at
+  ``analysis_size``. The thresholds in image_validator and yolo_detector
+  were tuned near the 640x480 minimum upload, and the default size of 640
+  keeps every upload on that scale;
+- error level analysis cannot use the thumbnail, because resampling erases
+  the JPEG block grid it depends on. It re-encodes a mosaic of native
+  resolution patches instead, cut on the 16px block grid and spread evenly
+  over the image, with the same pixel count as the thumbnail.
+
+The manipulation check scores a high error level contrast. The ela_*
+fields are None when error level analysis was switched off or could not
+be computed.
+"""
+from typing import NamedTuple, Optional
+import numpy as np
+import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+# JPEG minimum coded unit (8px blocks, 2x chroma subsampling)
+_JPEG_MCU = 16
+# Side of the native-resolution ELA patches; cut on the MCU grid so each
+# patch keeps its original block alignment
+_ELA_PATCH = 2 * _JPEG_MCU
+
+
+class ForensicFeatures(NamedTuple):
+    """
+    Forensic statistics of one image at the analysis size
+    """
+    # Variance of the grayscale Laplacian (blur / noise measure)
+    laplacian_variance: float
+    # Variance of the 256-bin grey-level histogram, scaled to 640x480 pixels
+    histogram_variance: float
+    # Fraction of Canny edge pixels
+    edge_density: float
+    # Mean grey level (0-255)
+    mean_brightness: float
+    # Mean HSV saturation (0-255)
+    mean_saturation: float
+    # Mean absolute difference after re-encoding as JPEG (0-255)
+    ela_mean: Optional[float]
+    # 99th percentile of the patch error levels over the median, after
+    # dividing out what texture explains (1.0 = uniform error levels)
+    ela_contrast: Optional[float]
+
+
+def analysis_thumbnail(bgr: np.ndarray, analysis_size: int) -> np.ndarray:
+    """
+    Downscale so the longest side is at most analysis_size
+
+    Nearest-neighbour sampling down to twice the target size first, then
+    area averaging, so the cost depends on the output size rather than
+    the megapixels of the input.
+
+    Args:
+        bgr: BGR pixel buffer
+        analysis_size: Longest side of the thumbnail (0 = native resolution)
+
+    Returns:
+        BGR thumbnail (the input itself when already small enough)
+    """
+    height, width = bgr.shape[:2]
+    scale = analysis_size / max(height, width) if analysis_size > 0 else 1.0
+    if scale >= 1.0:
+        return bgr
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if scale < 0.5:
+        bgr = cv2.resize(bgr, (2 * size[0], 2 * size[1]), interpolation=cv2.INTER_NEAREST)
+    return cv2.resize(bgr, size, interpolation=cv2.INTER_AREA)
+
+
+def extract_features(
+    bgr: np.ndarray,
+    analysis_size: int = 640,
+    ela_quality: int = 90,
+    error_levels: bool = True
+) -> ForensicFeatures:
+    """
+    Compute all forensic statistics of an image
+
+    Args:
+        bgr: Full-resolution BGR pixel buffer
+        analysis_size: Longest side of the analysis thumbnail
+        ela_quality: JPEG quality of the error level analysis re-encode
+        error_levels: Run error level analysis (the ela_* fields are None
+            otherwise, and when it fails)
+
+    Returns:
+        ForensicFeatures
+    """
+    small = analysis_thumbnail(bgr, analysis_size)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    saturation = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)[:, :, 1]
+
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    # Counts scale with pixel count, their variance with its square
+    hist_scale = (640 * 480) / gray.size
+    edges = cv2.Canny(gray, 100, 200)
+
+    ela_mean, ela_contrast = None, None
+    if error_levels:
+        try:
+            if small is bgr or min(bgr.shape[:2]) < _ELA_PATCH:
+                patches = bgr
+            else:
+                patches = _ela_mosaic(bgr, small.shape[0], small.shape[1])
+            ela_mean, ela_contrast = _error_levels(patches, ela_quality)
+        except (ValueError, cv2.error) as e:
+            logger.warning(f"Error level analysis unavailable: {e}")
+
+    return ForensicFeatures(
+        laplacian_variance=float(cv2.Laplacian(gray, cv2.CV_32F).var()),
+        histogram_variance=float(np.var(hist) * hist_scale ** 2),
+        edge_density=float(np.count_nonzero(edges)) / edges.size,
+        mean_brightness=float(gray.mean()),
+        mean_saturation=float(saturation.mean()),
+        ela_mean=ela_mean,
+        ela_contrast=ela_contrast
+    )
+
+
+def _ela_mosaic(bgr: np.ndarray, height: int, width: int) -> np.ndarray:
+    """
+    Native-resolution patches on the JPEG block grid, spread evenly over
+    the image and tiled into a height x width mosaic
+    """
+    rows = max(1, height // _ELA_PATCH)
+    cols = max(1, width // _ELA_PATCH)
+    image_height, image_width = bgr.shape[:2]
+    ys = np.linspace(0, image_height - _ELA_PATCH, rows).astype(int) // _JPEG_MCU * _JPEG_MCU
+    xs = np.linspace(0, image_width - _ELA_PATCH, cols).astype(int) // _JPEG_MCU * _JPEG_MCU
+
+    mosaic = np.empty((rows * _ELA_PATCH, cols * _ELA_PATCH, 3), dtype=bgr.dtype)
+    for i, y in enumerate(ys):
+        for j, x in enumerate(xs):
+            mosaic[i * _ELA_PATCH:(i + 1) * _ELA_PATCH, j * _ELA_PATCH:(j + 1) * _ELA_PATCH] = (
+                bgr[y:y + _ELA_PATCH, x:x + _ELA_PATCH]
+            )
+    return mosaic
+
+
+def _error_levels(bgr: np.ndarray, quality: int) -> tuple:
+    """
+    Error level analysis: re-encode as JPEG and measure what changed
+
+    Regions that went through a different compression history than the
+    rest of the photo re-compress differently. Re-encoding error is also
+    naturally higher in textured areas, so each patch's mean error is
+    divided by its mean Laplacian magnitude before comparing patches.
+
+    Returns:
+        (mean error, 99th percentile / median of the patch ratios)
+    """
+    ok, encoded = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to re-encode image for error level analysis")
+    # Largest difference over the colour channels
+    blue, green, red = cv2.split(cv2.absdiff(bgr, cv2.imdecode(encoded, cv2.IMREAD_COLOR)))
+    error = cv2.max(cv2.max(blue, green), red).astype(np.float32)
+
+    rows = error.shape[0] // _ELA_PATCH
+    cols = error.shape[1] // _ELA_PATCH
+    if rows == 0 or cols == 0:
+        return float(error.mean()), 1.0
+
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+    texture = cv2.absdiff(cv2.Laplacian(gray, cv2.CV_32F), 0)
+    # Area resampling by exactly the patch size gives the per-patch means
+    crop = (slice(0, rows * _ELA_PATCH), slice(0, cols * _ELA_PATCH))
+    patch_error = cv2.resize(error[crop], (cols, rows), interpolation=cv2.INTER_AREA)
+    patch_texture = cv2.resize(texture[crop], (cols, rows), interpolation=cv2.INTER_AREA)
+
+    ratio = patch_error / (patch_texture + 1.0)
+    median = float(np.median(ratio))
+    contrast = float(np.percentile(ratio, 99)) / median if median > 0 else 1.0
+    return float(error.mean()), contrast
@@ -0,0 +1,8 @@
+def get_risk_level(risk_score: float) -> str:
+    """Determine risk level from fraud score"""
+    if risk_score >= 0.7:
+        return 'HIGH'
+    elif risk_score >= 0.4:
+        return 'MEDIUM'
+    else:
+        return 'LOW'
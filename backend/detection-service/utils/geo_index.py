@@ -0,0 +1,213 @@
+import heapq
+import math
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+import redis.asyncio as redis
+import numpy as np
+from utils.gps_validator import haversine_km
+from utils.redis_entry_log import RedisEntryLog
+
+# Metres per degree of latitude
+_METRES_PER_DEGREE = 111320.0
+
+
+class GeoSubmissionIndex:
+    """
+    In-memory grid over recent submission locations
+
+    Points are bucketed into square cells of ``cell_size_m`` (in degrees of
+    latitude; longitude cells are widened with cos(latitude) at query time).
+    A radius query only visits the cells overlapping the search circle, so
+    its cost grows with the number of nearby candidates rather than with the
+    number of stored submissions. Entries expire after ``ttl_seconds``.
+
+    With a Redis client, entries added with a pipeline are mirrored through
+    RedisEntryLog so other processes see them after sync().
+    """
+
+    def __init__(
+        self,
+        cell_size_m: float = 100.0,
+        ttl_seconds: int = 3600,
+        redis_client: Optional[redis.Redis] = None,
+        key_prefix: str = 'geo_submission',
+        sync_interval_seconds: float = 5.0
+    ):
+        """
+        Args:
+            cell_size_m: Grid cell side in metres (about the typical query radius)
+            ttl_seconds: How long an entry stays in the index
+            redis_client: Optional async Redis client for the shared store
+            key_prefix: Redis key prefix
+            sync_interval_seconds: Minimum time between Redis syncs
+        """
+        self.cell_size_m = cell_size_m
+        self.ttl_seconds = ttl_seconds
+        self._cell_deg = cell_size_m / _METRES_PER_DEGREE
+
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._entries: Dict[str, Tuple[float, float, float, Dict]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._log = RedisEntryLog(
+            redis_client, key_prefix, ttl_seconds, sync_interval_seconds
+        ) if redis_client is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(
+        self,
+        latitude: float,
+        longitude: float,
+        payload: Dict,
+        created_at: float = None,
+        pipe: Optional[redis.client.Pipeline] = None
+    ) -> str:
+        """
+        Store a submission location
+
+        Args:
+            latitude: Submission latitude
+            longitude: Submission longitude
+            payload: JSON-serialisable submission data
+            created_at: Entry timestamp (defaults to now)
+            pipe: Redis pipeline to queue the shared write on; the caller
+                executes it (without one the entry is only kept in-process)
+
+        Returns:
+            Entry id
+        """
+        created_at = created_at or time.time()
+        entry_id = uuid.uuid4().hex
+        self._insert(entry_id, latitude, longitude, created_at, payload)
+
+        if self._log is not None and pipe is not None:
+            self._log.append(
+                pipe,
+                entry_id,
+                {'latitude': latitude, 'longitude': longitude, 'payload': payload},
+                created_at
+            )
+
+        return entry_id
+
+    def query(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        window_seconds: float = None
+    ) -> List[Tuple[float, Dict]]:
+        """
+        Find submissions within radius_m metres from the last window_seconds
+
+        Args:
+            latitude: Query latitude
+            longitude: Query longitude
+            radius_m: Search radius in metres
+            window_seconds: Only match entries this recent (defaults to the TTL)
+
+        Returns:
+            List of (distance in metres, payload), closest first
+        """
+        self._evict_expired()
+        now = time.time()
+        oldest = now - (window_seconds if window_seconds is not None else self.ttl_seconds)
+
+        row, col = self._cell(latitude, longitude)
+        row_span = math.ceil(radius_m / self.cell_size_m)
+        cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+        col_span = math.ceil(radius_m / (self.cell_size_m * cos_lat))
+
+        candidates = []
+        for r in range(row - row_span, row + row_span + 1):
+            for c in range(col - col_span, col + col_span + 1):
+                for entry_id in self._cells.get((r, c), ()):
+                    entry = self._entries[entry_id]
+                    if entry[2] >= oldest:
+                        candidates.append(entry)
+        if not candidates:
+            return []
+
+        # One vectorized Haversine call over all candidates
+        coordinates = np.array([(entry[0], entry[1]) for entry in candidates])
+        distances_m = haversine_km(
+            latitude, longitude, coordinates[:, 0], coordinates[:, 1]
+        ) * 1000
+
+        matches = [
+            (float(distance_m), entry[3])
+            for distance_m, entry in zip(distances_m, candidates)
+            if distance_m <= radius_m
+        ]
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    async def sync(self, force: bool = False) -> int:
+        """
+        Pull entries written to Redis by other processes
+
+        Args:
+            force: Sync even if the last sync was recent
+
+        Returns:
+            Number of entries added
+        """
+        if self._log is None:
+            return 0
+
+        return self._load(await self._log.pull(known=self._entries, force=force))
+
+    async def backfill(self) -> bool:
+        """
+        Load the entries written to Redis before this process started, page
+        by page; meant for a background task, not the request path
+
+        Returns:
+            Whether the whole TTL window is loaded (False after a Redis error)
+        """
+        if self._log is None:
+            return True
+        async for entries in self._log.backfill(known=self._entries):
+            self._load(entries)
+        return self._log.backfilled
+
+    def _load(self, entries: List[Tuple[str, float, Dict]]) -> int:
+        for entry_id, created_at, entry in entries:
+            self._insert(
+                entry_id, entry['latitude'], entry['longitude'], created_at, entry['payload']
+            )
+        return len(entries)
+
+    def _insert(
+        self,
+        entry_id: str,
+        latitude: float,
+        longitude: float,
+        created_at: float,
+        payload: Dict
+    ):
+        self._entries[entry_id] = (latitude, longitude, created_at, payload)
+        self._cells.setdefault(self._cell(latitude, longitude), set()).add(entry_id)
+        heapq.heappush(self._expiry_heap, (created_at + self.ttl_seconds, entry_id))
+
+    def _evict_expired(self):
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, entry_id = heapq.heappop(self._expiry_heap)
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                continue
+            cell = self._cell(entry[0], entry[1])
+            ids = self._cells.get(cell)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._cells[cell]
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor(latitude / self._cell_deg),
+            math.floor(longitude / self._cell_deg)
+        )
@@ -0,0 +1,321 @@
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import cv2
+
+# Raster cell states
+_OUTSIDE = 0
+_INSIDE = 1
+_BOUNDARY = 2
+
+# Points x edges evaluated per ray-casting chunk
+_PIP_CHUNK_ELEMENTS = 2_000_000
+
+# Fences with more edges than this bucket them by raster row
+_ROW_BUCKET_MIN_EDGES = 256
+
+
+class _Fence:
+    """One polygon fence: edges for exact tests plus a coarse raster"""
+
+    def __init__(self, fence_id: str, rings: List[np.ndarray], properties: Dict, raster_size: int):
+        self.fence_id = fence_id
+        self.properties = properties
+
+        # Every ring's edges as (x1, y1, x2, y2) rows; x = longitude, y = latitude.
+        # Even-odd ray casting over all rings handles holes and multipolygons.
+        self.edges = np.concatenate([
+            np.hstack([ring[:-1], ring[1:]]) for ring in rings
+        ])
+        points = np.concatenate(rings)
+        self.min_x, self.min_y = points.min(axis=0)
+        self.max_x, self.max_y = points.max(axis=0)
+
+        span = max(self.max_x - self.min_x, self.max_y - self.min_y, 1e-9)
+        self.cell = span / raster_size
+        self.cols = int(math.ceil((self.max_x - self.min_x) / self.cell)) + 1
+        self.rows = int(math.ceil((self.max_y - self.min_y) / self.cell)) + 1
+        self.raster = self._rasterize()
+        self.row_edges = self._bucket_edges() if len(self.edges) > _ROW_BUCKET_MIN_EDGES else None
+
+    def contains(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Membership of points; only points in boundary cells are ray-cast"""
+        inside = np.zeros(len(x), dtype=bool)
+        in_bbox = (
+            (x >= self.min_x) & (x <= self.max_x) &
+            (y >= self.min_y) & (y <= self.max_y)
+        )
+        candidates = np.flatnonzero(in_bbox)
+        if len(candidates) == 0:
+            return inside
+
+        cols = ((x[candidates] - self.min_x) / self.cell).astype(np.int64)
+        rows = ((y[candidates] - self.min_y) / self.cell).astype(np.int64)
+        state = self.raster[rows, cols]
+
+        inside[candidates[state == _INSIDE]] = True
+        boundary = state == _BOUNDARY
+        if not boundary.any():
+            return inside
+        if self.row_edges is None:
+            points = candidates[boundary]
+            inside[points] = _ray_cast(x[points], y[points], self.edges)
+            return inside
+
+        # A horizontal ray can only cross edges spanning the point's row
+        for row in np.unique(rows[boundary]):
+            points = candidates[boundary & (rows == row)]
+            inside[points] = _ray_cast(x[points], y[points], self.edges[self.row_edges[row]])
+        return inside
+
+    def _rasterize(self) -> np.ndarray:
+        """
+        Classify raster cells as inside, outside or crossed by an edge
+
+        Edges are sampled at half-cell steps and the marked cells dilated by
+        one, so a cell an edge merely clips is still treated as boundary.
+        The remaining cells form regions no edge crosses; each region is
+        entirely in or out, decided by ray-casting one of its cell centres.
+        """
+        boundary = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        x1, y1, x2, y2 = self.edges.T
+        steps = np.maximum(
+            np.ceil(np.hypot(x2 - x1, y2 - y1) / (self.cell / 2)).astype(np.int64), 1
+        )
+        edge_index = np.repeat(np.arange(len(self.edges)), steps + 1)
+        offsets = np.arange(len(edge_index)) - np.repeat(np.cumsum(steps + 1) - (steps + 1), steps + 1)
+        t = offsets / steps[edge_index]
+        sample_x = x1[edge_index] + t * (x2 - x1)[edge_index]
+        sample_y = y1[edge_index] + t * (y2 - y1)[edge_index]
+        cols = np.clip(((sample_x - self.min_x) / self.cell).astype(np.int64), 0, self.cols - 1)
+        rows = np.clip(((sample_y - self.min_y) / self.cell).astype(np.int64), 0, self.rows - 1)
+        boundary[rows, cols] = 1
+        boundary = cv2.dilate(boundary, np.ones((3, 3), dtype=np.uint8))
+
+        raster = np.full((self.rows, self.cols), _BOUNDARY, dtype=np.uint8)
+        count, labels = cv2.connectedComponents((1 - boundary).astype(np.uint8), connectivity=4)
+        for label in range(1, count):
+            region = labels == label
+            row, col = np.argwhere(region)[0]
+            centre_x = self.min_x + (col + 0.5) * self.cell
+            centre_y = self.min_y + (row + 0.5) * self.cell
+            is_inside = _ray_cast(np.array([centre_x]), np.array([centre_y]), self.edges)[0]
+            raster[region] = _INSIDE if is_inside else _OUTSIDE
+        return raster
+
+    def _bucket_edges(self) -> List[np.ndarray]:
+        """Indexes of the edges whose latitude range overlaps each raster row"""
+        low = np.minimum(self.edges[:, 1], self.edges[:, 3])
+        high = np.maximum(self.edges[:, 1], self.edges[:, 3])
+        first = np.clip(((low - self.min_y) / self.cell).astype(np.int64), 0, self.rows - 1)
+        last = np.clip(((high - self.min_y) / self.cell).astype(np.int64), 0, self.rows - 1)
+
+        spans = last - first + 1
+        edge_index = np.repeat(np.arange(len(self.edges)), spans)
+        rows = first[edge_index] + (
+            np.arange(len(edge_index)) - np.repeat(np.cumsum(spans) - spans, spans)
+        )
+        order = np.argsort(rows, kind='stable')
+        bounds = np.searchsorted(rows[order], np.arange(self.rows + 1))
+        return [edge_index[order[bounds[row]:bounds[row + 1]]] for row in range(self.rows)]
+
+
+class GeofenceIndex:
+    """
+    In-memory polygon geofences with a two-level grid index
+
+    A uniform grid of ``cell_size_deg`` degrees maps every cell to the
+    fences whose bounding boxes overlap it, so a lookup only considers the
+    few fences near the point. Each fence also keeps a coarse raster of
+    its bounding box marking cells as inside, outside or on the boundary;
+    only points falling in boundary cells need an exact even-odd ray-casting
+    test. Coordinates are treated as planar lon/lat, which is what
+    PostGIS ST_Contains on geometry does as well.
+
+    Fences are loaded once (typically from GeoJSON exported from the
+    ``geofences`` table) and then queried without a database round-trip.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.05, raster_size: int = 128):
+        """
+        Args:
+            cell_size_deg: Side of the bounding-box grid cells in degrees
+            raster_size: Raster cells along the longer side of each fence
+        """
+        self.cell_size_deg = cell_size_deg
+        self.raster_size = raster_size
+        self._fences: List[_Fence] = []
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fences)
+
+    @property
+    def fence_ids(self) -> List[str]:
+        """Fence ids, in the column order of contains_batch()"""
+        return [fence.fence_id for fence in self._fences]
+
+    def add(
+        self,
+        fence_id: str,
+        rings: Sequence[Sequence[Tuple[float, float]]],
+        properties: Optional[Dict] = None
+    ):
+        """
+        Add a polygon fence
+
+        Args:
+            fence_id: Fence identifier
+            rings: Rings of (longitude, latitude) vertices in GeoJSON order;
+                outer rings and holes may be mixed (even-odd rule)
+            properties: Extra data kept with the fence
+        """
+        closed = []
+        for ring in rings:
+            ring = np.asarray(ring, dtype=np.float64)[:, :2]
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            if len(ring) >= 4:
+                closed.append(ring)
+        if not closed:
+            raise ValueError(f"Geofence '{fence_id}' has no ring with at least 3 vertices")
+
+        fence = _Fence(fence_id, closed, properties or {}, self.raster_size)
+        fence_index = len(self._fences)
+        self._fences.append(fence)
+
+        min_row, min_col = self._cell(fence.min_x, fence.min_y)
+        max_row, max_col = self._cell(fence.max_x, fence.max_y)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self._grid.setdefault((row, col), []).append(fence_index)
+
+    def contains(self, latitude: float, longitude: float) -> List[str]:
+        """
+        Ids of the fences containing a point
+
+        Args:
+            latitude: Point latitude
+            longitude: Point longitude
+
+        Returns:
+            List of fence ids (empty if the point is in no fence)
+        """
+        x, y = np.array([longitude]), np.array([latitude])
+        return [
+            self._fences[fence_index].fence_id
+            for fence_index in self._grid.get(self._cell(longitude, latitude), ())
+            if self._fences[fence_index].contains(x, y)[0]
+        ]
+
+    def contains_batch(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Membership of many points in every fence
+
+        Args:
+            latitudes: (N,) array of latitudes
+            longitudes: (N,) array of longitudes
+
+        Returns:
+            (N, F) boolean array; column j is the fence fence_ids[j]
+        """
+        y = np.asarray(latitudes, dtype=np.float64).ravel()
+        x = np.asarray(longitudes, dtype=np.float64).ravel()
+        mask = np.zeros((len(x), len(self._fences)), dtype=bool)
+        if len(x) == 0 or not self._fences:
+            return mask
+
+        # Points of a location trace share few grid cells: collect, per fence,
+        # the points whose cell lists it, then test each fence once
+        cols = np.floor(x / self.cell_size_deg).astype(np.int64)
+        rows = np.floor(y / self.cell_size_deg).astype(np.int64)
+        cells, inverse = np.unique(np.stack([rows, cols], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(cells) + 1))
+
+        points_by_fence: Dict[int, List[np.ndarray]] = {}
+        for cell_index, (row, col) in enumerate(cells):
+            fence_indexes = self._grid.get((int(row), int(col)))
+            if not fence_indexes:
+                continue
+            point_indexes = order[bounds[cell_index]:bounds[cell_index + 1]]
+            for fence_index in fence_indexes:
+                points_by_fence.setdefault(fence_index, []).append(point_indexes)
+
+        for fence_index, chunks in points_by_fence.items():
+            point_indexes = np.concatenate(chunks)
+            mask[point_indexes, fence_index] = self._fences[fence_index].contains(
+                x[point_indexes], y[point_indexes]
+            )
+        return mask
+
+    def contains_any(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """(N,) boolean array: point lies in at least one fence"""
+        return self.contains_batch(latitudes, longitudes).any(axis=1)
+
+    @classmethod
+    def from_geojson(cls, data: Dict, id_property: str = 'id', **kwargs) -> 'GeofenceIndex':
+        """
+        Build an index from a GeoJSON FeatureCollection, Feature or geometry
+
+        Polygon and MultiPolygon geometries are loaded; a feature's id is
+        taken from ``properties[id_property]``, then the feature id, then
+        its position.
+
+        Args:
+            data: Parsed GeoJSON
+            id_property: Property holding the fence id
+            **kwargs: GeofenceIndex constructor arguments
+        """
+        index = cls(**kwargs)
+        if data.get('type') == 'FeatureCollection':
+            features = data.get('features', [])
+        elif data.get('type') == 'Feature':
+            features = [data]
+        else:
+            features = [{'type': 'Feature', 'geometry': data, 'properties': {}}]
+
+        for position, feature in enumerate(features):
+            geometry = feature.get('geometry') or {}
+            properties = feature.get('properties') or {}
+            if geometry.get('type') == 'Polygon':
+                rings = geometry['coordinates']
+            elif geometry.get('type') == 'MultiPolygon':
+                rings = [ring for polygon in geometry['coordinates'] for ring in polygon]
+            else:
+                continue
+            fence_id = properties.get(id_property, feature.get('id', position))
+            index.add(str(fence_id), rings, properties)
+        return index
+
+    @classmethod
+    def load_geojson(cls, path: str, **kwargs) -> 'GeofenceIndex':
+        """Build an index from a GeoJSON file (see from_geojson)"""
+        with open(path) as f:
+            return cls.from_geojson(json.load(f), **kwargs)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        """(row, col) of the bounding-box grid cell holding a lon/lat point"""
+        return (
+            math.floor(y / self.cell_size_deg),
+            math.floor(x / self.cell_size_deg)
+        )
+
+
+def _ray_cast(x: np.ndarray, y: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Even-odd point-in-polygon test of points against polygon edges"""
+    inside = np.zeros(len(x), dtype=bool)
+    if len(edges) == 0:
+        return inside
+    x1, y1, x2, y2 = (edges[:, i][np.newaxis, :] for i in range(4))
+    chunk = max(1, _PIP_CHUNK_ELEMENTS // len(edges))
+    for start in range(0, len(x), chunk):
+        px = x[start:start + chunk, np.newaxis]
+        py = y[start:start + chunk, np.newaxis]
+        crosses = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        inside[start:start + chunk] = np.count_nonzero(crosses & (px < x_cross), axis=1) % 2 == 1
+    return inside
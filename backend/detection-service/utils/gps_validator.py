@@ -1,5 +1,29 @@
-import math
-from typing import Dict, Tuple
+import numpy as np
+from typing import Dict, Optional, Tuple
+import logging
+from utils.geofence_index import GeofenceIndex
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius in kilometers
+EARTH_RADIUS_KM = 6371.0
+
+# Rajasthan: Latitude 23.5° to 30.2° N, Longitude 69.5° to 78.3° E (approximately);
+# only used when no service area polygons are configured
+RAJASTHAN_BOUNDS = {
+    'lat_min': 23.5,
+    'lat_max': 30.2,
+    'lon_min': 69.5,
+    'lon_max': 78.3
+}
+
+# More decimal places than this is suspicious for mobile GPS
+MAX_GPS_DECIMALS = 8
+
+# State / ward polygons loaded from settings.service_area_geojson
+_service_area: Optional[GeofenceIndex] = None
+_service_area_loaded = False
 
 
 def validate_gps_coordinates(latitude: float, longitude: float) -> Dict:
@@ -13,60 +37,36 @@ def validate_gps_coordinates(latitude: float, longitude: float) -> Dict:
     Returns:
         Dictionary with validation results
     """
+    checks = validate_gps_batch(np.array([latitude]), np.array([longitude]))
+    
     # Basic range validation
-    if not (-90 <= latitude <= 90):
+    if not checks['latitude_in_range'][0]:
         return {
             'valid': False,
             'error': 'Invalid latitude (must be between -90 and 90)'
         }
     
-    if not (-180 <= longitude <= 180):
+    if not checks['longitude_in_range'][0]:
         return {
             'valid': False,
             'error': 'Invalid longitude (must be between -180 and 180)'
         }
     
     # Check for exact 0,0 coordinates (common spoofing location)
-    if latitude == 0 and longitude == 0:
+    if checks['null_island'][0]:
         return {
             'valid': False,
             'error': 'Invalid coordinates (0, 0) - possible GPS spoofing'
         }
     
-    # Check for Rajasthan bounds (approximately)
-    # Rajasthan: Latitude 23.5° to 30.2° N, Longitude 69.5° to 78.3° E
-    rajasthan_bounds = {
-        'lat_min': 23.5,
-        'lat_max': 30.2,
-        'lon_min': 69.5,
-        'lon_max': 78.3
-    }
-    
-    in_rajasthan = (
-        rajasthan_bounds['lat_min'] <= latitude <= rajasthan_bounds['lat_max'] and
-        rajasthan_bounds['lon_min'] <= longitude <= rajasthan_bounds['lon_max']
-    )
-    
-    possible_spoofing = False
+    possible_spoofing = bool(checks['possible_spoofing'][0])
     warnings = []
+    if possible_spoofing:
+        warnings.append('Unusually precise coordinates')
     
-    # Check for suspiciously precise coordinates (common in spoofing)
-    # Real GPS has some noise, exact values are suspicious
-    lat_str = str(latitude)
-    lon_str = str(longitude)
-    
-    if '.' in lat_str and '.' in lon_str:
-        lat_decimals = len(lat_str.split('.')[1])
-        lon_decimals = len(lon_str.split('.')[1])
-        
-        # More than 6 decimal places is suspicious for mobile GPS
-        if lat_decimals > 8 or lon_decimals > 8:
-            possible_spoofing = True
-            warnings.append('Unusually precise coordinates')
-    
-    return {
+    result = {
         'valid': True,
-        'in_rajasthan': in_rajasthan,
+        'in_rajasthan': bool(checks['in_rajasthan'][0]),
         'possible_spoofing': possible_spoofing,
         'warnings': warnings,
         'coordinates': {
@@ -74,12 +74,86 @@ def validate_gps_coordinates(latitude: float, longitude: float) -> Dict:
             'longitude': longitude
         }
     }
+    
+    # Which state / ward polygons the point falls in
+    service_area = get_service_area()
+    if service_area is not None:
+        result['geofences'] = service_area.contains(latitude, longitude)
+    
+    return result
+
+
+def validate_gps_batch(latitudes: np.ndarray, longitudes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Vectorized GPS checks for many points at once
+    
+    Args:
+        latitudes: Array of latitudes
+        longitudes: Array of longitudes (same shape)
+        
+    Returns:
+        Dictionary of boolean arrays: latitude_in_range, longitude_in_range,
+        null_island (exactly 0, 0), valid (all three checks pass),
+        in_rajasthan and possible_spoofing (unusually precise coordinates)
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    
+    latitude_in_range = (latitudes >= -90) & (latitudes <= 90)
+    longitude_in_range = (longitudes >= -180) & (longitudes <= 180)
+    null_island = (latitudes == 0) & (longitudes == 0)
+    
+    service_area = get_service_area()
+    if service_area is not None:
+        in_rajasthan = service_area.contains_any(latitudes, longitudes).reshape(latitudes.shape)
+    else:
+        in_rajasthan = (
+            (latitudes >= RAJASTHAN_BOUNDS['lat_min']) & (latitudes <= RAJASTHAN_BOUNDS['lat_max']) &
+            (longitudes >= RAJASTHAN_BOUNDS['lon_min']) & (longitudes <= RAJASTHAN_BOUNDS['lon_max'])
+        )
+    
+    # Real GPS has some noise, exact values are suspicious
+    possible_spoofing = _excess_precision(latitudes) | _excess_precision(longitudes)
+    
+    return {
+        'latitude_in_range': latitude_in_range,
+        'longitude_in_range': longitude_in_range,
+        'null_island': null_island,
+        'valid': latitude_in_range & longitude_in_range & ~null_island,
+        'in_rajasthan': in_rajasthan,
+        'possible_spoofing': possible_spoofing
+    }
+
+
+def get_service_area() -> Optional[GeofenceIndex]:
+    """
+    Service area polygons, loaded once from settings.service_area_geojson
+    
+    Returns:
+        GeofenceIndex, or None when no file is configured or it failed to load
+    """
+    global _service_area, _service_area_loaded
+    if not _service_area_loaded:
+        _service_area_loaded = True
+        if settings.service_area_geojson:
+            try:
+                _service_area = GeofenceIndex.load_geojson(
+                    settings.service_area_geojson,
+                    id_property=settings.service_area_id_property
+                )
+                logger.info(
+                    f"Loaded {len(_service_area)} service area polygon(s) "
+                    f"from {settings.service_area_geojson}"
+                )
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Failed to load service area polygons, using bounding box: {e}")
+    return _service_area
 
 
 def calculate_distance(
-    lat1: float, 
-    lon1: float, 
-    lat2: float, 
+    lat1: float,
+    lon1: float,
+    lat2: float,
     lon2: float
 ) -> float:
     """
@@ -94,28 +168,77 @@ def calculate_distance(
     Returns:
         Distance in kilometers
     """
-    # Earth's radius in kilometers
-    R = 6371.0
+    return float(haversine_km(lat1, lon1, lat2, lon2))
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Vectorized Haversine distance; arguments broadcast like NumPy arrays
     
-    # Convert to radians
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
+    Args:
+        lat1: Latitudes of the first points
+        lon1: Longitudes of the first points
+        lat2: Latitudes of the second points
+        lon2: Longitudes of the second points
+        
+    Returns:
+        Distances in kilometers, with the broadcast shape of the inputs
+    """
+    lat1_rad = np.radians(lat1)
+    lon1_rad = np.radians(lon1)
+    lat2_rad = np.radians(lat2)
+    lon2_rad = np.radians(lon2)
     
-    # Haversine formula
     dlat = lat2_rad - lat1_rad
     dlon = lon2_rad - lon1_rad
     
     a = (
-        math.sin(dlat / 2)**2 +
-        math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
+        np.sin(dlat / 2)**2 +
+        np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2)**2
     )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    a = np.clip(a, 0.0, 1.0)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
     
-    distance = R * c
+    return EARTH_RADIUS_KM * c
+
+
+def distance_matrix(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """
+    Distances from every point to every center
     
-    return distance
+    Args:
+        points: (N, 2) array of (latitude, longitude)
+        centers: (M, 2) array of (latitude, longitude)
+        
+    Returns:
+        (N, M) array of distances in kilometers
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    return haversine_km(
+        points[:, 0:1], points[:, 1:2],
+        centers[np.newaxis, :, 0], centers[np.newaxis, :, 1]
+    )
+
+
+def geofence_mask(
+    points: np.ndarray,
+    centers: np.ndarray,
+    radii_km
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Membership of many points in many circular geofences
+    
+    Args:
+        points: (N, 2) array of (latitude, longitude)
+        centers: (M, 2) array of geofence centers
+        radii_km: Radius per geofence, (M,) array or a single value
+        
+    Returns:
+        (mask, distances): (N, M) boolean membership and distances in km
+    """
+    distances = distance_matrix(points, centers)
+    return distances <= np.asarray(radii_km, dtype=np.float64), distances
 
 
 def is_within_geofence(
@@ -138,9 +261,11 @@ def is_within_geofence(
     Returns:
         Dictionary with geofence check results
     """
-    distance = calculate_distance(latitude, longitude, center_lat, center_lon)
-    
-    within_fence = distance <= radius_km
+    mask, distances = geofence_mask(
+        [(latitude, longitude)], [(center_lat, center_lon)], radius_km
+    )
+    distance = float(distances[0, 0])
+    within_fence = bool(mask[0, 0])
     
     return {
         'within_geofence': within_fence,
@@ -148,3 +273,14 @@ def is_within_geofence(
         'radius_km': radius_km,
         'distance_from_edge_km': round(radius_km - distance, 3)
     }
+
+
+def _excess_precision(values: np.ndarray) -> np.ndarray:
+    """
+    True where a coordinate has more than MAX_GPS_DECIMALS decimal places
+    
+    Compares each value with its rounding to MAX_GPS_DECIMALS places; the
+    tolerance sits well above float64 error at GPS magnitudes after scaling.
+    """
+    scaled = values * 10.0**MAX_GPS_DECIMALS
+    return np.abs(scaled - np.rint(scaled)) > 1e-5
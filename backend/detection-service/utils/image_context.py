@@ -0,0 +1,147 @@
+import io
+import time
+import numpy as np
+import cv2
+from PIL import Image
+from typing import Dict, Optional, Tuple, Union
+from utils.image_probe import probe_image
+from utils.forensics import ForensicFeatures, extract_features
+from config.settings import settings
+
+
+class DecodedImage:
+    """
+    Decoded image shared across the detection pipeline
+
+    Wraps the raw upload bytes and decodes them at most once. Derived
+    views (grayscale, forensic features) are computed lazily on first
+    access and cached, so the validator, the manipulation checker and the
+    detector can all consume the same pixel buffer.
+    """
+
+    def __init__(self, image_bytes: bytes):
+        """
+        Args:
+            image_bytes: Encoded image data as bytes
+        """
+        self.image_bytes = image_bytes
+        self._probe = None
+        self._bgr = None
+        self._gray = None
+        self._forensics = None
+        # Time spent in the full decode, 0 until bgr is first accessed
+        self.decode_ms = 0.0
+
+    @classmethod
+    def ensure(cls, image: Union[bytes, 'DecodedImage']) -> 'DecodedImage':
+        """
+        Wrap raw bytes in a DecodedImage, passing existing contexts through
+
+        Args:
+            image: Image data as bytes or an existing DecodedImage
+
+        Returns:
+            DecodedImage instance
+        """
+        if isinstance(image, cls):
+            return image
+        return cls(image)
+
+    @classmethod
+    def from_array(cls, bgr: np.ndarray) -> 'DecodedImage':
+        """
+        Wrap an already decoded BGR frame (e.g. from a video) without
+        encoded bytes; header-based properties are unavailable
+
+        Args:
+            bgr: BGR pixel buffer
+
+        Returns:
+            DecodedImage instance
+        """
+        image = cls(b'')
+        image._bgr = bgr
+        return image
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.image_bytes)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by this image: encoded bytes plus cached pixel buffers
+        """
+        arrays = (self._bgr, self._gray)
+        return self.size_bytes + sum(a.nbytes for a in arrays if a is not None)
+
+    @property
+    def probe(self) -> Dict:
+        """
+        Format, dimensions and EXIF fields read from the headers only
+        (see utils.image_probe.probe_image)
+        """
+        if self._probe is None:
+            self._probe = probe_image(self.image_bytes)
+        return self._probe
+
+    @property
+    def header_size(self) -> Tuple[int, int]:
+        """
+        (width, height) without decoding pixels
+        """
+        if self.probe['width'] is None or self.probe['height'] is None:
+            # Header layout the probe does not handle: let PIL read it
+            return Image.open(io.BytesIO(self.image_bytes)).size
+        return self.probe['width'], self.probe['height']
+
+    @property
+    def format(self) -> Optional[str]:
+        return self.probe['format'] or Image.open(io.BytesIO(self.image_bytes)).format
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """
+        Full-resolution BGR pixel buffer, decoded on first access
+
+        Raises:
+            ValueError: If the image cannot be decoded
+        """
+        if self._bgr is None:
+            start = time.perf_counter()
+            nparr = np.frombuffer(self.image_bytes, np.uint8)
+            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError("Failed to decode image")
+            self._bgr = image
+            self.decode_ms = (time.perf_counter() - start) * 1000
+        return self._bgr
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def forensics(self) -> ForensicFeatures:
+        """
+        Sharpness, histogram, edge, colour and error level statistics at
+        the forensics analysis size (see utils.forensics)
+        """
+        if self._forensics is None:
+            self._forensics = extract_features(
+                self.bgr,
+                analysis_size=settings.forensics_analysis_size,
+                ela_quality=settings.forensics_ela_quality,
+                error_levels=settings.forensics_ela
+            )
+        return self._forensics
@@ -0,0 +1,277 @@
+import struct
+from fractions import Fraction
+from typing import Callable, Dict, List, Optional, Tuple
+
+# TIFF tags read by the probe
+_TAG_MAKE = 0x010F
+_TAG_MODEL = 0x0110
+_TAG_EXIF_IFD = 0x8769
+_TAG_GPS_IFD = 0x8825
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_GPS_LATITUDE_REF = 0x0001
+_TAG_GPS_LATITUDE = 0x0002
+_TAG_GPS_LONGITUDE_REF = 0x0003
+_TAG_GPS_LONGITUDE = 0x0004
+
+# Bytes per value by TIFF field type
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+# JPEG start-of-frame markers (all except DHT, JPG and DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def probe_image(data: bytes) -> Dict:
+    """
+    Read format, dimensions and the EXIF tags we use from image headers
+
+    Only the JPEG segments before the scan data, the PNG chunks before
+    IDAT or the WebP chunk headers are visited; pixels, thumbnails and
+    maker notes are never touched, so the cost does not grow with the
+    image resolution.
+
+    Args:
+        data: Encoded JPEG, PNG or WebP image
+
+    Returns:
+        Dictionary with format, width and height (None when unrecognised),
+        exif (the same string fields the routes used to read with exifread:
+        datetime, make, model, gps_latitude, gps_longitude; '' when absent)
+        and gps ((latitude, longitude) in decimal degrees, or None)
+    """
+    view = memoryview(data)
+    image_format, width, height, tiff = None, None, None, None
+    try:
+        if data[:3] == b'\xff\xd8\xff':
+            image_format = 'JPEG'
+            width, height, tiff = _probe_jpeg(view)
+        elif data[:8] == b'\x89PNG\r\n\x1a\n':
+            image_format = 'PNG'
+            width, height, tiff = _probe_png(view)
+        elif data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            image_format = 'WEBP'
+            width, height, tiff = _probe_webp(view)
+    except (struct.error, IndexError, ValueError):
+        # Truncated or malformed header: keep whatever was read
+        pass
+
+    tags = _parse_tiff(tiff) if tiff is not None else {}
+    latitude = _dms_to_degrees(tags.get('gps_latitude'), tags.get('gps_latitude_ref'), 'S')
+    longitude = _dms_to_degrees(tags.get('gps_longitude'), tags.get('gps_longitude_ref'), 'W')
+
+    return {
+        'format': image_format,
+        'width': width,
+        'height': height,
+        'exif': {
+            'datetime': tags.get('datetime', ''),
+            'make': tags.get('make', ''),
+            'model': tags.get('model', ''),
+            'gps_latitude': _format_ratios(tags.get('gps_latitude')),
+            'gps_longitude': _format_ratios(tags.get('gps_longitude'))
+        },
+        'gps': (latitude, longitude) if latitude is not None and longitude is not None else None
+    }
+
+
+def _probe_jpeg(data: memoryview) -> Tuple[Optional[int], Optional[int], Optional[memoryview]]:
+    width, height, tiff = None, None, None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            break
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image / start of scan: no more headers
+            break
+
+        length = struct.unpack_from('>H', data, pos + 2)[0]
+        start, end = pos + 4, pos + 2 + length
+        if marker == 0xE1 and tiff is None and data[start:start + 6] == b'Exif\x00\x00':
+            tiff = data[start + 6:end]
+        elif marker in _SOF_MARKERS:
+            height, width = struct.unpack_from('>HH', data, start + 1)
+            # APP1 always precedes the frame header
+            break
+        pos = end
+    return width, height, tiff
+
+
+def _probe_png(data: memoryview) -> Tuple[Optional[int], Optional[int], Optional[memoryview]]:
+    width, height = struct.unpack_from('>II', data, 16)
+    tiff = None
+    pos = 8
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack_from('>I4s', data, pos)
+        if chunk_type == b'IDAT':
+            break
+        if chunk_type == b'eXIf':
+            tiff = data[pos + 8:pos + 8 + length]
+            break
+        pos += 12 + length
+    return width, height, tiff
+
+
+def _probe_webp(data: memoryview) -> Tuple[Optional[int], Optional[int], Optional[memoryview]]:
+    width, height, tiff = None, None, None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_type, length = struct.unpack_from('<4sI', data, pos)
+        body = pos + 8
+        if chunk_type == b'VP8X':
+            width = 1 + int.from_bytes(data[body + 4:body + 7], 'little')
+            height = 1 + int.from_bytes(data[body + 7:body + 10], 'little')
+        elif chunk_type == b'VP8 ' and width is None:
+            w, h = struct.unpack_from('<HH', data, body + 6)
+            width, height = w & 0x3FFF, h & 0x3FFF
+        elif chunk_type == b'VP8L' and width is None:
+            bits = struct.unpack_from('<I', data, body + 1)[0]
+            width, height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        elif chunk_type == b'EXIF':
+            tiff = data[body:body + length]
+            if tiff[:6] == b'Exif\x00\x00':
+                tiff = tiff[6:]
+        # Chunks are padded to an even size
+        pos = body + length + (length & 1)
+    return width, height, tiff
+
+
+def _parse_tiff(tiff: memoryview) -> Dict:
+    """
+    Read the probed tags from a TIFF/EXIF block
+
+    Each tag is read on its own, so a malformed field (bad offset, count or
+    type) only loses that tag, or the tags of the IFD it points at.
+    """
+    tags = {}
+    if tiff[:2] == b'II':
+        order = '<'
+    elif tiff[:2] == b'MM':
+        order = '>'
+    else:
+        return tags
+    ifd0 = _try({}, _read_ifd_at, tiff, order, 4)
+    exif_ifd = _try({}, _read_sub_ifd, tiff, order, ifd0.get(_TAG_EXIF_IFD))
+    gps_ifd = _try({}, _read_sub_ifd, tiff, order, ifd0.get(_TAG_GPS_IFD))
+
+    tags['make'] = _try('', _read_ascii, tiff, order, ifd0.get(_TAG_MAKE))
+    tags['model'] = _try('', _read_ascii, tiff, order, ifd0.get(_TAG_MODEL))
+    tags['datetime'] = _try('', _read_ascii, tiff, order, exif_ifd.get(_TAG_DATETIME_ORIGINAL))
+    tags['gps_latitude_ref'] = _try('', _read_ascii, tiff, order, gps_ifd.get(_TAG_GPS_LATITUDE_REF))
+    tags['gps_longitude_ref'] = _try('', _read_ascii, tiff, order, gps_ifd.get(_TAG_GPS_LONGITUDE_REF))
+    for name, tag in (('gps_latitude', _TAG_GPS_LATITUDE), ('gps_longitude', _TAG_GPS_LONGITUDE)):
+        if tag in gps_ifd:
+            # Degrees, minutes, seconds
+            tags[name] = _try(None, _read_values, tiff, order, gps_ifd[tag], 3)
+    return tags
+
+
+def _try(default, read: Callable, *args):
+    """Call read(*args), returning default if the field is malformed"""
+    try:
+        return read(*args)
+    except (struct.error, IndexError, ValueError, ZeroDivisionError):
+        return default
+
+
+def _read_ifd_at(tiff: memoryview, order: str, pointer_offset: int) -> Dict[int, Tuple[int, int, int]]:
+    """Read the IFD whose offset is stored at pointer_offset"""
+    return _read_ifd(tiff, order, struct.unpack_from(order + 'I', tiff, pointer_offset)[0])
+
+
+def _read_ifd(tiff: memoryview, order: str, offset: int) -> Dict[int, Tuple[int, int, int]]:
+    """Map tag -> (type, count, offset of the value field) for one IFD"""
+    entries = {}
+    count = struct.unpack_from(order + 'H', tiff, offset)[0]
+    if offset + 2 + 12 * count > len(tiff):
+        raise ValueError("TIFF IFD extends past the end of the block")
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag, field_type, value_count = struct.unpack_from(order + 'HHI', tiff, entry)
+        entries[tag] = (field_type, value_count, entry + 8)
+    return entries
+
+
+def _read_sub_ifd(
+    tiff: memoryview,
+    order: str,
+    pointer: Optional[Tuple[int, int, int]]
+) -> Dict[int, Tuple[int, int, int]]:
+    """Follow an IFD pointer tag (a single offset) to the IFD it points at"""
+    if pointer is None:
+        return {}
+    return _read_ifd(tiff, order, _read_values(tiff, order, pointer, max_count=1)[0])
+
+
+def _value_span(tiff: memoryview, order: str, field: Tuple[int, int, int]) -> Tuple[int, int]:
+    """
+    Start and end of a field's values in the block
+
+    Raises:
+        ValueError: If the values extend past the end of the block
+    """
+    field_type, count, field_offset = field
+    size = count * _TYPE_SIZES.get(field_type, 1)
+    start = field_offset if size <= 4 else struct.unpack_from(order + 'I', tiff, field_offset)[0]
+    if start + size > len(tiff):
+        raise ValueError("TIFF field extends past the end of the block")
+    return start, start + size
+
+
+def _read_ascii(tiff: memoryview, order: str, field: Optional[Tuple[int, int, int]]) -> str:
+    if field is None:
+        return ''
+    start, end = _value_span(tiff, order, field)
+    raw = bytes(tiff[start:end])
+    return raw.split(b'\x00', 1)[0].decode('utf-8', 'replace').strip()
+
+
+def _read_values(tiff: memoryview, order: str, field: Tuple[int, int, int], max_count: int) -> List:
+    """
+    Read a numeric field holding at most max_count values
+
+    Raises:
+        ValueError: If the type is not numeric, the field holds more than
+            max_count values or extends past the end of the block
+    """
+    field_type, count, _ = field
+    if count > max_count:
+        raise ValueError(f"TIFF field has {count} values, expected at most {max_count}")
+    start, _ = _value_span(tiff, order, field)
+    if field_type in (5, 10):
+        code = 'I' if field_type == 5 else 'i'
+        pairs = struct.unpack_from(order + code * (2 * count), tiff, start)
+        return [
+            Fraction(pairs[i], pairs[i + 1]) if pairs[i + 1] else Fraction(0)
+            for i in range(0, len(pairs), 2)
+        ]
+    code = {3: 'H', 4: 'I', 9: 'i'}.get(field_type)
+    if code is None:
+        raise ValueError(f"Unsupported TIFF field type {field_type}")
+    return list(struct.unpack_from(order + code * count, tiff, start))
+
+
+def _format_ratios(values: Optional[List[Fraction]]) -> str:
+    """Render rationals the way exifread prints them, e.g. '[26, 54, 617/25]'"""
+    if not values:
+        return ''
+    if len(values) == 1:
+        return str(values[0])
+    return '[' + ', '.join(str(value) for value in values) + ']'
+
+
+def _dms_to_degrees(
+    values: Optional[List[Fraction]],
+    ref: Optional[str],
+    negative_ref: str
+) -> Optional[float]:
+    if not values or len(values) < 3:
+        return None
+    degrees = float(values[0] + values[1] / 60 + values[2] / 3600)
+    return -degrees if ref == negative_ref else degrees
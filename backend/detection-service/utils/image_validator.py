@@ -1,59 +1,69 @@
-from PIL import Image
-import io
-import numpy as np
-import cv2
-from typing import Dict
+from typing import Dict, Union
+from utils.image_context import DecodedImage
+from config.settings import settings
 
+ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
 
-def validate_image(image_bytes: bytes, filename: str) -> Dict:
+
+def has_allowed_extension(filename: str) -> bool:
+    """Whether the filename has one of ALLOWED_EXTENSIONS"""
+    ext = filename.lower().split('.')[-1]
+    return f'.{ext}' in ALLOWED_EXTENSIONS
+
+
+def validate_image(image: Union[bytes, DecodedImage], filename: str) -> Dict:
     """
     Validate image format, size, and basic integrity
     
     Args:
-        image_bytes: Image data as bytes
+        image: Image data as bytes or a shared DecodedImage
         filename: Original filename
         
     Returns:
         Dictionary with validation results
     """
     try:
+        image = DecodedImage.ensure(image)
+
         # Check file extension
-        allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        ext = filename.lower().split('.')[-1]
-        if f'.{ext}' not in allowed_extensions:
+        if not has_allowed_extension(filename):
             return {
                 'valid': False,
-                'error': f'Invalid file format. Allowed: {allowed_extensions}'
+                'error': f'Invalid file format. Allowed: {ALLOWED_EXTENSIONS}'
             }
         
-        # Check file size (max 10MB)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if len(image_bytes) > max_size:
+        # Check file size
+        max_size = settings.max_upload_mb * 1024 * 1024
+        if image.size_bytes > max_size:
             return {
                 'valid': False,
-                'error': 'Image size exceeds 10MB limit'
+                'error': f'Image size exceeds {settings.max_upload_mb}MB limit'
             }
         
-        # Try to open image
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Check image dimensions (minimum 640x480)
-        width, height = image.size
+        # Read dimensions from the header before paying for a decode
+        width, height = image.header_size
         if width < 640 or height < 480:
             return {
                 'valid': False,
                 'error': 'Image resolution too low (minimum 640x480)'
             }
         
-        # Check if image is corrupted
-        image.verify()
+        # Refuse decompression bombs before allocating their pixel buffers
+        if width * height > settings.max_image_megapixels * 1_000_000:
+            return {
+                'valid': False,
+                'error': f'Image resolution too high (maximum {settings.max_image_megapixels:g} megapixels)'
+            }
+        
+        # Check if image is corrupted (decoded pixels are reused downstream)
+        image.bgr
         
         return {
             'valid': True,
             'width': width,
             'height': height,
             'format': image.format,
-            'size_bytes': len(image_bytes)
+            'size_bytes': image.size_bytes
         }
         
     except Exception as e:
@@ -63,68 +73,66 @@ def validate_image(image_bytes: bytes, filename: str) -> Dict:
         }
 
 
-def check_image_manipulation(image_bytes: bytes) -> Dict:
+def check_image_manipulation(image: Union[bytes, DecodedImage]) -> Dict:
     """
     Detect potential image manipulation/editing
-    Uses Error Level Analysis (ELA) and noise analysis
+    Uses noise, histogram, edge, colour and Error Level Analysis (ELA)
+    statistics from the shared forensic feature vector (utils.forensics)
     
     Args:
-        image_bytes: Image data as bytes
+        image: Image data as bytes or a shared DecodedImage
         
     Returns:
         Dictionary with manipulation detection results
     """
     try:
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        features = DecodedImage.ensure(image).forensics
         
         indicators = []
         manipulation_score = 0.0
         
-        # 1. Check for extreme JPEG compression artifacts
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Calculate noise level
-        noise = cv2.Laplacian(gray, cv2.CV_64F).var()
-        if noise < 50:
+        # 1. Check for extreme JPEG compression artifacts via the noise level
+        if features.laplacian_variance < 50:
             indicators.append('Unusual noise pattern detected')
             manipulation_score += 0.3
         
         # 2. Check for copy-paste artifacts (duplicate regions)
         # Simple check: calculate histogram variance
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        hist_variance = np.var(hist)
-        
-        if hist_variance < 1000:
+        if features.histogram_variance < 1000:
             indicators.append('Low histogram variance (possible editing)')
             manipulation_score += 0.2
         
         # 3. Check for unnatural edges (common in edited images)
-        edges = cv2.Canny(gray, 100, 200)
-        edge_density = np.sum(edges > 0) / edges.size
-        
-        if edge_density < 0.01:  # Too few edges
+        if features.edge_density < 0.01:  # Too few edges
             indicators.append('Unnatural edge distribution')
             manipulation_score += 0.25
         
         # 4. Check color distribution
         # Edited images often have unnatural color distributions
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        h, s, v = cv2.split(hsv)
-        
-        s_mean = np.mean(s)
-        if s_mean < 30:  # Very low saturation
+        if features.mean_saturation < 30:  # Very low saturation
             indicators.append('Unusual color saturation')
             manipulation_score += 0.15
         
+        # 5. Check for regions with a different compression history. Camera
+        # photos re-saved once stay below ~20 in practice, while pasted-in
+        # regions push the contrast well past it. Texture still moves it, so
+        # this alone cannot mark an image as manipulated
+        if features.ela_contrast is not None and features.ela_contrast > 20:
+            indicators.append('Inconsistent compression error levels')
+            manipulation_score += 0.2
+        
         # Normalize score
         manipulation_score = min(1.0, manipulation_score)
         
         return {
             'manipulated': manipulation_score > 0.5,
             'confidence': round(manipulation_score, 2),
-            'indicators': indicators
+            'indicators': indicators,
+            # None when FORENSICS_ELA is off or the analysis failed
+            'error_level_analysis': None if features.ela_mean is None else {
+                'mean': round(features.ela_mean, 3),
+                'contrast': round(features.ela_contrast, 2)
+            }
         }
         
     except Exception as e:
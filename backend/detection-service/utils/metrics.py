@@ -0,0 +1,121 @@
+import os
+from typing import Callable, Dict, Iterable
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from utils.timing import RequestTimer
+
+# Set by serve.py before prometheus_client is imported; the histograms then
+# live in per-process files there that any worker can sum on scrape
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# Seconds; spans cache hits (~ms) to cold CPU inference (~s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    'detection_stage_duration_seconds',
+    'Time spent in each request pipeline stage',
+    ['endpoint', 'stage'],
+    buckets=LATENCY_BUCKETS
+)
+
+REQUEST_SECONDS = Histogram(
+    'detection_request_duration_seconds',
+    'End-to-end request handling time',
+    ['endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+
+INFERENCE_SECONDS = Histogram(
+    'yolo_inference_duration_seconds',
+    'YOLO predict call time (one call may cover a batch)',
+    ['backend'],
+    buckets=LATENCY_BUCKETS
+)
+
+POSTPROCESS_SECONDS = Histogram(
+    'yolo_postprocess_duration_seconds',
+    'Time turning one YOLO result into the API response',
+    buckets=LATENCY_BUCKETS
+)
+
+BATCH_SIZE = Histogram(
+    'yolo_batch_size',
+    'Images per YOLO predict call',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+
+def observe_request(endpoint: str, timer: RequestTimer):
+    """Record a finished request's stage breakdown and total time"""
+    for stage, elapsed_ms in timer.stages.items():
+        STAGE_SECONDS.labels(endpoint, stage).observe(elapsed_ms / 1000)
+    REQUEST_SECONDS.labels(endpoint).observe(timer.total_ms / 1000)
+
+
+class StatsCollector:
+    """
+    Exposes a component's stats() dict as metrics at scrape time
+
+    Numeric fields become ``<prefix>_<field>`` gauges, or counters for the
+    names listed in ``counters``; other fields are skipped. This keeps the
+    executor, cache and batcher free of any metrics code.
+
+    The stats are per process: with prefork workers each series carries a
+    ``pid`` label for the worker that answered the scrape.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        stats_fn: Callable[[], Dict],
+        counters: Iterable[str] = ()
+    ):
+        """
+        Args:
+            prefix: Metric name prefix
+            stats_fn: Returns the component's current stats
+            counters: Fields that only ever increase
+        """
+        self.prefix = prefix
+        self.stats_fn = stats_fn
+        self.counters = set(counters)
+
+    def collect(self):
+        labels, label_values = [], []
+        if MULTIPROC_DIR_ENV in os.environ:
+            labels, label_values = ['pid'], [str(os.getpid())]
+        for field, value in self.stats_fn().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{self.prefix}_{field}"
+            if field in self.counters:
+                # The client library appends _total itself
+                family = CounterMetricFamily(name.removesuffix('_total'), field, labels=labels)
+            else:
+                family = GaugeMetricFamily(name, field, labels=labels)
+            family.add_metric(label_values, value)
+            yield family
+
+
+def scrape_registry(collectors: Iterable) -> CollectorRegistry:
+    """
+    Registry to render on /metrics
+
+    In a single process this is the default registry, which the collectors
+    are registered with at startup. Under serve.py a fresh registry sums the
+    histograms over every worker, live or dead, and adds the collectors of
+    the worker answering the scrape.
+
+    Args:
+        collectors: Per-process collectors (StatsCollector instances)
+
+    Returns:
+        Registry to pass to generate_latest
+    """
+    if MULTIPROC_DIR_ENV not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in collectors:
+        registry.register(collector)
+    return registry
@@ -0,0 +1,52 @@
+import numpy as np
+import cv2
+from typing import Union
+from utils.image_context import DecodedImage
+
+
+def phash(image: Union[bytes, DecodedImage], hash_size: int = 8) -> int:
+    """
+    DCT perceptual hash, robust to re-compression, resizing and EXIF edits
+
+    Args:
+        image: Image data as bytes or a shared DecodedImage
+        hash_size: Side of the low-frequency DCT block (hash has hash_size**2 bits)
+
+    Returns:
+        Hash as an unsigned integer
+    """
+    image = DecodedImage.ensure(image)
+    size = hash_size * 4
+
+    small = cv2.resize(image.gray, (size, size), interpolation=cv2.INTER_AREA)
+    low_freq = cv2.dct(small.astype(np.float32))[:hash_size, :hash_size]
+
+    return _bits_to_int(low_freq > np.median(low_freq))
+
+
+def dhash(image: Union[bytes, DecodedImage], hash_size: int = 8) -> int:
+    """
+    Difference hash: sign of horizontal gradients on a tiny thumbnail
+
+    Args:
+        image: Image data as bytes or a shared DecodedImage
+        hash_size: Thumbnail height (hash has hash_size**2 bits)
+
+    Returns:
+        Hash as an unsigned integer
+    """
+    image = DecodedImage.ensure(image)
+
+    small = cv2.resize(
+        image.gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA
+    )
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (hash1 ^ hash2).bit_count()
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
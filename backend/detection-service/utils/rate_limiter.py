@@ -0,0 +1,182 @@
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window log: one sorted set per identity, scored by arrival time
+# in ms. Prunes, counts and records the hit in a single atomic call, with
+# Redis' own clock so pods with skewed clocks agree on the window. A hit
+# whose member is already in the window was counted before and is allowed
+# without being counted again.
+# Returns {allowed, count in window, ms until the oldest hit expires}.
+_SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if redis.call('ZSCORE', KEYS[1], ARGV[3]) then
+    return {1, count, 0}
+end
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, count + 1, 0}
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, count, tonumber(oldest[2]) + window - now}
+"""
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when an identity is over its submission limit
+    """
+
+    def __init__(self, scope: str, limit: int, window_seconds: int, retry_after: int):
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter in Redis with an in-process first tier
+
+    Each scope (e.g. 'device', 'ip') has its own limit per window. Redis
+    holds the authoritative sliding window, updated by one Lua call per
+    hit, so there is no 2x burst at window edges and no key left without
+    an expiry.
+
+    In front of it, every process keeps a token bucket per identity that
+    refills at limit / window. A burst from one device is rejected locally
+    without touching Redis once its bucket is empty, and an identity that
+    Redis rejected stays blocked locally until its retry time. When Redis is
+    unavailable the local buckets still cap each process.
+
+    A hit can name what it counts (e.g. the hash of an upload): repeating
+    the same key within the window, like a client retrying a request, is
+    only counted once.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis],
+        limits: Dict[str, Tuple[int, int]],
+        key_prefix: str = 'rate',
+        local_cache_size: int = 10000
+    ):
+        """
+        Args:
+            redis_client: Async Redis client (None for local buckets only)
+            limits: Scope -> (max hits, window in seconds); a limit of 0
+                disables the scope
+            key_prefix: Redis key prefix
+            local_cache_size: Identities tracked in-process (LRU)
+        """
+        self.redis_client = redis_client
+        self.limits = {scope: limit for scope, limit in limits.items() if limit[0] > 0}
+        self.key_prefix = key_prefix
+        self.local_cache_size = local_cache_size
+
+        # key -> [tokens, last refill time, blocked until, last hit key]
+        self._buckets: 'OrderedDict[str, list]' = OrderedDict()
+        self._script = redis_client.register_script(_SLIDING_WINDOW_SCRIPT) if redis_client else None
+        self.local_rejections = 0
+        self.redis_rejections = 0
+
+    async def hit(self, scope: str, identity: str, hit_key: Optional[str] = None) -> int:
+        """
+        Count one submission by identity against its scope's limit
+
+        Args:
+            scope: Limit scope, a key of the configured limits
+            identity: Device ID, client IP, ...
+            hit_key: What is being submitted, e.g. a content hash; a hit
+                with a key already counted in the window is not counted
+                again (default: every hit counts)
+
+        Returns:
+            Submissions in the current window including this one (0 when
+            the scope is disabled or Redis is unavailable)
+
+        Raises:
+            RateLimitExceeded: If the identity is over its limit
+        """
+        if scope not in self.limits:
+            return 0
+        limit, window_seconds = self.limits[scope]
+        key = f"{self.key_prefix}:{scope}:{identity}"
+        now = time.monotonic()
+
+        bucket = self._bucket(key, limit, now)
+        refill_rate = limit / window_seconds
+        bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * refill_rate)
+        bucket[1] = now
+        # The bucket only remembers the last key, which covers client retries;
+        # Redis recognises any key still in the window
+        repeat = hit_key is not None and hit_key == bucket[3]
+        if not repeat:
+            if bucket[2] > now:
+                self.local_rejections += 1
+                raise self._exceeded(scope, bucket[2] - now)
+            if bucket[0] < 1:
+                self.local_rejections += 1
+                raise self._exceeded(scope, (1 - bucket[0]) / refill_rate)
+            bucket[0] -= 1
+            bucket[3] = hit_key
+
+        if self._script is None:
+            return 0
+        member = hit_key if hit_key is not None else f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        try:
+            allowed, count, retry_after_ms = await self._script(
+                keys=[key],
+                args=[window_seconds * 1000, limit, member]
+            )
+        except RedisError as e:
+            logger.warning(f"Redis unavailable, rate limiting {scope} in-process only: {e}")
+            return 0
+
+        if not allowed:
+            # Other pods used up the window; stop asking Redis until it frees up
+            retry_after = retry_after_ms / 1000
+            bucket[2] = now + retry_after
+            bucket[3] = None
+            self.redis_rejections += 1
+            raise self._exceeded(scope, retry_after)
+        return int(count)
+
+    def stats(self) -> Dict:
+        """Rejection counters"""
+        return {
+            'tracked_identities': len(self._buckets),
+            'local_rejections_total': self.local_rejections,
+            'redis_rejections_total': self.redis_rejections
+        }
+
+    def _bucket(self, key: str, limit: int, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(limit), now, 0.0, None]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.local_cache_size:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _exceeded(self, scope: str, retry_after: float) -> RateLimitExceeded:
+        limit, window_seconds = self.limits[scope]
+        return RateLimitExceeded(scope, limit, window_seconds, max(1, math.ceil(retry_after)))
@@ -0,0 +1,168 @@
+import json
+import time
+from typing import AsyncIterator, Container, Dict, List, Tuple
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pulls re-read this much history to pick up entries written late
+# (pipelines still in flight, clock skew between pods)
+_OVERLAP_SECONDS = 60
+
+
+class RedisEntryLog:
+    """
+    TTL-bounded log of JSON entries shared through Redis
+
+    Backs the in-process submission indexes: every entry is written as its
+    own key with a TTL plus a ZSET member scored by creation time, so any
+    process can pull the entries it has not seen yet. Redis errors are
+    logged and swallowed; the in-process index keeps working without it.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        key_prefix: str,
+        ttl_seconds: int,
+        sync_interval_seconds: float = 5.0,
+        page_size: int = 1000
+    ):
+        """
+        Args:
+            redis_client: Async Redis client (decode_responses=True)
+            key_prefix: Prefix for the ZSET and entry keys
+            ttl_seconds: Entry lifetime
+            sync_interval_seconds: Minimum time between pulls
+            page_size: Entries fetched per ZRANGEBYSCORE / MGET round-trip
+        """
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self.page_size = page_size
+        self._last_attempt = 0.0
+
+        # pull() only follows what is written from now on; the history
+        # before it is loaded page by page by backfill(), off the request path
+        self._started_at = time.time()
+        self._cursor = (self._started_at - _OVERLAP_SECONDS, 0)
+        self.backfilled = False
+
+    def append(self, pipe: redis.client.Pipeline, entry_id: str, data: Dict, created_at: float):
+        """
+        Queue the commands writing one entry on a caller-owned pipeline, so
+        several logs can be written in a single round-trip
+        """
+        pipe.setex(self._entry_key(entry_id), self.ttl_seconds, json.dumps(data))
+        pipe.zadd(self._set_key(), {entry_id: created_at})
+        pipe.zremrangebyscore(self._set_key(), '-inf', created_at - self.ttl_seconds)
+
+    async def pull(
+        self,
+        known: Container[str] = (),
+        force: bool = False
+    ) -> List[Tuple[str, float, Dict]]:
+        """
+        Entries created since the previous pull (with a small overlap)
+
+        At most one page is read per call, so a process that fell behind
+        (e.g. Redis was unreachable for a while) catches up over several
+        syncs instead of in one oversized request.
+
+        Args:
+            known: Entry ids the caller already has; these are not fetched
+            force: Pull even if the last pull was under sync_interval_seconds ago
+
+        Returns:
+            List of (entry_id, created_at, data)
+        """
+        now = time.time()
+        if not force and now - self._last_attempt < self.sync_interval_seconds:
+            return []
+        self._last_attempt = now
+
+        cursor = self._cursor
+        if cursor[0] < now - self.ttl_seconds:
+            cursor = (now - self.ttl_seconds, 0)
+        try:
+            page, entries = await self._read_page(cursor, '+inf', known)
+        except RedisError as e:
+            logger.warning(f"Failed to read {self.key_prefix} entries: {e}")
+            return []
+
+        if len(page) < self.page_size:
+            # Caught up; re-read a short overlap next time for late writers
+            self._cursor = (now - _OVERLAP_SECONDS, 0)
+        else:
+            self._cursor = _next_cursor(cursor, page)
+        return entries
+
+    async def backfill(self, known: Container[str] = ()) -> AsyncIterator[List[Tuple[str, float, Dict]]]:
+        """
+        Entries written before this process started, oldest first, one page
+        at a time. Sets ``backfilled`` once the whole TTL window is loaded;
+        on a Redis error it stops early and can be called again.
+
+        Args:
+            known: Entry ids the caller already has; these are not fetched
+
+        Yields:
+            Lists of (entry_id, created_at, data)
+        """
+        cursor = (time.time() - self.ttl_seconds, 0)
+        while True:
+            try:
+                page, entries = await self._read_page(cursor, self._started_at, known)
+            except RedisError as e:
+                logger.warning(f"Failed to backfill {self.key_prefix} entries: {e}")
+                return
+            if entries:
+                yield entries
+            if len(page) < self.page_size:
+                break
+            cursor = _next_cursor(cursor, page)
+
+        self.backfilled = True
+
+    async def _read_page(
+        self,
+        cursor: Tuple[float, int],
+        until,
+        known: Container[str]
+    ) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float, Dict]]]:
+        """
+        One page of the ZSET from a (score, offset) cursor, and the data of
+        its unknown entries (one MGET of at most page_size keys)
+        """
+        since, offset = cursor
+        page = await self.redis_client.zrangebyscore(
+            self._set_key(), since, until, start=offset, num=self.page_size, withscores=True
+        )
+        recent = [(entry_id, created_at) for entry_id, created_at in page if entry_id not in known]
+        values = await self.redis_client.mget(
+            [self._entry_key(entry_id) for entry_id, _ in recent]
+        ) if recent else []
+        return page, [
+            (entry_id, created_at, json.loads(value))
+            for (entry_id, created_at), value in zip(recent, values)
+            if value is not None
+        ]
+
+    def _set_key(self) -> str:
+        return f"{self.key_prefix}:entries"
+
+    def _entry_key(self, entry_id: str) -> str:
+        return f"{self.key_prefix}:entry:{entry_id}"
+
+
+def _next_cursor(cursor: Tuple[float, int], page: List[Tuple[str, float]]) -> Tuple[float, int]:
+    """
+    (score, offset) cursor after a full page: the page's last score, skipping
+    the entries with that score already read, so ties cannot stall paging
+    """
+    last = page[-1][1]
+    ties = sum(1 for _, score in page if score == last)
+    return (last, cursor[1] + ties) if last == cursor[0] else (last, ties)
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Optional
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(image_bytes: bytes) -> str:
+    """Hex digest identifying identical uploads (byte-for-byte)"""
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+class DetectionResultCache:
+    """
+    Two-tier cache of per-image analysis results
+
+    Keyed by the exact upload bytes plus the model version and confidence
+    threshold, so a retried upload skips decoding, manipulation analysis and
+    inference. The first tier is an in-process LRU; the optional second tier
+    is shared through Redis with a TTL so retries landing on another pod hit
+    as well. Values are stored as JSON and every get() returns a fresh copy.
+
+    Changing the model version makes older entries unreachable: when a new
+    version is first seen the LRU is cleared, and Redis entries of older
+    versions expire with their TTL. invalidate() removes them at once; it
+    scans the whole key prefix, so it is an admin action
+    (python -m utils.result_cache invalidate) rather than part of serving.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        redis_client: Optional[redis.Redis] = None,
+        ttl_seconds: int = 3600,
+        key_prefix: str = 'detect_cache'
+    ):
+        """
+        Args:
+            max_entries: In-process LRU capacity (0 disables the cache)
+            redis_client: Optional async Redis client for the shared tier
+            ttl_seconds: Redis entry lifetime (0 disables the shared tier)
+            key_prefix: Redis key prefix
+        """
+        self.max_entries = max_entries
+        self.redis_client = redis_client if ttl_seconds > 0 else None
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._model_version: Optional[str] = None
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    async def get(
+        self,
+        image_hash: str,
+        model_version: str,
+        confidence_threshold: float
+    ) -> Optional[Dict]:
+        """
+        Cached results for an upload, or None
+
+        Args:
+            image_hash: content_hash() of the upload
+            model_version: Version of the model that produced the results
+            confidence_threshold: Detection confidence threshold used
+        """
+        if not self.enabled:
+            return None
+        self._check_version(model_version)
+        key = self._key(image_hash, model_version, confidence_threshold)
+
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.local_hits += 1
+            return json.loads(value)
+
+        if self.redis_client is not None:
+            try:
+                value = await self.redis_client.get(key)
+            except RedisError as e:
+                logger.warning(f"Redis unavailable, skipping shared result cache: {e}")
+            if value is not None:
+                self._remember(key, value)
+                self.redis_hits += 1
+                return json.loads(value)
+
+        self.misses += 1
+        return None
+
+    async def put(
+        self,
+        image_hash: str,
+        model_version: str,
+        confidence_threshold: float,
+        results: Dict
+    ):
+        """
+        Store results for an upload in both tiers
+
+        Args:
+            image_hash: content_hash() of the upload
+            model_version: Version of the model that produced the results
+            confidence_threshold: Detection confidence threshold used
+            results: JSON-serialisable results
+        """
+        if not self.enabled:
+            return
+        self._check_version(model_version)
+        key = self._key(image_hash, model_version, confidence_threshold)
+        value = json.dumps(results)
+        self._remember(key, value)
+
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.setex(key, self.ttl_seconds, value)
+            except RedisError as e:
+                logger.warning(f"Redis unavailable, result cached in-process only: {e}")
+
+    async def invalidate(self, keep_version: Optional[str] = None, batch_size: int = 500) -> int:
+        """
+        Drop cached results, e.g. after a model upgrade
+
+        Scans every key under the prefix and unlinks the matching ones in
+        pipelined batches (UNLINK frees the memory off Redis' main thread).
+
+        Args:
+            keep_version: Model version whose entries are kept
+                (default: drop every version)
+            batch_size: Keys unlinked per pipelined round trip
+
+        Returns:
+            Number of Redis keys deleted
+        """
+        if keep_version is None:
+            self._entries.clear()
+        if self.redis_client is None:
+            return 0
+
+        deleted = 0
+        keep_prefix = f"{self.key_prefix}:{keep_version}:" if keep_version else None
+        try:
+            batch = []
+            async for key in self.redis_client.scan_iter(match=f"{self.key_prefix}:*", count=1000):
+                if keep_prefix is None or not key.startswith(keep_prefix):
+                    batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += await self._unlink(batch)
+                    batch = []
+            if batch:
+                deleted += await self._unlink(batch)
+        except RedisError as e:
+            logger.warning(f"Failed to invalidate shared result cache: {e}")
+        logger.info(f"Result cache invalidated ({deleted} shared entries removed)")
+        return deleted
+
+    def stats(self) -> Dict:
+        """Hit/miss counters"""
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'model_version': self._model_version,
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    def _check_version(self, model_version: str):
+        if model_version == self._model_version:
+            return
+        if self._model_version is not None:
+            logger.info(
+                f"Model version changed ({self._model_version} -> {model_version}), "
+                f"clearing result cache"
+            )
+        self._entries.clear()
+        self._model_version = model_version
+
+    async def _unlink(self, keys) -> int:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.unlink(key)
+        return sum(await pipe.execute())
+
+    def _remember(self, key: str, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _key(self, image_hash: str, model_version: str, confidence_threshold: float) -> str:
+        return f"{self.key_prefix}:{model_version}:{confidence_threshold:g}:{image_hash}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Remove shared detection results from Redis, e.g. after a model upgrade"
+    )
+    parser.add_argument('command', choices=['invalidate'])
+    parser.add_argument(
+        '--keep-version', default=None,
+        help="Model version whose entries are kept (default: remove all)"
+    )
+    args = parser.parse_args()
+
+    from config.redis import redis_client
+
+    logging.basicConfig(level=logging.INFO)
+    cache = DetectionResultCache(redis_client=redis_client)
+    asyncio.run(cache.invalidate(keep_version=args.keep_version))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import numpy as np
+import cv2
+from skimage.metrics import structural_similarity as skimage_ssim
+from typing import Tuple, Union
+from utils.image_context import DecodedImage
+
+
+# SSIM stabilisation constants (Wang et al. 2004), for 8-bit data
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def opencv_ssim(
+    image1: np.ndarray,
+    image2: np.ndarray,
+    win_size: int = 7,
+    gaussian_weights: bool = False,
+    full: bool = False
+) -> Union[float, Tuple[float, np.ndarray]]:
+    """
+    Vectorized SSIM on 8-bit grayscale images using OpenCV filters
+
+    Matches skimage.metrics.structural_similarity defaults (7x7 uniform
+    window, sample covariance, border crop) in float32, without the
+    float64 intermediates.
+
+    Args:
+        image1: First grayscale image (uint8)
+        image2: Second grayscale image, same shape as image1
+        win_size: Side of the sliding window (odd)
+        gaussian_weights: Use an 11x11, sigma 1.5 Gaussian window instead
+        full: Also return the local SSIM map
+
+    Returns:
+        Mean SSIM, or (mean SSIM, SSIM map) when full is True
+    """
+    if image1.shape != image2.shape:
+        raise ValueError("Input images must have the same dimensions")
+
+    x = image1.astype(np.float32)
+    y = image2.astype(np.float32)
+
+    if gaussian_weights:
+        win_size = 11
+
+        def window(img):
+            return cv2.GaussianBlur(
+                img, (win_size, win_size), 1.5,
+                borderType=cv2.BORDER_REFLECT
+            )
+    else:
+        def window(img):
+            return cv2.boxFilter(
+                img, -1, (win_size, win_size),
+                normalize=True, borderType=cv2.BORDER_REFLECT
+            )
+
+    # Sample covariance, as skimage does by default
+    n = win_size * win_size
+    cov_norm = n / (n - 1.0)
+
+    mu_x = window(x)
+    mu_y = window(y)
+
+    var_x = cov_norm * (window(x * x) - mu_x * mu_x)
+    var_y = cov_norm * (window(y * y) - mu_y * mu_y)
+    cov_xy = cov_norm * (window(x * y) - mu_x * mu_y)
+
+    ssim_map = (
+        (2 * mu_x * mu_y + _C1) * (2 * cov_xy + _C2) /
+        ((mu_x * mu_x + mu_y * mu_y + _C1) * (var_x + var_y + _C2))
+    )
+
+    # Ignore the border where the window ran off the image
+    pad = (win_size - 1) // 2
+    mssim = float(ssim_map[pad:-pad or None, pad:-pad or None].mean())
+
+    if full:
+        return mssim, ssim_map
+    return mssim
+
+
+def compute_similarity(
+    before: Union[bytes, DecodedImage],
+    after: Union[bytes, DecodedImage],
+    analysis_size: int = 1024,
+    method: str = 'opencv',
+    gaussian_weights: bool = False,
+    full: bool = False
+) -> Union[float, Tuple[float, np.ndarray]]:
+    """
+    SSIM between two images at a reduced analysis resolution
+
+    Both images are resized (INTER_AREA) so the longer side of the before
+    image is at most analysis_size; the after image is resized to the same
+    dimensions.
+
+    Args:
+        before: Before image as bytes or a shared DecodedImage
+        after: After image as bytes or a shared DecodedImage
+        analysis_size: Longest side used for analysis (0 = native resolution)
+        method: 'opencv' for the vectorized implementation, 'skimage' for
+            skimage.metrics.structural_similarity
+        gaussian_weights: Use a Gaussian window instead of a uniform one
+        full: Also return the SSIM map at the analysis resolution
+
+    Returns:
+        SSIM score, or (score, SSIM map) when full is True
+    """
+    before = DecodedImage.ensure(before)
+    after = DecodedImage.ensure(after)
+
+    height, width = before.gray.shape[:2]
+    scale = 1.0
+    if analysis_size and max(height, width) > analysis_size:
+        scale = analysis_size / max(height, width)
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    before_gray = before.gray
+    if scale != 1.0:
+        before_gray = cv2.resize(before_gray, target, interpolation=cv2.INTER_AREA)
+
+    after_gray = after.gray
+    if after_gray.shape[:2] != (target[1], target[0]):
+        after_gray = cv2.resize(after_gray, target, interpolation=cv2.INTER_AREA)
+
+    if method == 'skimage':
+        return skimage_ssim(
+            before_gray,
+            after_gray,
+            gaussian_weights=gaussian_weights,
+            full=full
+        )
+    if method == 'opencv':
+        return opencv_ssim(
+            before_gray,
+            after_gray,
+            gaussian_weights=gaussian_weights,
+            full=full
+        )
+    raise ValueError(f"Unknown SSIM method: {method}")
@@ -0,0 +1,57 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class RequestTimer:
+    """
+    Wall-clock breakdown of one request by pipeline stage
+
+    Stages with the same name accumulate, so several Redis round-trips
+    show up as a single 'redis' share.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block (sync code or awaits) under name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def split(self, name: str, part: str, elapsed_ms: float):
+        """
+        Move elapsed_ms of stage name into stage part
+
+        For work that happens lazily inside another stage, e.g. the image
+        decode triggered by validation.
+        """
+        elapsed_ms = min(elapsed_ms, self.stages.get(name, 0.0))
+        if elapsed_ms <= 0:
+            return
+        self.stages[name] -= elapsed_ms
+        self.stages[part] = self.stages.get(part, 0.0) + elapsed_ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def summary(self) -> str:
+        """One-line breakdown, e.g. 'total=120.4ms inference=80.1ms (67%) ...'"""
+        total = self.total_ms
+        parts = [f"total={total:.1f}ms"]
+        for name, elapsed in sorted(self.stages.items(), key=lambda item: -item[1]):
+            parts.append(f"{name}={elapsed:.1f}ms ({elapsed / total:.0%})")
+        return ' '.join(parts)
+
+    def server_timing(self) -> str:
+        """Stages as a Server-Timing header value, e.g. 'inference;dur=80.1, total;dur=120.4'"""
+        parts = [f"{name};dur={elapsed:.1f}" for name, elapsed in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ', '.join(parts)
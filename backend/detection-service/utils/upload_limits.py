@@ -0,0 +1,140 @@
+import resource
+from typing import Dict, Optional
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+# Leading bytes of the formats validate_image accepts
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+)
+SNIFF_BYTES = 12
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """
+    Identify JPEG / PNG / WebP from the first bytes of a file
+
+    Args:
+        header: At least SNIFF_BYTES leading bytes
+
+    Returns:
+        'JPEG', 'PNG', 'WEBP' or None
+    """
+    for signature, image_format in _SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+async def read_image_upload(
+    upload: UploadFile,
+    max_bytes: int,
+    chunk_size: int = 64 * 1024
+) -> bytes:
+    """
+    Read an uploaded image in chunks, rejecting it as early as possible
+
+    The declared size is checked before anything is read, the format is
+    sniffed from the first chunk, and reading stops as soon as max_bytes is
+    exceeded, so an oversized or non-image upload never ends up in memory.
+
+    Args:
+        upload: Multipart file
+        max_bytes: Largest accepted file size
+        chunk_size: Bytes read per call
+
+    Returns:
+        File contents
+
+    Raises:
+        HTTPException: 413 if too large, 415 if not JPEG/PNG/WebP
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    await upload.seek(0)
+    chunks = []
+    total = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if not chunks and sniff_image_format(chunk[:SNIFF_BYTES]) is None:
+            raise HTTPException(
+                status_code=415,
+                detail='Unsupported image format. Allowed: JPEG, PNG, WebP'
+            )
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(max_bytes)
+        chunks.append(chunk)
+
+    if not chunks:
+        raise HTTPException(status_code=400, detail='Empty image upload')
+    return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware capping request bodies per path
+
+    Requests whose Content-Length is over the limit are answered with 413
+    before the body is read; chunked bodies are counted while the multipart
+    parser consumes them and cut off at the limit, so oversized uploads are
+    never spooled in full.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        """
+        Args:
+            app: ASGI application
+            limits: Maximum body size in bytes by exact request path
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope['path']) if scope['type'] == 'http' else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope['headers'])
+        content_length = headers.get(b'content-length')
+        if content_length is not None and int(content_length) > limit:
+            response = JSONResponse(
+                status_code=413,
+                content={'detail': _too_large(limit).detail}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    # Propagates out of request.form() as a normal 413
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f'Upload exceeds {max_bytes // (1024 * 1024)}MB limit'
+    )